@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: compiled relevance matcher vs. the old per-keyword
+substring scan, on a few thousand abstracts from the local corpus.
+
+    python -m benchmarks.bench_relevance [--n 5000] [--repeat 5]
+"""
+
+import os
+import time
+import argparse
+from typing import List
+
+from src.fetch_papers import COGNITIVE_KEYWORDS, NEGATIVE_KEYWORDS, get_relevance_matcher
+from src.utils import load_jsonl_db
+
+
+def legacy_is_relevant(title: str, abstract: str) -> bool:
+    """The substring scan `_is_cognition_relevant` used before the compiled matcher."""
+    text = (title + " " + abstract).lower()
+    if any(neg in text for neg in NEGATIVE_KEYWORDS):
+        return False
+    if any(tok in text for tok in COGNITIVE_KEYWORDS):
+        return True
+    if "design" in text and ("creativity" in text or "designer" in text or "creative" in text):
+        return True
+    return False
+
+
+def load_texts(n: int) -> List[tuple]:
+    papers = load_jsonl_db("data/papers_structured.jsonl")
+    bib_path = "paperpile.bib" if os.path.exists("paperpile.bib") else "data/paperpile.bib"
+    if os.path.exists(bib_path):
+        from src.fetch_bibtex import load_bibtex
+
+        papers = papers + load_bibtex(bib_path)
+    pairs = [(p.get("title") or "", p.get("abstract") or p.get("summary_short") or "") for p in papers]
+    if not pairs:
+        raise SystemExit("No corpus found under data/.")
+    return (pairs * (n // len(pairs) + 1))[:n]
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pairs = load_texts(args.n)
+    texts = [t + " " + a for t, a in pairs]
+    matcher = get_relevance_matcher()
+
+    legacy = best_of(lambda: [legacy_is_relevant(t, a) for t, a in pairs], args.repeat)
+    compiled = best_of(lambda: matcher.match_batch(texts), args.repeat)
+
+    old_flags = [legacy_is_relevant(t, a) for t, a in pairs]
+    new_flags = [r.relevant for r in matcher.match_batch(texts)]
+    changed = sum(o != n for o, n in zip(old_flags, new_flags))
+
+    print(f"abstracts:         {len(pairs)}")
+    print(f"legacy substring:  {legacy * 1000:8.1f} ms  ({sum(old_flags)} relevant)")
+    print(f"compiled matcher:  {compiled * 1000:8.1f} ms  ({sum(new_flags)} relevant)")
+    print(f"decisions changed: {changed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Local stand-in for the arXiv Atom API (export.arxiv.org/api/query), for
+offline runs and benchmarks.
+
+    python -m benchmarks.fake_arxiv --port 8766 --entries 500
+    ARXIV_API_URL=http://127.0.0.1:8766/api/query ARXIV_REQUEST_SPACING=0 python -m src.main
+
+Serves `--entries` deterministic synthetic papers, newest first, one
+every `--interval-hours` hours back from server start, and honours the
+`start` and `max_results` query parameters. Titles and abstracts use
+design-research vocabulary, so they pass the relevance filter; a share
+of them (`--offtopic`) is about unrelated engineering topics.
+"""
+
+import time
+import random
+import argparse
+import threading
+import datetime as dt
+import urllib.parse
+from xml.sax.saxutils import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+AI_TERMS = [
+    "large language models", "diffusion models", "generative AI", "vision-language models",
+    "multimodal agents", "reinforcement learning", "graph neural networks", "text-to-image generation",
+    "conversational agents", "retrieval-augmented generation", "neural implicit fields", "LLM copilots",
+]
+DESIGN_TERMS = [
+    "concept design", "ideation", "sketching", "prototyping", "industrial design", "product design",
+    "co-design", "design space exploration", "creativity support", "divergent thinking",
+    "participatory design", "design cognition", "early-stage design", "human-centered design",
+]
+CONTEXTS = [
+    "novice designers", "design teams", "engineering students", "architects", "UX practitioners",
+    "furniture design", "automotive styling", "consumer electronics", "workshops", "design studios",
+]
+FINDINGS = [
+    "increases the variety of generated concepts", "reduces fixation on early ideas",
+    "shifts effort from generation to evaluation", "supports reflection-in-action",
+    "changes how designers frame the problem", "speeds up convergence without lowering novelty",
+]
+OFFTOPIC_TERMS = [
+    "antenna arrays", "MIMO wireless channels", "intrusion detection", "time series forecasting",
+    "quantum error correction", "VLSI placement",
+]
+SURNAMES = [
+    "Virtanen", "Korhonen", "Nieminen", "Smith", "Garcia", "Chen", "Wang", "Müller", "Rossi",
+    "Tanaka", "Kim", "Dubois", "Novak", "Silva", "Cross", "Dorst", "Gero", "Howard", "Lawson",
+]
+FIRST_NAMES = ["Aino", "Eero", "Maria", "John", "Li", "Yuki", "Ana", "Pierre", "Sven", "Nora"]
+
+
+def synthetic_paper(i: int, seed: int = 0, offtopic: float = 0.1) -> Dict:
+    """Paper number `i` of the synthetic corpus (same `i` and `seed` -> same paper)."""
+    rng = random.Random(seed * 1_000_003 + i)
+    if rng.random() < offtopic:
+        topic = rng.choice(OFFTOPIC_TERMS)
+        title = f"{rng.choice(AI_TERMS).capitalize()} for {topic}: benchmark {i}"
+        abstract = (
+            f"We apply {rng.choice(AI_TERMS)} to {topic} and report accuracy and latency "
+            f"on {rng.randint(3, 12)} public datasets."
+        )
+    else:
+        ai, design, context = rng.choice(AI_TERMS), rng.choice(DESIGN_TERMS), rng.choice(CONTEXTS)
+        title = f"{ai.capitalize()} in {design} with {context}: study {i}"
+        abstract = (
+            f"We study how {ai} support {design} among {context}. "
+            f"In a study with {rng.randint(8, 60)} participants, the tool {rng.choice(FINDINGS)} "
+            f"and {rng.choice(FINDINGS)}. We discuss implications for {rng.choice(DESIGN_TERMS)}."
+        )
+    authors = [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}" for _ in range(rng.randint(1, 5))
+    ]
+    return {"title": title, "abstract": abstract, "authors": authors}
+
+
+def entry_xml(i: int, published: dt.datetime, seed: int, offtopic: float) -> str:
+    paper = synthetic_paper(i, seed, offtopic)
+    arxiv_id = f"{published:%y%m}.{i % 100000:05d}"
+    stamp = published.strftime("%Y-%m-%dT%H:%M:%SZ")
+    authors = "".join(f"<author><name>{escape(a)}</name></author>" for a in paper["authors"])
+    return (
+        "<entry>"
+        f"<id>http://arxiv.org/abs/{arxiv_id}v1</id>"
+        f"<published>{stamp}</published><updated>{stamp}</updated>"
+        f"<title>{escape(paper['title'])}</title>"
+        f"<summary>{escape(paper['abstract'])}</summary>"
+        f"{authors}"
+        '<category term="cs.HC" scheme="http://arxiv.org/schemas/atom"/>'
+        "</entry>"
+    )
+
+
+class FakeArxivState:
+    def __init__(
+        self,
+        entries: int = 500,
+        interval_hours: float = 1.0,
+        latency: float = 0.0,
+        seed: int = 0,
+        offtopic: float = 0.1,
+    ):
+        self.entries = entries
+        self.interval = dt.timedelta(hours=interval_hours)
+        self.latency = latency
+        self.seed = seed
+        self.offtopic = offtopic
+        self.now = dt.datetime.utcnow().replace(microsecond=0)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def feed(self, start: int, max_results: int) -> str:
+        items = [
+            entry_xml(i, self.now - i * self.interval, self.seed, self.offtopic)
+            for i in range(start, min(start + max_results, self.entries))
+        ]
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>Fake arXiv query</title>{''.join(items)}</feed>"
+        )
+
+
+def make_handler(state: FakeArxivState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):  # hiljaa
+            pass
+
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            try:
+                start = int(query.get("start", ["0"])[0])
+                max_results = int(query.get("max_results", ["10"])[0])
+            except ValueError:
+                self.send_error(400)
+                return
+            with state.lock:
+                state.requests += 1
+            if state.latency:
+                time.sleep(state.latency)
+            data = state.feed(start, max_results).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/atom+xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8766, **options) -> ThreadingHTTPServer:
+    """Start the stand-in in a background thread and return the server (`server.state` has the counters)."""
+    state = FakeArxivState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local arXiv API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--entries", type=int, default=500, help="Number of papers in the feed.")
+    parser.add_argument("--interval-hours", type=float, default=1.0, help="Time between consecutive papers.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every page request.")
+    parser.add_argument("--offtopic", type=float, default=0.1, help="Share of off-topic papers.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    state = FakeArxivState(
+        entries=args.entries,
+        interval_hours=args.interval_hours,
+        latency=args.latency,
+        seed=args.seed,
+        offtopic=args.offtopic,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"[fake_arxiv] Serving {args.entries} entries on http://{args.host}:{args.port}/api/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+Local stand-in for the parts of the OpenAI API this agent uses
+(Responses, Files and Batches), for offline runs.
+
+    python -m benchmarks.fake_openai --port 8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake python -m src.main
+
+Answers are deterministic: classification requests get a small JSON
+object derived from the title/abstract, everything else gets a short
+Markdown stub. Batches complete after `--batch-delay` seconds.
+
+For load tests, Responses calls can be slowed down (`--latency`,
+`--jitter`), fail with a 500 at `--error-rate`, and be limited to
+`--rpm` requests per minute (429 with Retry-After beyond that).
+"""
+
+import re
+import json
+import math
+import time
+import zlib
+import random
+import email
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+PHASE_HINTS = [
+    ("Implementation", ("prototyp", "fabricat", "manufactur", "deploy")),
+    ("Detail design", ("tolerance", "specification", "detail")),
+    ("Embodiment design", ("layout", "architecture", "mesh", "cad", "3d")),
+    ("Analysis of task", ("requirement", "constraint", "criteria")),
+    ("Establishing a need", ("need", "opportunit", "stakeholder")),
+]
+
+
+def fake_classification(user_content: str, confidence: bool = False) -> str:
+    """
+    Deterministic classification JSON for one paper payload, or
+    {"results": [...]} keyed like the input for a multi-paper payload.
+    With `confidence`, each object also gets a "confidence" derived from
+    the title (roughly a third of papers fall below 0.7).
+    """
+    try:
+        payload = json.loads(user_content)
+    except json.JSONDecodeError:
+        payload = {}
+    if isinstance(payload.get("papers"), list):
+        results = [
+            {"key": item.get("key"), **json.loads(fake_classification(json.dumps(item), confidence))}
+            for item in payload["papers"]
+        ]
+        return json.dumps({"results": results})
+    title = payload.get("title") or ""
+    text = (title + " " + (payload.get("abstract") or "")).lower()
+
+    phase = "Concept design"
+    for name, hints in PHASE_HINTS:
+        if any(h in text for h in hints):
+            phase = name
+            break
+    words = [w for w in re.findall(r"[a-z]{5,}", title.lower())][:4]
+
+    answer = {
+        "design_phase": [phase],
+        "ai_roles": ["generative assistant"],
+        "representations": ["text"],
+        "research_type": ["system paper"],
+        "summary_short": f"Offline summary of: {title}",
+        "implications_for_design_research": ["Offline implication."],
+        "tags": words or ["design"],
+    }
+    if confidence:
+        answer["confidence"] = 0.55 + zlib.crc32(title.encode("utf-8")) % 45 / 100
+    return json.dumps(answer)
+
+
+def fake_answer(input_messages: List[Dict]) -> str:
+    system = next((m.get("content", "") for m in input_messages if m.get("role") == "system"), "")
+    user = next((m.get("content", "") for m in input_messages if m.get("role") == "user"), "")
+    if "STRICT JSON" in system:
+        return fake_classification(user, confidence="## Confidence" in system)
+    return "# Offline section\n\n_Generated by the local OpenAI stand-in._\n"
+
+
+class FakeOpenAIState:
+    def __init__(
+        self,
+        batch_delay: float = 0.0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rpm: float = 0.0,
+        seed: int = 0,
+    ):
+        self.batch_delay = batch_delay
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.files: Dict[str, Tuple[str, bytes]] = {}
+        self.batches: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._rng = random.Random(seed)
+        self._recent: deque = deque()  # viimeisen minuutin pyyntöjen ajat
+        self.counts = {"responses": 0, "rate_limited": 0, "errors": 0}
+
+    def admit(self) -> Tuple[int, float, float]:
+        """
+        Decide the fate of one Responses call: (status, delay, retry_after).
+        Status 429 when over the per-minute limit, 500 at the error rate.
+        """
+        with self.lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            if self.rpm and len(self._recent) >= self.rpm:
+                self.counts["rate_limited"] += 1
+                return 429, 0.0, math.ceil(60 - (now - self._recent[0]))
+            self._recent.append(now)
+            self.counts["responses"] += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            if self._rng.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return 500, delay, 0.0
+            return 200, delay, 0.0
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}_fake{next(self._ids):06d}"
+
+    def response_body(self, model: str, input_messages: List[Dict]) -> Dict:
+        text = fake_answer(input_messages)
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 for m in input_messages)
+        return {
+            "id": self.new_id("resp"),
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": model,
+            "status": "completed",
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "output": [
+                {
+                    "type": "message",
+                    "id": self.new_id("msg"),
+                    "role": "assistant",
+                    "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            ],
+            "usage": {
+                "input_tokens": prompt_tokens,
+                "output_tokens": len(text) // 4,
+                "total_tokens": prompt_tokens + len(text) // 4,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+
+    def file_object(self, file_id: str) -> Dict:
+        name, data = self.files[file_id]
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": name,
+            "purpose": "batch",
+            "status": "processed",
+        }
+
+    def refresh_batch(self, batch: Dict) -> None:
+        """Run the batch once its delay has passed."""
+        if batch["status"] != "in_progress" or time.time() - batch["created_at"] < self.batch_delay:
+            return
+        _, data = self.files[batch["input_file_id"]]
+        out_lines = []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            req = json.loads(line)
+            body = req.get("body") or {}
+            out_lines.append(
+                json.dumps(
+                    {
+                        "id": self.new_id("batch_req"),
+                        "custom_id": req.get("custom_id"),
+                        "response": {
+                            "status_code": 200,
+                            "request_id": self.new_id("req"),
+                            "body": self.response_body(body.get("model", ""), body.get("input") or []),
+                        },
+                        "error": None,
+                    }
+                )
+            )
+        output_id = self.new_id("file")
+        self.files[output_id] = ("batch_output.jsonl", ("\n".join(out_lines) + "\n").encode("utf-8"))
+        batch.update(
+            {
+                "status": "completed",
+                "output_file_id": output_id,
+                "completed_at": int(time.time()),
+                "request_counts": {"total": len(out_lines), "completed": len(out_lines), "failed": 0},
+            }
+        )
+
+
+def _parse_multipart(content_type: str, body: bytes) -> Tuple[str, bytes]:
+    """Returns (filename, data) of the uploaded `file` field."""
+    msg = email.message_from_bytes(b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    for part in msg.walk():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_filename() or "upload.jsonl", part.get_payload(decode=True) or b""
+    return "upload.jsonl", b""
+
+
+def make_handler(state: FakeOpenAIState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # hiljaa
+            pass
+
+        def _send_json(self, status: int, obj: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_raw(self, data: bytes) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def _not_found(self) -> None:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+        def _responses(self, body: bytes) -> None:
+            status, delay, retry_after = state.admit()
+            if status == 429:
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached (fake).", "type": "requests", "code": "rate_limit_exceeded"}},
+                    headers={"Retry-After": str(retry_after)},
+                )
+                return
+            # viive lukon ulkopuolella, jotta rinnakkaiset kutsut eivät jonoudu
+            if delay:
+                time.sleep(delay)
+            if status == 500:
+                self._send_json(500, {"error": {"message": "Internal error (fake).", "type": "server_error"}})
+                return
+            req = json.loads(body or b"{}")
+            with state.lock:
+                response = state.response_body(req.get("model", ""), req.get("input") or [])
+            self._send_json(200, response)
+
+        def do_POST(self):
+            body = self._read_body()
+            path = self.path.split("?", 1)[0]
+            if path.endswith("/responses"):
+                self._responses(body)
+                return
+            with state.lock:
+                if path.endswith("/files"):
+                    name, data = _parse_multipart(self.headers.get("Content-Type", ""), body)
+                    file_id = state.new_id("file")
+                    state.files[file_id] = (name, data)
+                    self._send_json(200, state.file_object(file_id))
+                elif path.endswith("/batches"):
+                    req = json.loads(body or b"{}")
+                    batch_id = state.new_id("batch")
+                    state.batches[batch_id] = {
+                        "id": batch_id,
+                        "object": "batch",
+                        "endpoint": req.get("endpoint"),
+                        "input_file_id": req.get("input_file_id"),
+                        "completion_window": req.get("completion_window", "24h"),
+                        "status": "in_progress",
+                        "created_at": int(time.time()),
+                    }
+                    self._send_json(200, state.batches[batch_id])
+                else:
+                    self._not_found()
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            with state.lock:
+                m = re.search(r"/batches/([^/]+)$", path)
+                if m and m.group(1) in state.batches:
+                    batch = state.batches[m.group(1)]
+                    state.refresh_batch(batch)
+                    self._send_json(200, batch)
+                    return
+                m = re.search(r"/files/([^/]+)/content$", path)
+                if m and m.group(1) in state.files:
+                    self._send_raw(state.files[m.group(1)][1])
+                    return
+                m = re.search(r"/files/([^/]+)$", path)
+                if m and m.group(1) in state.files:
+                    self._send_json(200, state.file_object(m.group(1)))
+                    return
+                self._not_found()
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, batch_delay: float = 0.0, **options) -> ThreadingHTTPServer:
+    """
+    Start the stand-in in a background thread and return the server.
+    `options` (latency, jitter, error_rate, rpm, seed) go to FakeOpenAIState;
+    `server.state.counts` has the request counters.
+    """
+    state = FakeOpenAIState(batch_delay=batch_delay, **options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI API stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="Seconds before a batch completes.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every Responses call.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds on top of --latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of Responses calls failing with 500.")
+    parser.add_argument("--rpm", type=float, default=0.0, help="Responses calls per minute before 429 (0 = no limit).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    state = FakeOpenAIState(
+        batch_delay=args.batch_delay,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rpm=args.rpm,
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"[fake_openai] Listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
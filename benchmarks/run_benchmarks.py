@@ -0,0 +1,364 @@
+"""
+Offline benchmark suite: times the hot paths of the pipeline on synthetic
+corpora (1k / 10k / 100k papers) against local arXiv and OpenAI stand-ins,
+writes the results as JSON and compares them with a stored baseline.
+
+    python -m benchmarks.run_benchmarks                          # everything, default sizes
+    python -m benchmarks.run_benchmarks --only load_jsonl_db,synthesis --sizes 1k,10k
+    python -m benchmarks.run_benchmarks --latency 0.2 --error-rate 0.05 --rpm 600
+    python -m benchmarks.run_benchmarks --save-baseline          # -> benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --check                  # exit 1 on a regression
+
+Each result is the best of `--repeat` runs (end-to-end runs once).
+Results go to benchmarks/results/<timestamp>.json.
+"""
+
+import os
+
+# Ennen src-importteja: nopeat uudelleenyritykset ja ei arXiv-viivettä paikallista palvelinta vastaan
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("ARXIV_REQUEST_SPACING", "0")
+os.environ.setdefault("LLM_BACKOFF_BASE", "0.05")
+os.environ.setdefault("LLM_BACKOFF_MAX", "2")
+os.environ.pop("PAPERPILE_BIB_URL", None)
+
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import datetime as dt
+from typing import Callable, Dict, List, Optional
+
+from src import paper_store
+from src import fetch_papers
+from src.llm_cache import RESPONSE_CACHE
+from src.utils import load_jsonl_db, update_jsonl_db
+from src.fetch_bibtex import load_bibtex
+from src.update_knowledge_base import group_papers_by_phase, update_knowledge_markdown
+from src.analytics import update_statistics
+
+from benchmarks import fake_openai, fake_arxiv
+from benchmarks.synthetic import SIZES, parse_size, enriched_records, write_jsonl, write_bibtex
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Hitaampi kuin baseline * (1 + tolerance) ja vähintään NOISE_FLOOR sekuntia = regressio
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR_SECONDS = 0.005
+
+# End-to-end-ajon syötteet
+E2E_ARXIV_ENTRIES = 300
+E2E_BIB_ENTRIES = 200
+# Eri siemen kuin synteettisellä kannalla, muuten kaikki arXiv-paperit ovat duplikaatteja
+E2E_ARXIV_SEED = 3
+
+BENCHMARKS: Dict[str, Dict] = {}
+
+
+def benchmark(name: str, sizes: List[str]):
+    """Register a benchmark run at `sizes` by default. It returns {suffix: [seconds, ...]}."""
+    def register(fn):
+        BENCHMARKS[name] = {"fn": fn, "sizes": sizes}
+        return fn
+    return register
+
+
+def timed_runs(fn: Callable, repeat: int, prepare: Optional[Callable] = None) -> List[float]:
+    """Wall times of `repeat` calls; `prepare` runs untimed before each one. Output is silenced."""
+    times = []
+    for _ in range(repeat):
+        if prepare is not None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                prepare()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    return times
+
+
+def forget_stores() -> None:
+    """Drop the per-process store cache so the next open parses the file again."""
+    with paper_store._stores_lock:
+        paper_store._stores.clear()
+
+
+@contextlib.contextmanager
+def working_dir(path: str):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# -----------------------
+# Benchmarkit
+# -----------------------
+
+@benchmark("load_jsonl_db", ["1k", "10k", "100k"])
+def bench_load_jsonl_db(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    path = os.path.join(workdir, f"db_{n}.jsonl")
+    write_jsonl(path, enriched_records(n))
+    return {"": timed_runs(lambda: load_jsonl_db(path), args.repeat, prepare=forget_stores)}
+
+
+@benchmark("update_jsonl_db", ["1k", "10k", "100k"])
+def bench_update_jsonl_db(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    base = os.path.join(workdir, f"db_{n}.base.jsonl")
+    path = os.path.join(workdir, f"db_{n}.jsonl")
+    records = enriched_records(n)
+    write_jsonl(base, records)
+    # 1 % päivityksiä: puolet muuttuneita, puolet uusia
+    k = max(10, n // 100)
+    updates = [{**r, "summary_short": r["summary_short"] + " (revised)"} for r in records[: k // 2]]
+    updates += enriched_records(n + k - k // 2)[n:]
+
+    def prepare():
+        shutil.copyfile(base, path)
+        forget_stores()
+        load_jsonl_db(path)  # ajossa kanta on jo ladattu ennen päivitystä
+
+    return {"": timed_runs(lambda: update_jsonl_db(path, updates), args.repeat, prepare=prepare)}
+
+
+@benchmark("load_bibtex", ["1k", "10k"])
+def bench_load_bibtex(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    path = os.path.join(workdir, f"export_{n}.bib")
+    write_bibtex(path, n)
+    return {"": timed_runs(lambda: load_bibtex(path), args.repeat)}
+
+
+@benchmark("is_cognition_relevant", ["1k", "10k", "100k"])
+def bench_is_cognition_relevant(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    pairs = [(p["title"], p["abstract"]) for p in (fake_arxiv.synthetic_paper(i) for i in range(n))]
+    fetch_papers._is_cognition_relevant("warm", "up")  # matcher käännetään kerran
+
+    def run():
+        for title, abstract in pairs:
+            fetch_papers._is_cognition_relevant(title, abstract)
+
+    return {"": timed_runs(run, args.repeat)}
+
+
+@benchmark("group_papers_by_phase", ["1k", "10k", "100k"])
+def bench_group_papers_by_phase(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    records = enriched_records(n)
+    return {"": timed_runs(lambda: group_papers_by_phase(records), args.repeat)}
+
+
+@benchmark("synthesis", ["1k", "10k"])
+def bench_synthesis(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    """
+    `cold`: every section generated (no section store, no response cache);
+    `warm`: rerun on the unchanged corpus, every section reused.
+    """
+    run_dir = os.path.join(workdir, f"synthesis_{n}")
+    os.makedirs(os.path.join(run_dir, "data"), exist_ok=True)
+    write_jsonl(os.path.join(run_dir, "data", "papers_structured.jsonl"), enriched_records(n))
+    knowledge_dir = os.path.join(run_dir, "knowledge")
+    db_path = os.path.join(run_dir, "data", "papers_structured.jsonl")
+
+    def run():
+        update_knowledge_markdown(db_path=db_path, knowledge_dir=knowledge_dir)
+
+    cache_enabled = RESPONSE_CACHE.enabled
+    RESPONSE_CACHE.enabled = False
+    try:
+        cold = timed_runs(run, args.repeat, prepare=lambda: shutil.rmtree(knowledge_dir, ignore_errors=True))
+        warm = timed_runs(run, args.repeat)
+    finally:
+        RESPONSE_CACHE.enabled = cache_enabled
+    return {"cold": cold, "warm": warm}
+
+
+@benchmark("statistics", ["1k", "10k", "100k"])
+def bench_statistics(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    """
+    `full`: analytics index built from scratch and statistics.md rendered;
+    `incremental`: the same after 1 % more lines (half changed, half new)
+    were appended to an already counted database.
+    """
+    run_dir = os.path.join(workdir, f"statistics_{n}")
+    os.makedirs(run_dir, exist_ok=True)
+    records = enriched_records(n)
+    base = os.path.join(run_dir, "base.jsonl")
+    db_path = os.path.join(run_dir, "papers_structured.jsonl")
+    index_path = os.path.join(run_dir, "analytics_index.npz")
+    knowledge_dir = os.path.join(run_dir, "knowledge")
+    write_jsonl(base, records)
+    k = max(10, n // 100)
+    updates = [{**r, "tags": (r.get("tags") or []) + ["revised"]} for r in records[: k // 2]]
+    updates += enriched_records(n + k - k // 2)[n:]
+
+    def run():
+        update_statistics(db_path=db_path, knowledge_dir=knowledge_dir, index_path=index_path)
+
+    def prepare_full():
+        shutil.copyfile(base, db_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+    def prepare_incremental():
+        prepare_full()
+        run()
+        with open(db_path, "a", encoding="utf-8") as f:
+            for rec in updates:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    full = timed_runs(run, args.repeat, prepare=prepare_full)
+    incremental = timed_runs(run, args.repeat, prepare=prepare_incremental)
+    return {"full": full, "incremental": incremental}
+
+
+@benchmark("main", ["1k"])
+def bench_main(n: int, workdir: str, args) -> Dict[str, List[float]]:
+    """
+    Full `main()` run: `n` papers already in the database, a fresh arXiv
+    feed of E2E_ARXIV_ENTRIES entries and a BibTeX export of
+    E2E_BIB_ENTRIES entries (MAX_BIB_PER_RUN of them are enriched).
+    """
+    from src import main as main_module
+
+    template = os.path.join(workdir, f"main_{n}.template")
+    os.makedirs(os.path.join(template, "data"), exist_ok=True)
+    write_jsonl(os.path.join(template, "data", "papers_structured.jsonl"), enriched_records(n))
+    write_bibtex(os.path.join(template, "data", "paperpile.bib"), E2E_BIB_ENTRIES, seed=7)
+    run_dir = os.path.join(workdir, f"main_{n}")
+
+    def prepare():
+        shutil.rmtree(run_dir, ignore_errors=True)
+        shutil.copytree(template, run_dir)
+        forget_stores()
+
+    def run():
+        with working_dir(run_dir):
+            main_module.main([])
+
+    return {"": timed_runs(run, 1, prepare=prepare)}
+
+
+# -----------------------
+# Tulokset ja vertailu
+# -----------------------
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Print current vs. baseline for every shared benchmark; returns the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':36} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:36} {'-':>10} {result['seconds']:10.4f}")
+            continue
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] else float("inf")
+        regressed = (
+            result["seconds"] > base["seconds"] * (1 + tolerance)
+            and result["seconds"] - base["seconds"] > NOISE_FLOOR_SECONDS
+        )
+        flag = "  REGRESSION" if regressed else ("  faster" if ratio < 1 / (1 + tolerance) else "")
+        print(f"{name:36} {base['seconds']:10.4f} {result['seconds']:10.4f} {ratio:7.2f}{flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks.")
+    parser.add_argument("--only", help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--sizes", help=f"comma-separated sizes ({', '.join(SIZES)} or numbers); default per benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake OpenAI seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake OpenAI calls failing with 500")
+    parser.add_argument("--rpm", type=float, default=0.0, help="fake OpenAI requests per minute before 429")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if anything regressed")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--output", help="results file (default benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    fake_options = {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate, "rpm": args.rpm}
+    openai_server = fake_openai.serve(port=0, **fake_options)
+    arxiv_server = fake_arxiv.serve(port=0, entries=E2E_ARXIV_ENTRIES, seed=E2E_ARXIV_SEED)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{openai_server.server_address[1]}/v1"
+    fetch_papers.ARXIV_API_URL = f"http://127.0.0.1:{arxiv_server.server_address[1]}/api/query"
+
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="design-agent-bench-") as workdir:
+        for name in names:
+            spec = BENCHMARKS[name]
+            for size in args.sizes.split(",") if args.sizes else spec["sizes"]:
+                n = parse_size(size)
+                label = next((k for k, v in SIZES.items() if v == n), str(n))
+                print(f"[bench] {name}[{label}] ...", flush=True)
+                for suffix, runs in spec["fn"](n, workdir, args).items():
+                    key = f"{name}{'.' + suffix if suffix else ''}[{label}]"
+                    results[key] = {
+                        "n": n,
+                        "seconds": round(min(runs), 6),
+                        "mean_seconds": round(sum(runs) / len(runs), 6),
+                        "runs": len(runs),
+                    }
+                    print(f"[bench]   {key}: {min(runs):.4f}s (best of {len(runs)})", flush=True)
+
+    report = {
+        "meta": {
+            "timestamp": dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "fake_openai": {**fake_options, **openai_server.state.counts},
+            "fake_arxiv_requests": arxiv_server.state.requests,
+        },
+        "results": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(RESULTS_DIR, dt.datetime.utcnow().strftime("%Y%m%dT%H%M%S") + ".json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[bench] Results written to {output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f).get("results", {}), args.tolerance)
+    if args.save_baseline:
+        shutil.copyfile(output, args.baseline)
+        print(f"[bench] Baseline saved to {args.baseline}")
+
+    openai_server.shutdown()
+    arxiv_server.shutdown()
+    if regressions:
+        print(f"[bench] {len(regressions)} regression(s): {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
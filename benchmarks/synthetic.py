@@ -0,0 +1,119 @@
+"""
+Synthetic corpora for the benchmarks: enriched database records and
+Paperpile-style BibTeX exports of any size, deterministic per seed.
+
+    python -m benchmarks.synthetic --n 10k --jsonl /tmp/papers.jsonl --bib /tmp/export.bib
+"""
+
+import json
+import random
+import argparse
+from typing import Dict, Iterator, List
+
+from benchmarks.fake_arxiv import synthetic_paper, DESIGN_TERMS, AI_TERMS
+from src.update_knowledge_base import PHASES
+
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+REPRESENTATIONS = ["sketches", "text prompts", "3D models", "CAD", "images", "storyboards", "physical prototypes"]
+RESEARCH_TYPES = ["protocol study", "controlled experiment", "system paper", "case study", "survey", "RfD"]
+AI_ROLES = ["generative assistant", "critic", "co-creator", "search tool", "evaluator", "tutor"]
+
+
+def parse_size(value: str) -> int:
+    """"10k" -> 10000; plain integers are accepted too."""
+    return SIZES.get(value, None) or int(value)
+
+
+def enriched_record(i: int, seed: int = 0) -> Dict:
+    """One database record as it looks after LLM enrichment."""
+    rng = random.Random(seed * 7_919 + i)
+    paper = synthetic_paper(i, seed, offtopic=0.0)
+    year = rng.randint(1995, 2026)
+    source = "arxiv" if rng.random() < 0.6 else "bibtex"
+    paper_id = f"arxiv:{year % 100:02d}{rng.randint(1, 12):02d}.{i:06d}" if source == "arxiv" else f"bib:Synthetic{year}-{i:06d}"
+    return {
+        "id": paper_id,
+        "title": paper["title"],
+        "authors": paper["authors"],
+        "abstract": paper["abstract"],
+        "year": year,
+        "source": source,
+        "published": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00",
+        "categories": ["cs.HC"] if source == "arxiv" else ["bibtex"],
+        "design_phase": rng.sample(PHASES, rng.choice([0, 1, 1, 1, 2])),
+        "ai_roles": rng.sample(AI_ROLES, rng.randint(1, 2)),
+        "representations": rng.sample(REPRESENTATIONS, rng.randint(1, 3)),
+        "research_type": rng.sample(RESEARCH_TYPES, 1),
+        "summary_short": paper["abstract"][:240],
+        "implications_for_design_research": [
+            f"Tools for {rng.choice(DESIGN_TERMS)} should account for {rng.choice(AI_TERMS)}."
+            for _ in range(rng.randint(2, 4))
+        ],
+        "tags": sorted({t.replace(" ", "-").lower() for t in rng.sample(DESIGN_TERMS + AI_TERMS, rng.randint(3, 6))}),
+    }
+
+
+def enriched_records(n: int, seed: int = 0) -> List[Dict]:
+    return [enriched_record(i, seed) for i in range(n)]
+
+
+def write_jsonl(path: str, records: List[Dict]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def bibtex_entries(n: int, seed: int = 0) -> Iterator[str]:
+    """Raw @article entries in the shape Paperpile exports them."""
+    for i in range(n):
+        rng = random.Random(seed * 104_729 + i)
+        paper = synthetic_paper(i, seed + 1, offtopic=0.0)
+        year = rng.randint(1970, 2026)
+        authors = " and ".join(
+            f"{name.split()[-1]}, {name.split()[0]}" for name in paper["authors"]
+        )
+        venue = rng.choice(["Design Studies", "CoDesign", "Int. J. Des. Creat. Innov.", "CHI Conference on Human Factors"])
+        kind = "article" if rng.random() < 0.7 else "inproceedings"
+        venue_field = "journal" if kind == "article" else "booktitle"
+        abstract = f"  abstract = {{{paper['abstract']}}},\n" if rng.random() < 0.5 else ""
+        yield (
+            f"@{kind}{{Synthetic{year}-{i:06d},\n"
+            f"  title = {{{paper['title']}}},\n"
+            f"  author = {{{authors}}},\n"
+            f"  {venue_field} = {{{venue}}},\n"
+            f"  volume = {rng.randint(1, 80)},\n"
+            f"  pages = {{{rng.randint(1, 300)}--{rng.randint(301, 600)}}},\n"
+            f"  year = {year},\n"
+            f"{abstract}"
+            f"  doi = {{10.0000/synthetic.{i}}}\n"
+            "}\n"
+        )
+
+
+def write_bibtex(path: str, n: int, seed: int = 0) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in bibtex_entries(n, seed):
+            f.write(entry + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write synthetic corpora for benchmarking.")
+    parser.add_argument("--n", default="1k", help="1k, 10k, 100k or a number")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jsonl", help="write an enriched JSONL database here")
+    parser.add_argument("--bib", help="write a BibTeX export here")
+    args = parser.parse_args()
+
+    n = parse_size(args.n)
+    if args.jsonl:
+        write_jsonl(args.jsonl, enriched_records(n, args.seed))
+        print(f"[synthetic] Wrote {n} records to {args.jsonl}")
+    if args.bib:
+        write_bibtex(args.bib, n, args.seed)
+        print(f"[synthetic] Wrote {n} BibTeX entries to {args.bib}")
+
+
+if __name__ == "__main__":
+    main()
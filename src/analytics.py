@@ -0,0 +1,474 @@
+import os
+import json
+import zlib
+from typing import List, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .paper_record import PHASES, Vocabulary
+from .paper_store import open_store, sqlite_path_for
+
+
+# -----------------------
+# Perusasetukset
+# -----------------------
+
+ANALYTICS_INDEX_PATH = os.environ.get("ANALYTICS_INDEX_PATH", "data/analytics_index.npz")
+# Montako riviä/paria taulukoihin (tagit, roolit, tutkimustyypit)
+STATS_TOP_N = int(os.environ.get("STATS_TOP_N", "15"))
+# Vaihe x vuosi -taulukon vuosisarakkeet; vanhemmat yhdistetään "Earlier"-sarakkeeseen
+STATS_YEARS = int(os.environ.get("STATS_YEARS", "10"))
+
+UNCLASSIFIED = "(unclassified)"
+UNKNOWN_YEAR = "unknown"
+
+
+def _labels(value) -> List[str]:
+    """Field value -> distinct non-empty strings (a bare string counts as one)."""
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return list(dict.fromkeys(v for v in value if isinstance(v, str) and v))
+
+
+def _year_label(value) -> str:
+    try:
+        return str(int(value))
+    except (TypeError, ValueError):
+        return UNKNOWN_YEAR
+
+
+class CountMatrix:
+    """
+    2-D count matrix whose rows and columns are labelled through
+    vocabularies (the same vocabulary may serve both axes). Increments
+    are buffered and applied in one NumPy pass when `counts` is read;
+    the array grows when new labels appear.
+    """
+
+    def __init__(self, rows: Vocabulary, cols: Vocabulary, counts: Optional[np.ndarray] = None):
+        self.rows = rows
+        self.cols = cols
+        self._counts = counts if counts is not None else np.zeros((len(rows), len(cols)), dtype=np.int64)
+        self._pending_rows: List[int] = []
+        self._pending_cols: List[int] = []
+        self._pending_n: List[int] = []
+
+    def add(self, row_labels: List[str], col_labels: List[str], n: int = 1) -> None:
+        """Add `n` to every (row, col) cell of the two label lists."""
+        if not row_labels or not col_labels:
+            return
+        cols = [self.cols.intern(label) for label in col_labels]
+        for label in row_labels:
+            self._pending_rows.extend([self.rows.intern(label)] * len(cols))
+            self._pending_cols.extend(cols)
+        self._pending_n.extend([n] * (len(row_labels) * len(cols)))
+
+    @property
+    def counts(self) -> np.ndarray:
+        shape = (len(self.rows), len(self.cols))
+        if shape != self._counts.shape:
+            grown = np.zeros(shape, dtype=np.int64)
+            grown[: self._counts.shape[0], : self._counts.shape[1]] = self._counts
+            self._counts = grown
+        if self._pending_n:
+            cells = np.asarray(self._pending_rows, dtype=np.int64) * shape[1] + np.asarray(self._pending_cols, dtype=np.int64)
+            added = np.bincount(cells, weights=self._pending_n, minlength=shape[0] * shape[1])
+            self._counts += added.astype(np.int64).reshape(shape)
+            self._pending_rows, self._pending_cols, self._pending_n = [], [], []
+        return self._counts
+
+    def row(self, label: str) -> np.ndarray:
+        counts = self.counts
+        i = self.rows.id(label)
+        if i is None:
+            return np.zeros(counts.shape[1], dtype=np.int64)
+        return counts[i]
+
+    def labels(self, vocab: Vocabulary) -> List[str]:
+        return [vocab.name(i) for i in range(len(vocab))]
+
+
+class CoOccurrence:
+    """
+    Symmetric label x label counts (e.g. tag x tag) stored sparsely: the
+    vocabulary of free-form labels keeps growing, so only the non-zero
+    cells of the upper triangle (diagonal = papers per label) are kept,
+    as sorted NumPy arrays of `row << 32 | col` keys and counts.
+    Increments are buffered like in `CountMatrix`.
+    """
+
+    def __init__(self, labels: Vocabulary, keys: Optional[np.ndarray] = None, values: Optional[np.ndarray] = None):
+        self.labels = labels
+        self._keys = keys if keys is not None else np.zeros(0, dtype=np.int64)
+        self._values = values if values is not None else np.zeros(0, dtype=np.int64)
+        self._pending_keys: List[int] = []
+        self._pending_n: List[int] = []
+
+    def add(self, labels: List[str], n: int = 1) -> None:
+        """Add `n` to every pair (and the diagonal) of the distinct labels."""
+        ids = sorted(self.labels.intern(label) for label in labels)
+        for k, i in enumerate(ids):
+            for j in ids[k:]:
+                self._pending_keys.append(i << 32 | j)
+        self._pending_n.extend([n] * (len(ids) * (len(ids) + 1) // 2))
+
+    def cells(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(keys, counts) of the non-zero cells, keys ascending."""
+        if self._pending_n:
+            keys = np.concatenate([self._keys, np.asarray(self._pending_keys, dtype=np.int64)])
+            values = np.concatenate([self._values, np.asarray(self._pending_n, dtype=np.int64)])
+            self._keys, inverse = np.unique(keys, return_inverse=True)
+            self._values = np.bincount(inverse, weights=values, minlength=len(self._keys)).astype(np.int64)
+            nonzero = self._values != 0
+            self._keys, self._values = self._keys[nonzero], self._values[nonzero]
+            self._pending_keys, self._pending_n = [], []
+        return self._keys, self._values
+
+    def totals(self) -> np.ndarray:
+        """Diagonal as a dense array indexed by label id (papers per label)."""
+        keys, values = self.cells()
+        rows, cols = keys >> 32, keys & 0xFFFFFFFF
+        diagonal = rows == cols
+        totals = np.zeros(len(self.labels), dtype=np.int64)
+        totals[rows[diagonal]] = values[diagonal]
+        return totals
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(row ids, col ids, counts) of the off-diagonal cells, row < col."""
+        keys, values = self.cells()
+        rows, cols = keys >> 32, keys & 0xFFFFFFFF
+        off = rows != cols
+        return rows[off], cols[off], values[off]
+
+
+class CorpusAnalytics:
+    """
+    Count matrices over the paper database, kept up to date incrementally:
+      - phase x year       papers per design phase per year
+      - tag x tag          tag co-occurrence (diagonal = papers per tag), sparse
+      - role x phase       AI roles per design phase
+      - type x phase       research types per design phase
+
+    `update()` reads only the JSONL lines appended since the previous
+    update. A record whose id was counted before has its previous line
+    (still in the append-only file) subtracted first, so an update costs
+    O(new lines). If the file was compacted or rewritten in between, the
+    counts are rebuilt from the whole file.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self) -> None:
+        self.phases = Vocabulary(PHASES + [UNCLASSIFIED])
+        self.years = Vocabulary()
+        self.tags = Vocabulary()
+        self.roles = Vocabulary()
+        self.types = Vocabulary()
+        self.phase_year = CountMatrix(self.phases, self.years)
+        self.tag_tag = CoOccurrence(self.tags)
+        self.role_phase = CountMatrix(self.roles, self.phases)
+        self.type_phase = CountMatrix(self.types, self.phases)
+        self.offsets: Dict[str, int] = {}  # id -> laskettu rivi tiedostossa
+        self.position = 0  # tähän asti luettu tiedosto (tavuja)
+        self.tail: Optional[Tuple[int, int]] = None  # viimeisen luetun rivin (offset, crc32)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    # -----------------------
+    # Laskenta
+    # -----------------------
+
+    def add(self, record: Dict, n: int = 1) -> None:
+        """Count one record (`n=-1` removes an earlier count of it)."""
+        phases = _labels(record.get("design_phase")) or [UNCLASSIFIED]
+        tags = _labels(record.get("tags"))
+        self.phase_year.add(phases, [_year_label(record.get("year"))], n)
+        self.tag_tag.add(tags, n)
+        self.role_phase.add(_labels(record.get("ai_roles")), phases, n)
+        self.type_phase.add(_labels(record.get("research_type")), phases, n)
+
+    def rebuild(self, records: Iterable[Dict]) -> None:
+        """Recount from scratch (databases without an append-only file, e.g. SQLite)."""
+        self._reset()
+        for rec in records:
+            if rec.get("id"):
+                self.add(rec)
+                self.offsets[rec["id"]] = -1
+        self.tail = (-1, 0)  # ei tiedostoa, josta jatkaa
+
+    def _tail_matches(self, f) -> bool:
+        if self.tail is None:
+            return self.position == 0
+        offset, crc = self.tail
+        if offset < 0:
+            return False
+        f.seek(offset)
+        line = f.readline()
+        return offset + len(line) == self.position and zlib.crc32(line) == crc
+
+    def update(self, db_path: str) -> int:
+        """
+        Count the records stored since the previous update. Returns the
+        number of lines read. When `open_store` resolves `db_path` to
+        SQLite (a .sqlite path, or the main database with
+        PAPER_DB_BACKEND=sqlite), all records are recounted instead and
+        their number is returned.
+        """
+        if sqlite_path_for(db_path) is not None:
+            # sama päätös kuin open_storessa: SQLite lasketaan aina kokonaan
+            self.rebuild(open_store(db_path).all())
+            return len(self)
+        try:
+            f = open(db_path, "rb")
+        except FileNotFoundError:
+            self._reset()
+            return 0
+        with f:
+            if not self._tail_matches(f):
+                print(f"[analytics] {db_path} was rewritten since the last update, recounting.")
+                self._reset()
+            f.seek(self.position)
+            read = 0
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # kesken kirjoitettu rivi luetaan seuraavalla kerralla
+                offset = self.position
+                self.position += len(raw)
+                self.tail = (offset, zlib.crc32(raw))
+                line = raw.strip()
+                if not line:
+                    continue
+                read += 1
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                rec_id = rec.get("id") if isinstance(rec, dict) else None
+                if not rec_id:
+                    continue
+                previous = self.offsets.get(rec_id)
+                if previous is not None:
+                    here = f.tell()
+                    f.seek(previous)
+                    self.add(json.loads(f.readline()), -1)
+                    f.seek(here)
+                self.add(rec)
+                self.offsets[rec_id] = offset
+        return read
+
+    # -----------------------
+    # Tallennus
+    # -----------------------
+
+    def save(self, path: str = ANALYTICS_INDEX_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        ids = list(self.offsets)
+        meta = {
+            "position": self.position,
+            "tail": self.tail,
+            "phases": self.phase_year.labels(self.phases),
+            "years": self.phase_year.labels(self.years),
+            "tags": [self.tags.name(i) for i in range(len(self.tags))],
+            "roles": self.role_phase.labels(self.roles),
+            "types": self.type_phase.labels(self.types),
+        }
+        tag_keys, tag_counts = self.tag_tag.cells()
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            phase_year=self.phase_year.counts,
+            tag_keys=tag_keys,
+            tag_counts=tag_counts,
+            role_phase=self.role_phase.counts,
+            type_phase=self.type_phase.counts,
+            # id:t UTF-8-tavuina rivinvaihdoin (unicode-taulukko olisi nelinkertainen)
+            ids=np.frombuffer("\n".join(ids).encode("utf-8"), dtype=np.uint8),
+            offsets=np.fromiter((self.offsets[i] for i in ids), dtype=np.int64, count=len(ids)),
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = ANALYTICS_INDEX_PATH) -> "CorpusAnalytics":
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            counts = {name: data[name] for name in ("phase_year", "tag_keys", "tag_counts", "role_phase", "type_phase")}
+            offsets = data["offsets"]
+            ids = data["ids"].tobytes().decode("utf-8").split("\n") if len(offsets) else []
+        index.phases = Vocabulary(meta["phases"])
+        index.years = Vocabulary(meta["years"])
+        index.tags = Vocabulary(meta["tags"])
+        index.roles = Vocabulary(meta["roles"])
+        index.types = Vocabulary(meta["types"])
+        index.phase_year = CountMatrix(index.phases, index.years, counts["phase_year"])
+        index.tag_tag = CoOccurrence(index.tags, counts["tag_keys"], counts["tag_counts"])
+        index.role_phase = CountMatrix(index.roles, index.phases, counts["role_phase"])
+        index.type_phase = CountMatrix(index.types, index.phases, counts["type_phase"])
+        index.offsets = dict(zip(ids, offsets.tolist()))
+        index.position = meta["position"]
+        index.tail = tuple(meta["tail"]) if meta["tail"] else None
+        return index
+
+
+# -----------------------
+# Markdown
+# -----------------------
+
+def _table(header: List[str], rows: List[List], label_columns: int = 1) -> str:
+    """Markdown table; columns after the first `label_columns` are right-aligned counts."""
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|" + "|".join(["---"] * label_columns + ["---:"] * (len(header) - label_columns)) + "|",
+    ]
+    lines += ["| " + " | ".join(str(c) for c in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _top(counts: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the `n` largest non-zero counts, largest first (ties by index)."""
+    order = np.argsort(-counts, kind="stable")[:n]
+    return order[counts[order] > 0]
+
+
+def _phase_columns(analytics: CorpusAnalytics) -> List[Tuple[str, int]]:
+    """(phase, column) pairs with any papers, Howard et al. order first."""
+    totals = analytics.phase_year.counts.sum(axis=1)
+    names = analytics.phase_year.labels(analytics.phases)
+    ordered = PHASES + [p for p in names if p not in PHASES and p != UNCLASSIFIED] + [UNCLASSIFIED]
+    columns = []
+    for phase in ordered:
+        i = analytics.phases.id(phase)
+        if i is not None and totals[i]:
+            columns.append((phase, i))
+    return columns
+
+
+def _phase_year_table(analytics: CorpusAnalytics) -> str:
+    counts = analytics.phase_year.counts
+    years = analytics.phase_year.labels(analytics.years)
+    known = sorted((int(y), j) for j, y in enumerate(years) if y != UNKNOWN_YEAR and counts[:, j].any())
+    recent, earlier = known[-STATS_YEARS:], known[:-STATS_YEARS] if len(known) > STATS_YEARS else []
+    unknown = analytics.years.id(UNKNOWN_YEAR)
+
+    with_unknown = unknown is not None and bool(counts[:, unknown].any())
+    header = ["Design phase"] + (["Earlier"] if earlier else []) + [str(y) for y, _ in recent]
+    header += (["Unknown"] if with_unknown else []) + ["Total"]
+    rows = []
+    for phase, i in _phase_columns(analytics):
+        row = counts[i]
+        cells = [phase]
+        if earlier:
+            cells.append(int(row[[j for _, j in earlier]].sum()))
+        cells += [int(row[j]) for _, j in recent]
+        if with_unknown:
+            cells.append(int(row[unknown]))
+        cells.append(int(row.sum()))
+        rows.append(cells)
+    return _table(header, rows)
+
+
+def _by_phase_table(matrix: CountMatrix, vocab: Vocabulary, title: str, analytics: CorpusAnalytics) -> str:
+    counts = matrix.counts
+    columns = _phase_columns(analytics)
+    top = _top(counts.sum(axis=1), STATS_TOP_N)
+    if not len(top):
+        return "_None recorded yet._"
+    rows = [
+        [vocab.name(i)] + [int(counts[i, j]) for _, j in columns]
+        for i in top
+    ]
+    return _table([title] + [phase for phase, _ in columns], rows)
+
+
+def render_statistics_markdown(analytics: CorpusAnalytics) -> str:
+    """
+    knowledge/statistics.md from the count matrices (no LLM calls). The
+    page depends on the counts only (no run date), so it stays byte-for-byte
+    the same while no papers are added.
+    """
+    total = len(analytics)
+    parts = ["# AI & Design Research – Corpus Statistics\n"]
+    if not total:
+        parts.append("_No papers yet._\n")
+        return "\n".join(parts)
+
+    unclassified = int(analytics.phase_year.row(UNCLASSIFIED).sum())
+    parts.append(
+        f"_{total} papers, {total - unclassified} classified into design phases. "
+        f"Counted directly from the database; a paper with "
+        f"several phases, tags or roles is counted under each of them._\n"
+    )
+
+    parts.append("## Papers per design phase and year\n")
+    parts.append(_phase_year_table(analytics) + "\n")
+
+    tag_counts = analytics.tag_tag.totals()
+    parts.append("## Top tags\n")
+    top = _top(tag_counts, STATS_TOP_N)
+    if len(top):
+        parts.append(_table(
+            ["Tag", "Papers", "Share"],
+            [[analytics.tags.name(i), int(tag_counts[i]), f"{tag_counts[i] / total:.0%}"] for i in top],
+        ) + "\n")
+    else:
+        parts.append("_None recorded yet._\n")
+
+    parts.append("## Tags that occur together\n")
+    rows, cols, pair_counts = analytics.tag_tag.pairs()
+    top = _top(pair_counts, STATS_TOP_N)
+    if len(top):
+        parts.append(_table(
+            ["Tag", "Tag", "Papers"],
+            [[analytics.tags.name(rows[k]), analytics.tags.name(cols[k]), int(pair_counts[k])] for k in top],
+            label_columns=2,
+        ) + "\n")
+    else:
+        parts.append("_None recorded yet._\n")
+
+    parts.append("## AI roles by design phase\n")
+    parts.append(_by_phase_table(analytics.role_phase, analytics.roles, "AI role", analytics) + "\n")
+
+    parts.append("## Research types by design phase\n")
+    parts.append(_by_phase_table(analytics.type_phase, analytics.types, "Research type", analytics) + "\n")
+    return "\n".join(parts)
+
+
+# -----------------------
+# Pääfunktio
+# -----------------------
+
+def update_statistics(
+    db_path: str = "data/papers_structured.jsonl",
+    knowledge_dir: str = "knowledge",
+    index_path: str = ANALYTICS_INDEX_PATH,
+) -> str:
+    """
+    Bring the analytics index up to date with the database and write
+    knowledge/statistics.md. Returns the path of the page.
+    """
+    analytics = CorpusAnalytics.load(index_path)
+    read = analytics.update(db_path)
+    analytics.save(index_path)
+
+    os.makedirs(knowledge_dir, exist_ok=True)
+    path = os.path.join(knowledge_dir, "statistics.md")
+    markdown = render_statistics_markdown(analytics)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            unchanged = f.read() == markdown
+    except FileNotFoundError:
+        unchanged = False
+    if unchanged:
+        print(f"[analytics] Counted {read} new lines ({len(analytics)} papers). {path} unchanged.")
+        return path
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(markdown)
+    print(f"[analytics] Counted {read} new lines ({len(analytics)} papers). Updated {path}.")
+    return path
@@ -0,0 +1,259 @@
+import os
+import io
+import json
+import time
+import argparse
+from typing import List, Dict, Optional, Set
+
+from .classify_and_summarize import (
+    SYSTEM_PROMPT,
+    CLASSIFY_MODEL,
+    build_classification_input,
+    parse_classification,
+    validate_classification,
+)
+from .llm_cache import RESPONSE_CACHE, cache_key
+from .llm_client import get_client
+from .metrics import METRICS
+from .utils import load_jsonl_db, update_jsonl_db
+
+
+# -----------------------
+# Perusasetukset
+# -----------------------
+
+BATCH_STATE_PATH = "data/batch_state.json"
+BATCH_DIR = "data/batch"
+BATCH_ENDPOINT = "/v1/responses"
+COMPLETION_WINDOW = "24h"
+
+# Batch API:n tilat, joiden jälkeen erää ei enää kannata pollata
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# -----------------------
+# Tila (säilyy ajojen välillä)
+# -----------------------
+
+def load_batch_state(state_path: str = BATCH_STATE_PATH) -> Optional[Dict]:
+    """Returns the persisted state of the in-flight batch, or None."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_batch_state(state: Optional[Dict], state_path: str = BATCH_STATE_PATH) -> None:
+    if state is None:
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def pending_ids(state_path: str = BATCH_STATE_PATH) -> Set[str]:
+    """Paper ids that are already submitted in a batch and should not be enriched again."""
+    state = load_batch_state(state_path)
+    if not state:
+        return set()
+    return set(state.get("paper_ids", []))
+
+
+# -----------------------
+# Erän rakentaminen ja lähetys
+# -----------------------
+
+def build_batch_requests(papers: List[Dict], model: str = CLASSIFY_MODEL) -> List[Dict]:
+    """One Batch API request line per paper; custom_id is the paper id."""
+    requests = []
+    for p in papers:
+        requests.append(
+            {
+                "custom_id": p["id"],
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "input": [
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": build_classification_input(p)},
+                    ],
+                },
+            }
+        )
+    return requests
+
+
+def submit_batch(
+    papers: List[Dict],
+    state_path: str = BATCH_STATE_PATH,
+    batch_dir: str = BATCH_DIR,
+) -> Optional[Dict]:
+    """
+    Writes all papers as a Batch API JSONL file, uploads it and creates
+    the batch. The submitted papers are kept next to the state file so
+    the results can be merged back in a later run.
+    """
+    if not papers:
+        print("[batch_enrich] Nothing to submit.")
+        return None
+    if load_batch_state(state_path):
+        print("[batch_enrich] A batch is already in flight, not submitting another one.")
+        return None
+
+    os.makedirs(batch_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    input_path = os.path.join(batch_dir, f"batch_{stamp}_input.jsonl")
+    papers_path = os.path.join(batch_dir, f"batch_{stamp}_papers.jsonl")
+
+    with open(input_path, "w", encoding="utf-8") as f:
+        for req in build_batch_requests(papers):
+            f.write(json.dumps(req, ensure_ascii=False) + "\n")
+    with open(papers_path, "w", encoding="utf-8") as f:
+        for p in papers:
+            f.write(json.dumps(dict(p), ensure_ascii=False) + "\n")
+
+    client = get_client()
+    with open(input_path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW,
+    )
+
+    state = {
+        "batch_id": batch.id,
+        "input_file_id": input_file.id,
+        "status": batch.status,
+        "submitted_at": time.time(),
+        "model": CLASSIFY_MODEL,
+        "papers_path": papers_path,
+        "paper_ids": [p["id"] for p in papers],
+    }
+    save_batch_state(state, state_path)
+    print(f"[batch_enrich] Submitted batch {batch.id} with {len(papers)} papers.")
+    return state
+
+
+# -----------------------
+# Pollaus ja tulosten yhdistäminen
+# -----------------------
+
+def _output_text(body: Dict) -> Optional[str]:
+    """Pick the text out of a Responses API body (dict form)."""
+    for item in body.get("output") or []:
+        for part in item.get("content") or []:
+            if part.get("type") == "output_text" and "text" in part:
+                return part["text"]
+    return None
+
+
+def parse_batch_output(output_text: str, papers_by_id: Dict[str, Dict], model: str = CLASSIFY_MODEL) -> List[Dict]:
+    """
+    Merge Batch API output lines back into enriched paper records.
+    Failed or unparseable lines are skipped; those papers simply stay
+    pending and will be picked up by the normal enrichment path.
+    """
+    enriched_list: List[Dict] = []
+    for line in io.StringIO(output_text):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+        paper = papers_by_id.get(row.get("custom_id"))
+        response = row.get("response") or {}
+        if paper is None or row.get("error") or response.get("status_code") != 200:
+            continue
+
+        body = response.get("body") or {}
+        METRICS.record_llm_call(body.get("model") or model, usage=body.get("usage"), batch=True)
+        raw_text = _output_text(body)
+        if raw_text is None:
+            continue
+        enriched = validate_classification(parse_classification(raw_text))
+        if enriched is None:
+            print(f"[batch_enrich] JSON parse failed for {paper['id']}, leaving it for a later run.")
+            continue
+
+        # Sama vastaus välimuistiin, jotta synkroninen polku ei maksa siitä uudelleen
+        user_content = build_classification_input(paper)
+        RESPONSE_CACHE.put(cache_key(model, SYSTEM_PROMPT, user_content), raw_text, model=model)
+        enriched_list.append({**paper, **enriched})
+    return enriched_list
+
+
+def poll_batch(
+    db_path: str = "data/papers_structured.jsonl",
+    state_path: str = BATCH_STATE_PATH,
+) -> str:
+    """
+    Checks the in-flight batch once. When it has finished, its results
+    are ingested into the JSONL database in one pass and the state is
+    cleared. Returns the batch status ("none" if nothing is in flight).
+    """
+    state = load_batch_state(state_path)
+    if not state:
+        return "none"
+
+    client = get_client()
+    batch = client.batches.retrieve(state["batch_id"])
+    status = batch.status
+    print(f"[batch_enrich] Batch {state['batch_id']} status: {status}")
+
+    if status not in TERMINAL_STATUSES:
+        state["status"] = status
+        save_batch_state(state, state_path)
+        return status
+
+    # Myös vanhentuneesta erästä voi tulla osittaiset tulokset
+    enriched_list: List[Dict] = []
+    if getattr(batch, "output_file_id", None):
+        output_text = client.files.content(batch.output_file_id).text
+        papers_by_id = {p["id"]: p for p in load_jsonl_db(state["papers_path"])}
+        enriched_list = parse_batch_output(output_text, papers_by_id, model=state.get("model", CLASSIFY_MODEL))
+
+    if enriched_list:
+        update_jsonl_db(db_path, enriched_list)
+    missing = len(state.get("paper_ids", [])) - len(enriched_list)
+    print(f"[batch_enrich] Ingested {len(enriched_list)} papers from batch ({missing} not returned).")
+
+    save_batch_state(None, state_path)
+    return status
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Enrich the BibTeX backlog via the OpenAI Batch API.")
+    parser.add_argument("command", choices=["submit", "poll", "status"])
+    parser.add_argument("--db", default="data/papers_structured.jsonl")
+    parser.add_argument("--bib", default="data/paperpile.bib")
+    parser.add_argument("--state", default=BATCH_STATE_PATH)
+    parser.add_argument("--limit", type=int, default=None, help="Submit at most this many papers.")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        state = load_batch_state(args.state)
+        print(json.dumps({k: v for k, v in (state or {}).items() if k != "paper_ids"}, indent=2))
+    elif args.command == "poll":
+        poll_batch(args.db, args.state)
+    else:
+        from .fetch_bibtex import load_bibtex
+
+        existing_ids = {p["id"] for p in load_jsonl_db(args.db)}
+        papers = [p for p in load_bibtex(args.bib) if p["id"] not in existing_ids]
+        if args.limit:
+            papers = papers[: args.limit]
+        submit_batch(papers, args.state)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 import os
 import json
-from typing import List, Dict
-from openai import OpenAI
+import itertools
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import List, Dict, Iterable, Iterator, Optional, Callable, Tuple
+
+from .llm_cache import RESPONSE_CACHE, cache_key
+from .llm_client import MAX_CONCURRENCY, complete_text, discard_cached
+from .metrics import METRICS
 
 SYSTEM_PROMPT = """
 You are an expert in AI and design research, with deep knowledge of 
@@ -64,17 +69,67 @@ Return ONLY valid JSON.
 No Markdown, no comments, no natural language outside the JSON object.
 """
 
-def _get_client() -> OpenAI:
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set.")
-    return OpenAI(api_key=api_key)
+# Mallit vaiheittain: luokittelu (ja sen eskalointi) sekä kaskadin halpa ensikierros
+CLASSIFY_MODEL = os.environ.get("CLASSIFY_MODEL", "gpt-4o")
+# Kaskadi: tyhjä = pois päältä, esim. "gpt-4o-mini" luokittelee ensin ja vain
+# epävarmat tai skeemaan sopimattomat vastaukset luokitellaan uudelleen CLASSIFY_MODELilla
+CLASSIFY_CASCADE_MODEL = os.environ.get("CLASSIFY_CASCADE_MODEL", "")
+CASCADE_MIN_CONFIDENCE = float(os.environ.get("CLASSIFY_CASCADE_MIN_CONFIDENCE", "0.7"))
 
+# Montako paperia luokitellaan yhdellä pyynnöllä (1 = yksi paperi / pyyntö)
+CLASSIFY_BATCH_SIZE = int(os.environ.get("CLASSIFY_BATCH_SIZE", "8"))
 
-def classify_single_paper(paper: Dict) -> Dict:
-    client = _get_client()
+# Monen paperin tila: SYSTEM_PROMPT pysyy tavu tavulta samana etuliitteenä
+# (palveluntarjoajan prompt-välimuisti), ohje vain perään ja paperit user-viestiin.
+MULTI_PAPER_INSTRUCTIONS = """
+-----------------------------------------------
+## Several papers per request
+
+The user message is a JSON object {"papers": [...]}: each element has a
+"key" and the metadata of one paper. Classify every paper independently
+and return ONLY one JSON object of the form
+
+{"results": [{"key": "<key of the paper>", "design_phase": [...], "ai_roles": [...],
+  "representations": [...], "research_type": [...], "summary_short": "...",
+  "implications_for_design_research": [...], "tags": [...]}, ...]}
+
+with exactly one element per input paper, using the keys as given.
+"""
+MULTI_SYSTEM_PROMPT = SYSTEM_PROMPT + MULTI_PAPER_INSTRUCTIONS
+
+# Kaskadin ensikierros pyytää lisäksi varmuuden; ohje on viimeisenä, jotta
+# yhteinen etuliite säilyy
+CONFIDENCE_INSTRUCTIONS = """
+-----------------------------------------------
+## Confidence
 
-    payload = {
+Add the key "confidence" to every classification object: a number from 0
+to 1 saying how certain you are of the design_phase assignment given only
+this metadata. Give low values when the abstract is missing or vague, or
+when the paper could plausibly sit in another phase.
+"""
+CASCADE_SYSTEM_PROMPT = SYSTEM_PROMPT + CONFIDENCE_INSTRUCTIONS
+CASCADE_MULTI_SYSTEM_PROMPT = MULTI_SYSTEM_PROMPT + CONFIDENCE_INSTRUCTIONS
+
+# Luokitusvastauksen skeema: kenttä -> tyyppi (listat ovat merkkijonolistoja)
+CLASSIFICATION_SCHEMA = {
+    "design_phase": list,
+    "ai_roles": list,
+    "representations": list,
+    "research_type": list,
+    "summary_short": str,
+    "implications_for_design_research": list,
+    "tags": list,
+}
+
+
+def build_classification_input(paper: Dict) -> str:
+    """User message for one paper: the metadata payload as JSON."""
+    return json.dumps(_classification_payload(paper), ensure_ascii=False)
+
+
+def _classification_payload(paper: Dict) -> Dict:
+    return {
         "title": paper.get("title"),
         "abstract": paper.get("abstract"),
         "year": paper.get("year"),
@@ -83,16 +138,15 @@ def classify_single_paper(paper: Dict) -> Dict:
         "categories": paper.get("categories", []),
     }
 
-    completion = client.responses.create(
-        model="gpt-4o",   # sama malli kuin overviewssa
-        input=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-        ],
-#        response_format={"type": "json_object"},  # <-- TÄRKEÄ
-    )
 
-    raw_text = completion.output[0].content[0].text
+def build_multi_classification_input(papers: List[Dict]) -> str:
+    """User message for several papers; keys are P1..Pn in input order."""
+    items = [{"key": f"P{i + 1}", **_classification_payload(p)} for i, p in enumerate(papers)]
+    return json.dumps({"papers": items}, ensure_ascii=False)
+
+
+def parse_classification(raw_text: str) -> Optional[Dict]:
+    """Parse the model's JSON answer; returns None if it is not valid JSON."""
     # Yritetään varmistaa, että otetaan vain JSON-osa (jos malli vaikka laittaa vahingossa tekstiä ympärille)
     text = raw_text.strip()
 
@@ -104,34 +158,326 @@ def classify_single_paper(paper: Dict) -> Dict:
         if start != -1 and end != -1:
             text = text[start : end + 1]
     try:
-        enriched = json.loads(text)
+        return json.loads(text)
     except json.JSONDecodeError:
+        return None
+
+
+def validate_classification(obj, with_confidence: bool = False) -> Optional[Dict]:
+    """
+    Check one classification against CLASSIFICATION_SCHEMA: every field
+    present with the right type, lists holding only strings (and, with
+    `with_confidence`, a "confidence" number in 0..1). Returns just those
+    fields, or None if the object does not conform.
+    """
+    if not isinstance(obj, dict):
+        return None
+    result = {}
+    for field, kind in CLASSIFICATION_SCHEMA.items():
+        value = obj.get(field)
+        if not isinstance(value, kind):
+            return None
+        if kind is list and not all(isinstance(v, str) for v in value):
+            return None
+        result[field] = value
+    if with_confidence:
+        confidence = obj.get("confidence")
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+            return None
+        result["confidence"] = float(confidence)
+    return result
+
+
+def _fallback_classification(paper: Dict) -> Dict:
+    return {
+        "design_phase": [],
+        "ai_roles": [],
+        "representations": [],
+        "research_type": [],
+        "summary_short": paper.get("abstract", "")[:300],
+        "implications_for_design_research": [],
+        "tags": [],
+    }
+
+
+def _system_prompts(cascade: bool) -> Tuple[str, str]:
+    """(single-paper, multi-paper) system prompt of the large model or the cascade's first pass."""
+    if cascade:
+        return CASCADE_SYSTEM_PROMPT, CASCADE_MULTI_SYSTEM_PROMPT
+    return SYSTEM_PROMPT, MULTI_SYSTEM_PROMPT
+
+
+def _classify_one(paper: Dict, model: str, cascade: bool = False) -> Optional[Dict]:
+    """One paper, one request; the validated answer or None (not left in the cache)."""
+    system_prompt = _system_prompts(cascade)[0]
+    user_content = build_classification_input(paper)
+    with METRICS.timed("enrich_paper"):
+        raw_text = complete_text(system_prompt, user_content, model=model)
+    answer = validate_classification(parse_classification(raw_text), with_confidence=cascade)
+    if answer is None:
+        discard_cached(system_prompt, user_content, model=model)
+    return answer
+
+
+def classify_single_paper(paper: Dict) -> Dict:
+    """One paper on its own; an invalid answer gives the fallback stub (not used by the pipeline)."""
+    enriched = _classify_one(paper, CLASSIFY_MODEL)
+    if enriched is None:
         print("[classify_and_summarize] JSON parse failed, using fallback.")
-        enriched = {
-            "design_phase": [],
-            "ai_roles": [],
-            "representations": [],
-            "research_type": [],
-            "summary_short": paper.get("abstract", "")[:300],
-            "implications_for_design_research": [],
-            "tags": [],
-        }
+        enriched = _fallback_classification(paper)
 
     merged = {**paper, **enriched}
     return merged
 
 
-def enrich_papers_with_llm(papers: List[Dict]) -> List[Dict]:
+def classify_paper_batch(papers: List[Dict], model: str = CLASSIFY_MODEL, cascade: bool = False) -> Dict[int, Dict]:
     """
-    Ottaa listan paperi-dictejä (esim. arXiv tai BibTeX),
-    kutsuu LLM:ää jokaiselle ja palauttaa rikastetun listan.
+    Classify several papers with one request (MULTI_SYSTEM_PROMPT, or the
+    cascade's variant asking for confidence). Returns {index in `papers`:
+    validated answer} for the papers whose answer came back under the
+    right key and passed the schema; the rest are simply missing. Each
+    valid answer is cached under its single-paper key, so later runs hit
+    the cache whatever the grouping.
+    """
+    single_prompt, multi_prompt = _system_prompts(cascade)
+    user_content = build_multi_classification_input(papers)
+    # Ennakkotarkistukset eivät laske hutia; jokainen lähetetty paperi on yksi
+    RESPONSE_CACHE.record_misses(len(papers))
+    with METRICS.timed("enrich_batch"):
+        raw_text = complete_text(multi_prompt, user_content, model=model, use_cache=False)
+
+    parsed = parse_classification(raw_text)
+    items = parsed.get("results") if isinstance(parsed, dict) else parsed
+    if not isinstance(items, list):
+        return {}
+
+    by_key = {f"P{i + 1}": i for i in range(len(papers))}
+    answers: Dict[int, Dict] = {}
+    for item in items:
+        i = by_key.get(item.get("key")) if isinstance(item, dict) else None
+        answer = validate_classification(item, with_confidence=cascade) if i is not None else None
+        if answer is None or i in answers:
+            continue
+        answers[i] = answer
+        RESPONSE_CACHE.put(
+            cache_key(model, single_prompt, build_classification_input(papers[i])),
+            json.dumps(answer, ensure_ascii=False),
+            model=model,
+        )
+    return answers
+
+
+def _cached_classification(paper: Dict, model: str = CLASSIFY_MODEL, cascade: bool = False) -> Optional[Dict]:
+    """
+    Cached answer for one paper, or None. A miss is not counted here: it
+    is counted once the paper is actually sent to `model`.
     """
-    enriched_list: List[Dict] = []
-    for p in papers:
+    system_prompt = _system_prompts(cascade)[0]
+    key = cache_key(model, system_prompt, build_classification_input(paper))
+    raw_text = RESPONSE_CACHE.get(key, count_miss=False)
+    if raw_text is None:
+        return None
+    return validate_classification(parse_classification(raw_text), with_confidence=cascade)
+
+
+def _first_pass(papers: List[Dict], todo: List[int], results: Dict[int, Dict]) -> List[int]:
+    """
+    Cascade: classify `todo` with CLASSIFY_CASCADE_MODEL. Confident answers
+    go to `results`; returns the indices to escalate (low confidence,
+    schema-invalid or missing from the response).
+    """
+    model = CLASSIFY_CASCADE_MODEL
+    answers: Dict[int, Dict] = {}
+    for i in todo:
+        cached = _cached_classification(papers[i], model, cascade=True)
+        if cached is not None:
+            answers[i] = cached
+    rest = [i for i in todo if i not in answers]
+    try:
+        if len(rest) > 1:
+            batch = classify_paper_batch([papers[i] for i in rest], model=model, cascade=True)
+            answers.update({rest[j]: answer for j, answer in batch.items()})
+        elif rest:
+            answer = _classify_one(papers[rest[0]], model, cascade=True)
+            if answer is not None:
+                answers[rest[0]] = answer
+    except Exception as e:
+        print(f"[classify_and_summarize] First-pass request with {model} failed ({e}), escalating.")
+
+    escalate = []
+    for i in todo:
+        answer = answers.get(i)
+        if answer is not None and answer.pop("confidence") >= CASCADE_MIN_CONFIDENCE:
+            results[i] = {**papers[i], **answer}
+        else:
+            escalate.append(i)
+    # Tilastoihin vain tällä ajolla ensikierrokselle lähteneet paperit
+    sent_escalated = sum(1 for i in rest if i in escalate)
+    METRICS.record_cascade(model, CLASSIFY_MODEL, len(rest) - sent_escalated, sent_escalated)
+    if escalate:
+        print(f"[classify_and_summarize] Cascade: {len(escalate)} of {len(todo)} papers escalated to {CLASSIFY_MODEL}.")
+    return escalate
+
+
+def _full_pass(papers: List[Dict], todo: List[int], results: Dict[int, Dict]) -> None:
+    """Classify `todo` with CLASSIFY_MODEL: one batched request, then single retries."""
+    if len(todo) > 1:
+        try:
+            batch = classify_paper_batch([papers[i] for i in todo])
+        except Exception as e:
+            print(f"[classify_and_summarize] Batched request for {len(todo)} papers failed ({e}), retrying individually.")
+            batch = {}
+        for j, answer in batch.items():
+            results[todo[j]] = {**papers[todo[j]], **answer}
+        missing = [i for i in todo if i not in results]
+        if missing:
+            print(
+                f"[classify_and_summarize] {len(missing)} of {len(todo)} papers missing or malformed "
+                "in batched response, retrying individually."
+            )
+    else:
+        missing = todo
+
+    for i in missing:
         try:
-            enriched = classify_single_paper(p)
-            enriched_list.append(enriched)
+            answer = _classify_one(papers[i], CLASSIFY_MODEL)
         except Exception as e:
-            print(f"[classify_and_summarize] Error for paper {p.get('id')}: {e}")
+            print(f"[classify_and_summarize] Error for paper {papers[i].get('id')}: {e}")
+            continue
+        if answer is None:
+            # ei fallback-tynkää tietokantaan: kutsuja jonottaa paperin uudelleen
+            print(f"[classify_and_summarize] No valid classification for paper {papers[i].get('id')}, leaving it out.")
+            continue
+        results[i] = {**papers[i], **answer}
+
+
+def classify_papers(papers: List[Dict]) -> Dict[int, Dict]:
+    """
+    Classify a group of papers; returns {index in `papers`: enriched record}.
+    Cached answers are used first; the rest go out as one multi-paper
+    request. With CLASSIFY_CASCADE_MODEL set, that request goes to the
+    small model first and only uncertain or invalid answers are escalated
+    to CLASSIFY_MODEL. A paper missing from a response or malformed in it
+    is retried on its own (not given the fallback stub). Papers that
+    still fail are logged and left out of the result.
+    """
+    results: Dict[int, Dict] = {}
+    todo: List[int] = []
+    for i, p in enumerate(papers):
+        cached = _cached_classification(p)
+        if cached is not None:
+            results[i] = {**p, **cached}
+        else:
+            todo.append(i)
+
+    if CLASSIFY_CASCADE_MODEL and todo:
+        with METRICS.llm_stage("classify_first_pass"):
+            todo = _first_pass(papers, todo, results)
+    if todo:
+        with METRICS.llm_stage("classify_escalation" if CLASSIFY_CASCADE_MODEL else "classify"):
+            _full_pass(papers, todo, results)
+    return results
+
+
+def _chunks(papers: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    source = iter(papers)
+    while True:
+        chunk = list(itertools.islice(source, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def enrich_papers_with_llm(
+    papers: List[Dict],
+    max_workers: Optional[int] = None,
+    on_result: Optional[Callable[[Dict], None]] = None,
+    batch_size: int = CLASSIFY_BATCH_SIZE,
+) -> List[Dict]:
+    """
+    Ottaa listan paperi-dictejä (esim. arXiv tai BibTeX),
+    kutsuu LLM:ää rinnakkain (enintään `max_workers` yhtä aikaa,
+    oletus LLM_MAX_CONCURRENCY) ja palauttaa rikastetun listan
+    samassa järjestyksessä kuin syöte. Yksittäisen paperin virhe
+    ei kaada muita. Paperit luokitellaan `batch_size` kerrallaan
+    (CLASSIFY_BATCH_SIZE).
+
+    `on_result` is called with each enriched record as soon as it is
+    done (in completion order, from the calling thread), e.g. to
+    checkpoint it to the database before the rest finish.
+    """
+    if not papers:
+        print("[classify_and_summarize] Enriched 0 papers.")
+        return []
+
+    size = max(1, batch_size)
+    chunks = list(_chunks(papers, size))
+    workers = max(1, min(max_workers or MAX_CONCURRENCY, len(chunks)))
+    results: List[Optional[Dict]] = [None] * len(papers)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(classify_papers, chunk): n * size for n, chunk in enumerate(chunks)}
+        for fut in as_completed(futures):
+            offset = futures[fut]
+            try:
+                records = fut.result()
+            except Exception as e:
+                print(f"[classify_and_summarize] Error for papers starting at #{offset}: {e}")
+                continue
+            for j, record in sorted(records.items()):
+                results[offset + j] = record
+                if on_result is not None:
+                    on_result(record)
+
+    enriched_list: List[Dict] = [r for r in results if r is not None]
     print(f"[classify_and_summarize] Enriched {len(enriched_list)} papers.")
-    return enriched_list
\ No newline at end of file
+    return enriched_list
+
+
+def iter_enriched(
+    papers: Iterable[Dict],
+    max_workers: Optional[int] = None,
+    batch_size: int = CLASSIFY_BATCH_SIZE,
+    on_failed: Optional[Callable[[List[Dict]], None]] = None,
+) -> Iterator[Dict]:
+    """
+    Streaming variant of `enrich_papers_with_llm`: consumes `papers`
+    lazily (e.g. a generator fed by the harvester) and yields enriched
+    records in completion order. Papers are classified `batch_size` per
+    request; at most 2 x `max_workers` requests are taken from the input
+    ahead of the results, so memory stays flat however long the input is.
+
+    `on_failed` is called (from the calling thread) with the papers that
+    could not be enriched, e.g. to queue them for the next run.
+    """
+    workers = max(1, max_workers or MAX_CONCURRENCY)
+    max_pending = 2 * workers
+    done_count = 0
+    chunks = _chunks(papers, max(1, batch_size))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending[pool.submit(classify_papers, chunk)] = chunk
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                chunk = pending.pop(fut)
+                try:
+                    records = fut.result()
+                except Exception as e:
+                    print(f"[classify_and_summarize] Error for papers {', '.join(str(p.get('id')) for p in chunk)}: {e}")
+                    records = {}
+                failed = [p for i, p in enumerate(chunk) if i not in records]
+                if failed and on_failed is not None:
+                    on_failed(failed)
+                for _, record in sorted(records.items()):
+                    done_count += 1
+                    yield record
+    print(f"[classify_and_summarize] Enriched {done_count} papers.")
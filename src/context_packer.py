@@ -0,0 +1,120 @@
+import heapq
+import math
+from typing import List, Dict, Callable, Tuple
+
+try:
+    import tiktoken  # valinnainen: tarkka tokenilaskenta
+except ImportError:
+    tiktoken = None
+
+
+# Monimuotoisuuspainot: uusi vaihe / vuosi / tagi kontekstissa
+PHASE_WEIGHT = 0.6
+YEAR_WEIGHT = 0.3
+TAG_WEIGHT = 0.2
+# Kuinka paljon uutuus painaa relevanssissa (loput: sisällön täydellisyys)
+RECENCY_WEIGHT = 0.7
+
+_encodings: Dict[str, object] = {}
+
+
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    enc = _encodings.get(model)
+    if enc is None:
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+        _encodings[model] = enc
+    return enc
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count with tiktoken if installed, else ~4 characters per token."""
+    enc = _encoding(model)
+    if enc is not None:
+        return len(enc.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def _as_list(value) -> List[str]:
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _year(paper: Dict) -> int:
+    try:
+        return int(paper.get("year") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def relevance(paper: Dict, newest_year: int, oldest_year: int) -> float:
+    """0..1: recency within the candidate set plus how complete the record is."""
+    span = max(newest_year - oldest_year, 1)
+    recency = (_year(paper) - oldest_year) / span if _year(paper) else 0.0
+    completeness = 0.5 * bool(paper.get("summary_short")) + 0.5 * bool(paper.get("implications_for_design_research"))
+    return RECENCY_WEIGHT * recency + (1 - RECENCY_WEIGHT) * completeness
+
+
+def pack_context(
+    papers: List[Dict],
+    render: Callable[[Dict], str],
+    budget_tokens: int,
+    model: str = "gpt-4o",
+) -> Tuple[List[Dict], int]:
+    """
+    Greedy token-budgeted selection of context papers.
+
+    Each step takes the paper with the best relevance + diversity gain
+    (design phases, years and tags not yet covered) that still fits the
+    budget. Gains only shrink as coverage grows, so stale heap entries are
+    re-scored lazily instead of re-scoring every candidate each step.
+    Ties break on id, so the same corpus always packs the same context.
+
+    Returns (selected papers in selection order, tokens used).
+    """
+    if not papers or budget_tokens <= 0:
+        return [], 0
+    years = [_year(p) for p in papers if _year(p)]
+    newest, oldest = (max(years), min(years)) if years else (0, 0)
+
+    phases_seen, years_seen, tags_seen = set(), set(), set()
+
+    def gain(p: Dict) -> float:
+        new_phases = len(set(_as_list(p.get("design_phase"))) - phases_seen)
+        new_year = _year(p) not in years_seen
+        tags = set(_as_list(p.get("tags")))
+        new_tags = len(tags - tags_seen) / len(tags) if tags else 0.0
+        return (
+            relevance(p, newest, oldest)
+            + PHASE_WEIGHT * min(new_phases, 2) / 2
+            + YEAR_WEIGHT * new_year
+            + TAG_WEIGHT * new_tags
+        )
+
+    costs = [count_tokens(render(p), model) + 1 for p in papers]  # +1: rivinvaihto
+    heap = [(-gain(p), str(p.get("id")), i) for i, p in enumerate(papers)]
+    heapq.heapify(heap)
+
+    selected: List[Dict] = []
+    used = 0
+    while heap:
+        _, pid, i = heapq.heappop(heap)
+        if used + costs[i] > budget_tokens:
+            continue  # ei mahdu; pienempi voi vielä mahtua
+        score = gain(papers[i])
+        if heap and score < -heap[0][0]:
+            heapq.heappush(heap, (-score, pid, i))
+            continue
+        p = papers[i]
+        selected.append(p)
+        used += costs[i]
+        phases_seen.update(_as_list(p.get("design_phase")))
+        years_seen.add(_year(p))
+        tags_seen.update(_as_list(p.get("tags")))
+    return selected, used
+
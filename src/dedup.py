@@ -0,0 +1,282 @@
+import os
+import re
+import json
+import zlib
+import unicodedata
+from typing import List, Dict, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+
+# -----------------------
+# Perusasetukset
+# -----------------------
+
+DEDUP_INDEX_PATH = "data/dedup_index.npz"
+NUM_PERM = 64
+BANDS = 16  # 16 kaistaa x 4 riviä: ehdokkaaksi jo noin Jaccard >= 0.5
+ROWS = NUM_PERM // BANDS
+# Otsikoiden trigrammi-Jaccard, jonka ylittävät ovat samaa paperia
+TITLE_SIMILARITY = float(os.environ.get("DEDUP_TITLE_SIMILARITY", "0.8"))
+# Tätä lyhyemmät otsikot hyväksytään vain täsmälleen samoina
+MIN_SHINGLES = 12
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240611)
+_PERM_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+# Raakametatiedot, jotka kanoninen tietue voi täydentää duplikaatista
+MERGE_FIELDS = ["abstract", "authors", "doi", "url", "published"]
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase ASCII words only: LaTeX braces, accents and punctuation dropped."""
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def title_shingles(title: str) -> Set[str]:
+    norm = normalize_title(title)
+    return {norm[i:i + 3] for i in range(len(norm) - 2)}
+
+
+def author_surnames(authors) -> Set[str]:
+    """Surnames from both "First Last" (arXiv) and "Last, First" (BibTeX) names."""
+    if isinstance(authors, str):
+        authors = authors.split(" and ")
+    surnames = set()
+    for name in authors or []:
+        name = name.strip()
+        part = name.split(",")[0] if "," in name else (name.split() or [""])[-1]
+        part = normalize_title(part)
+        if part:
+            surnames.add(part.split()[-1])
+    return surnames
+
+
+def minhash(shingles: Iterable[str]) -> np.ndarray:
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64
+    )
+    if not len(hashes):
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+    values = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME
+    return values.min(axis=1).astype(np.uint32)
+
+
+class DuplicateIndex:
+    """
+    MinHash/LSH index over normalised paper titles.
+
+    Lookups only touch the papers that share an LSH band with the query,
+    so matching stays sub-linear as the database grows. Candidates are
+    confirmed when the estimated title Jaccard reaches TITLE_SIMILARITY and,
+    if both sides list authors, they share at least one surname (this
+    tolerates a missing abstract, which most BibTeX entries lack).
+    Aliases map merged-away ids (e.g. a `bib:` key) to the canonical id.
+    """
+
+    def __init__(self):
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.titles: Dict[str, str] = {}
+        self.surnames: Dict[str, List[str]] = {}
+        self.aliases: Dict[str, str] = {}
+        self._buckets: Dict[bytes, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def __contains__(self, paper_id: str) -> bool:
+        return paper_id in self.signatures
+
+    @staticmethod
+    def _band_keys(sig: np.ndarray) -> List[bytes]:
+        return [bytes([b]) + sig[b * ROWS:(b + 1) * ROWS].tobytes() for b in range(BANDS)]
+
+    def _insert(self, paper_id: str, sig: np.ndarray, title: str, surnames: List[str]) -> None:
+        self.signatures[paper_id] = sig
+        self.titles[paper_id] = title
+        self.surnames[paper_id] = surnames
+        for key in self._band_keys(sig):
+            self._buckets.setdefault(key, []).append(paper_id)
+
+    def add(self, paper: Dict) -> None:
+        """Index one paper (and its aliases), replacing any earlier entry for its id."""
+        paper_id = paper.get("id")
+        if not paper_id:
+            return
+        self.remove(paper_id)
+        title = normalize_title(paper.get("title", ""))
+        sig = minhash(title_shingles(title))
+        self._insert(paper_id, sig, title, sorted(author_surnames(paper.get("authors"))))
+        for alias in paper.get("aliases") or []:
+            self.aliases[alias] = paper_id
+
+    def remove(self, paper_id: str) -> None:
+        sig = self.signatures.pop(paper_id, None)
+        if sig is None:
+            return
+        self.titles.pop(paper_id, None)
+        self.surnames.pop(paper_id, None)
+        for key in self._band_keys(sig):
+            bucket = self._buckets.get(key)
+            if bucket and paper_id in bucket:
+                bucket.remove(paper_id)
+                if not bucket:
+                    del self._buckets[key]
+        for alias in [a for a, c in self.aliases.items() if c == paper_id]:
+            del self.aliases[alias]
+
+    def sync(self, papers: Iterable[Dict]) -> int:
+        """
+        Bring the index in line with the database: index records it has
+        not seen (or whose title changed) and drop ids no longer stored.
+        Returns the number of records (re)indexed.
+        """
+        live = set()
+        changed = 0
+        for p in papers:
+            paper_id = p.get("id")
+            if not paper_id:
+                continue
+            live.add(paper_id)
+            aliases = p.get("aliases") or []
+            if (
+                paper_id not in self.signatures
+                or self.titles.get(paper_id) != normalize_title(p.get("title", ""))
+                or any(self.aliases.get(a) != paper_id for a in aliases)
+            ):
+                self.add(p)
+                changed += 1
+        for paper_id in [i for i in self.signatures if i not in live]:
+            self.remove(paper_id)
+        return changed
+
+    def find_duplicate(self, paper: Dict) -> Optional[str]:
+        """Id of an indexed paper that is the same work as `paper`, or None."""
+        paper_id = paper.get("id")
+        if paper_id in self.aliases:
+            return self.aliases[paper_id]
+        title = normalize_title(paper.get("title", ""))
+        if not title:
+            return None
+        shingles = title_shingles(title)
+        sig = minhash(shingles)
+        surnames = author_surnames(paper.get("authors"))
+
+        candidates = set()
+        for key in self._band_keys(sig):
+            candidates.update(self._buckets.get(key, ()))
+        candidates.discard(paper_id)
+
+        best, best_score = None, 0.0
+        for cand in candidates:
+            if len(shingles) < MIN_SHINGLES:
+                score = 1.0 if self.titles[cand] == title else 0.0
+            else:
+                score = float(np.mean(self.signatures[cand] == sig))
+            if score < TITLE_SIMILARITY or score <= best_score:
+                continue
+            cand_surnames = self.surnames.get(cand) or []
+            if surnames and cand_surnames and not surnames.intersection(cand_surnames):
+                continue
+            best, best_score = cand, score
+        return best
+
+    def split_duplicates(self, papers: List[Dict]) -> Tuple[List[Dict], List[Tuple[Dict, str]]]:
+        """
+        Split incoming papers into (fresh, [(duplicate, canonical_id)]).
+        Fresh papers are indexed right away, so a paper seen twice in the
+        same run (e.g. on arXiv and in Paperpile) is also caught.
+        """
+        fresh: List[Dict] = []
+        duplicates: List[Tuple[Dict, str]] = []
+        for p in papers:
+            canonical = self.find_duplicate(p)
+            if canonical is None:
+                self.add(p)
+                fresh.append(p)
+            else:
+                duplicates.append((p, canonical))
+        return fresh, duplicates
+
+    # -----------------------
+    # Tallennus
+    # -----------------------
+
+    def save(self, path: str = DEDUP_INDEX_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        ids = list(self.signatures)
+        meta = {
+            "ids": ids,
+            "titles": [self.titles[i] for i in ids],
+            "surnames": [self.surnames[i] for i in ids],
+            "aliases": self.aliases,
+        }
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            signatures=np.stack([self.signatures[i] for i in ids]) if ids else np.zeros((0, NUM_PERM), np.uint32),
+            meta=np.array(json.dumps(meta, ensure_ascii=False)),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = DEDUP_INDEX_PATH) -> "DuplicateIndex":
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as data:
+            signatures = data["signatures"]
+            meta = json.loads(str(data["meta"]))
+        for i, paper_id in enumerate(meta["ids"]):
+            index._insert(paper_id, signatures[i], meta["titles"][i], meta["surnames"][i])
+        index.aliases = dict(meta.get("aliases", {}))
+        return index
+
+
+def load_dedup_index(papers: Iterable[Dict], path: str = DEDUP_INDEX_PATH) -> DuplicateIndex:
+    """Load the persisted index and sync it with the current database records."""
+    index = DuplicateIndex.load(path)
+    changed = index.sync(papers)
+    print(f"[dedup] Index has {len(index)} papers, {len(index.aliases)} aliases ({changed} reindexed).")
+    return index
+
+
+def merge_duplicate(canonical: Dict, duplicate: Dict) -> Dict:
+    """
+    Canonical record with the duplicate's id added to `aliases`; empty
+    metadata fields are filled from the duplicate.
+    """
+    merged = dict(canonical)
+    aliases = list(merged.get("aliases") or [])
+    if duplicate["id"] not in aliases and duplicate["id"] != merged.get("id"):
+        aliases.append(duplicate["id"])
+    merged["aliases"] = aliases
+    for field in MERGE_FIELDS:
+        if not merged.get(field) and duplicate.get(field):
+            merged[field] = duplicate[field]
+    return merged
+
+
+def merge_duplicates(
+    duplicates: List[Tuple[Dict, str]],
+    records: Dict[str, Dict],
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Fold duplicates into their canonical records (looked up in `records`).
+    Returns (updated canonical records, duplicates that were merged);
+    duplicates whose canonical record is not stored yet are left out and
+    come back on the next run.
+    """
+    updated: Dict[str, Dict] = {}
+    merged: List[Dict] = []
+    for dup, canonical_id in duplicates:
+        base = updated.get(canonical_id) or records.get(canonical_id)
+        if base is None:
+            continue
+        updated[canonical_id] = merge_duplicate(base, dup)
+        merged.append(dup)
+        print(f"[dedup] '{dup.get('title', '')[:60]}' ({dup['id']}) is a duplicate of {canonical_id}")
+    return list(updated.values()), merged
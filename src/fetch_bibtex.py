@@ -1,10 +1,15 @@
 import os
-from typing import List, Dict
+import re
+import json
+import hashlib
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 
 import bibtexparser
 from bibtexparser.bparser import BibTexParser
 from bibtexparser.customization import convert_to_unicode
 
+from .metrics import METRICS
+
 
 def load_bibtex(path: str) -> List[Dict]:
     """
@@ -27,13 +32,65 @@ def load_bibtex(path: str) -> List[Dict]:
 
     print(f"[fetch_bibtex] Loading BibTeX: {path}")
 
+    with METRICS.timed("bibtex_parse"):
+        papers = list(iter_bibtex(path))
+
+    print(f"[fetch_bibtex] Loaded {len(papers)} entries from BibTeX.")
+
+    return papers
+
+
+# Kerralla jäsennettävien merkintöjen määrä streamaavassa latauksessa
+BIB_CHUNK_ENTRIES = 50
+
+
+def iter_bibtex(path: str, chunk_size: int = BIB_CHUNK_ENTRIES) -> Iterator[Dict]:
+    """
+    Streaming variant of `load_bibtex`: reads the file line by line and
+    parses `chunk_size` entries at a time, so only one chunk of raw text
+    and parsed entries is held in memory. @string macros seen so far are
+    passed along with every chunk.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"BibTeX file not found: {path}")
+
+    macros: List[str] = []
+    chunk: List[str] = []
+    current: List[str] = []
+
+    def take_entry() -> None:
+        raw = "".join(current).strip()
+        current.clear()
+        m = ENTRY_START_RE.match(raw)
+        if not m:
+            return
+        entry_type = m.group(1).lower()
+        if entry_type in NON_ENTRY_TYPES:
+            if entry_type != "comment":
+                macros.append(raw)
+            return
+        chunk.append(raw)
+
     with open(path, "r") as bibtex_file:
-        parser = BibTexParser()
-        parser.customization = convert_to_unicode
-        bib_database = bibtexparser.load(bibtex_file, parser=parser)
+        for line in bibtex_file:
+            if ENTRY_START_RE.match(line):
+                take_entry()
+                if len(chunk) >= chunk_size:
+                    yield from _parse_bibtex_text("\n\n".join(macros + chunk))
+                    chunk.clear()
+            current.append(line)
+    take_entry()
+    if chunk:
+        yield from _parse_bibtex_text("\n\n".join(macros + chunk))
 
-    papers: List[Dict] = []
 
+def _parse_bibtex_text(text: str) -> List[Dict]:
+    """Parse BibTeX source text into the unified paper structure."""
+    parser = BibTexParser()
+    parser.customization = convert_to_unicode
+    bib_database = bibtexparser.loads(text, parser=parser)
+
+    papers: List[Dict] = []
     for entry in bib_database.entries:
         # Skip items missing title
         if "title" not in entry:
@@ -78,6 +135,159 @@ def load_bibtex(path: str) -> List[Dict]:
             }
         )
 
-    print(f"[fetch_bibtex] Loaded {len(papers)} entries from BibTeX.")
+    return papers
+
+
+# -----------------------
+# Inkrementaalinen lataus (manifest: citekey -> hash)
+# -----------------------
+
+# Merkinnän alku rivin alussa: @TYPE{key,
+ENTRY_START_RE = re.compile(r"^@\s*(\w+)\s*[{(]\s*([^,\s]*)", re.MULTILINE)
+
+# Nämä eivät ole julkaisuja, mutta @string-makrot tarvitaan osittaisessa jäsennyksessä
+NON_ENTRY_TYPES = {"string", "preamble", "comment"}
+
+
+def split_bibtex_entries(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Split BibTeX source into raw entries without parsing them.
+    Returns (macros, [(citation_key, raw_entry_text), ...]) where macros is
+    the concatenated @string/@preamble blocks.
+    """
+    matches = list(ENTRY_START_RE.finditer(text))
+    macros: List[str] = []
+    entries: List[Tuple[str, str]] = []
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        raw = text[m.start():end].strip()
+        entry_type = m.group(1).lower()
+        if entry_type in NON_ENTRY_TYPES:
+            if entry_type != "comment":
+                macros.append(raw)
+            continue
+        entries.append((m.group(2), raw))
+    return "\n\n".join(macros), entries
+
+
+def entry_hash(raw_entry: str) -> str:
+    return hashlib.sha256(raw_entry.strip().encode("utf-8")).hexdigest()
+
+
+def bib_manifest_path(bib_path: str) -> str:
+    """data/paperpile.bib -> data/paperpile.manifest.json"""
+    return os.path.splitext(bib_path)[0] + ".manifest.json"
+
+
+def load_bib_manifest(path: str) -> Dict:
+    """
+    Manifest of the last ingest: {"entries": {citekey: hash}} for entries
+    stored in the database, {"skipped": {citekey: hash}} for entries that
+    yield no paper (e.g. no title) and need not be parsed again, and
+    "pending": how many entries were still waiting for enrichment.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        data = {}
+    manifest = {"entries": data.get("entries", {}), "skipped": data.get("skipped", {})}
+    if "pending" in data:
+        manifest["pending"] = data["pending"]
+    return manifest
+
+
+def save_bib_manifest(path: str, manifest: Dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=0, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_bibtex_changes(
+    path: str,
+    manifest: Dict,
+    known: Optional[Dict[str, Optional[str]]] = None,
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Incremental variant of `load_bibtex`. Entries are hashed without
+    parsing; only entries that are new, changed since the manifest, or
+    not yet in the database are parsed.
+
+    `known` maps the ids already in the database to the `bib_hash` they
+    were enriched from (None for records from before the manifest existed;
+    those are taken as up to date and only recorded in the manifest).
+
+    Returns (new_papers, changed_papers). Changed papers are already in
+    the database but their raw entry differs from the manifest, so they
+    need re-enrichment. Every returned paper carries its `bib_hash`;
+    record it in the manifest (`commit_bib_hashes`) once it is stored.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"BibTeX file not found: {path}")
+    known = known or {}
+    stored = manifest.setdefault("entries", {})
+    skipped = manifest.setdefault("skipped", {})
+
+    with open(path, "r") as bibtex_file:
+        macros, entries = split_bibtex_entries(bibtex_file.read())
+
+    # Sama avain voi esiintyä useasti; hashataan kaikki sen merkinnät yhdessä
+    raw_by_key: Dict[str, List[str]] = {}
+    for key, raw in entries:
+        raw_by_key.setdefault(key, []).append(raw)
+
+    to_parse: Dict[str, str] = {}
+    hashes: Dict[str, str] = {}
+    changed_ids: Set[str] = set()
+    for key, raws in raw_by_key.items():
+        h = entry_hash("\n".join(raws))
+        paper_id = f"bib:{key.replace(' ', '_')}"
+        previous = stored.get(key)
+        if skipped.get(key) == h or (previous == h and paper_id in known):
+            continue  # ennallaan ja jo käsitelty
+        if paper_id in known:
+            if known[paper_id] == h or (previous is None and known[paper_id] is None):
+                # kanta vastaa jo tätä merkintää (esim. batch-ajo tai vanha tietue)
+                stored[key] = h
+                continue
+            changed_ids.add(paper_id)
+        hashes[paper_id] = h
+        to_parse[key] = "\n\n".join(raws)
+
+    if not to_parse:
+        print(f"[fetch_bibtex] {path}: all {len(raw_by_key)} entries unchanged.")
+        return [], []
+
+    with METRICS.timed("bibtex_parse"):
+        papers = _parse_bibtex_text(macros + "\n\n" + "\n\n".join(to_parse.values()))
+    new_papers: List[Dict] = []
+    changed_papers: List[Dict] = []
+    by_id: Dict[str, Dict] = {}
+    for p in papers:
+        if p["id"] in hashes:
+            by_id[p["id"]] = p  # viimeinen samalla avaimella voittaa, kuten kannassa
+    for p in by_id.values():
+        p["bib_hash"] = hashes[p["id"]]
+        (changed_papers if p["id"] in changed_ids else new_papers).append(p)
+
+    # Merkinnät, joista ei tule paperia, merkitään ohitetuiksi
+    for key in to_parse:
+        paper_id = f"bib:{key.replace(' ', '_')}"
+        if paper_id not in by_id:
+            skipped[key] = hashes[paper_id]
+
+    print(
+        f"[fetch_bibtex] {path}: parsed {len(to_parse)} of {len(raw_by_key)} entries "
+        f"({len(new_papers)} new/pending, {len(changed_papers)} changed)."
+    )
+    return new_papers, changed_papers
+
 
-    return papers
\ No newline at end of file
+def commit_bib_hashes(manifest: Dict, papers: List[Dict]) -> None:
+    """Record the entry hashes of papers that are now stored in the database."""
+    stored = manifest.setdefault("entries", {})
+    for p in papers:
+        if p.get("bib_hash") and p.get("id", "").startswith("bib:"):
+            stored[p["id"][len("bib:"):]] = p["bib_hash"]
@@ -1,22 +1,124 @@
 import os
+import json
+import hashlib
+from typing import Dict, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+
+# Paluuarvot: main voi ohittaa BibTeX-vaiheen, jos tiedosto ei muuttunut
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+ERROR = "error"
+
+# (connect, read) sekunteina
+TIMEOUT = (10, 60)
+CHUNK_SIZE = 64 * 1024
+
+_session: Optional[requests.Session] = None
+
+
+def get_session() -> requests.Session:
+    """Shared HTTP session with connection pooling."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=2)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def _meta_path(dest_path: str) -> str:
+    return dest_path + ".meta.json"
+
+
+def _load_meta(dest_path: str) -> Dict:
+    try:
+        with open(_meta_path(dest_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
 
-def download_paperpile_bib(dest_path="data/paperpile.bib"):
-    url = os.environ.get("PAPERPILE_BIB_URL")
+def _save_meta(dest_path: str, meta: Dict) -> None:
+    with open(_meta_path(dest_path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def _file_sha256(path: str) -> Optional[str]:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def download_paperpile_bib(dest_path="data/paperpile.bib", url: Optional[str] = None) -> str:
+    """
+    Downloads the Paperpile BibTeX export (PAPERPILE_BIB_URL) if it changed.
+
+    Uses a conditional request (ETag / Last-Modified stored in
+    `<dest_path>.meta.json`), streams the body to a temp file and renames
+    it into place only when its sha256 differs from the current file.
+
+    Returns "updated", "unchanged", "skipped" (no URL) or "error".
+    """
+    url = url or os.environ.get("PAPERPILE_BIB_URL")
     if not url:
         print("[download_paperpile_bib] No PAPERPILE_BIB_URL defined, skipping download.")
-        return False
+        return SKIPPED
 
     print(f"[download_paperpile_bib] Downloading BibTeX from: {url}")
 
+    meta = _load_meta(dest_path)
+    headers = {}
+    if os.path.exists(dest_path) and meta.get("url") == url:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    tmp_path = dest_path + ".part"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-        with open(dest_path, "w", encoding="utf-8") as f:
-            f.write(response.text)
+        with get_session().get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            if response.status_code == 304:
+                print("[download_paperpile_bib] Not modified (304), keeping local copy.")
+                return UNCHANGED
+            response.raise_for_status()
+
+            h = hashlib.sha256()
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    h.update(chunk)
+            digest = h.hexdigest()
+
+            new_meta = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256": digest,
+            }
+
+        previous = meta.get("sha256") or _file_sha256(dest_path)
+        if previous == digest and os.path.exists(dest_path):
+            os.remove(tmp_path)
+            _save_meta(dest_path, new_meta)
+            print("[download_paperpile_bib] Content unchanged, keeping local copy.")
+            return UNCHANGED
+
+        os.replace(tmp_path, dest_path)
+        _save_meta(dest_path, new_meta)
         print(f"[download_paperpile_bib] Saved to {dest_path}")
-        return True
+        return UPDATED
     except Exception as e:
         print(f"[download_paperpile_bib] Error downloading BibTeX: {e}")
-        return False
\ No newline at end of file
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return ERROR
@@ -1,9 +1,33 @@
+import os
+import json
+import time
+import hashlib
 import datetime as dt
 import urllib.parse
+import urllib.request
 import feedparser
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 
-ARXIV_API_URL = "http://export.arxiv.org/api/query"
+from .keyword_matcher import KeywordMatcher, MatchResult, load_matcher
+from .utils import parse_arxiv_id, content_hash
+from .metrics import METRICS
+
+# Paikallinen korvike offline-ajoihin: ARXIV_API_URL=http://127.0.0.1:8766/api/query (benchmarks.fake_arxiv)
+ARXIV_API_URL = os.environ.get("ARXIV_API_URL", "http://export.arxiv.org/api/query")
+
+# arXiv API:n ohje: korkeintaan yksi pyyntö / 3 s
+REQUEST_SPACING_SECONDS = float(os.environ.get("ARXIV_REQUEST_SPACING", "3.0"))
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_PAGES = 20
+
+ARXIV_STATE_PATH = "data/arxiv_state.json"
+
+# Raakasivujen välimuisti (uudelleenajo samana päivänä ei hae uudestaan)
+FEED_CACHE_DIR = os.environ.get("ARXIV_FEED_CACHE_DIR", "data/arxiv_cache")
+FEED_CACHE_TTL_SECONDS = 6 * 3600
+FEED_CACHE_MAX_FILES = 50
+
+_last_request_at = 0.0
 
 COGNITIVE_KEYWORDS = [
     "design cognition",
@@ -48,6 +72,32 @@ NEGATIVE_KEYWORDS = [
     "time series forecasting",
 ]
 
+# Heikot termit: eivät yksin riitä, mutta yhdessä (esim. "design" + "creative") riittävät
+WEAK_KEYWORDS = {
+    "exploration": 0.5,
+    "design": 0.5,
+    "creative": 0.5,
+}
+RELEVANCE_THRESHOLD = 1.0
+
+_matcher: Optional[KeywordMatcher] = None
+
+
+def get_relevance_matcher() -> KeywordMatcher:
+    """
+    Compiled matcher built once from the keyword lists above, or from the
+    JSON file in ARXIV_KEYWORDS_PATH (see KeywordMatcher.from_config).
+    """
+    global _matcher
+    if _matcher is None:
+        positive = {kw: 1.0 for kw in COGNITIVE_KEYWORDS}
+        positive["designer"] = 1.0
+        positive.update(WEAK_KEYWORDS)
+        defaults = {"positive": positive, "negative": NEGATIVE_KEYWORDS, "threshold": RELEVANCE_THRESHOLD}
+        _matcher = load_matcher(defaults)
+    return _matcher
+
+
 def _build_search_query() -> str:
     """
     Rakennetaan arXiv-haku, joka suosii AI + design cognition / industrial design -henkisiä papereita.
@@ -71,81 +121,299 @@ def _build_search_query() -> str:
     return f"{categories} AND {text_terms}"
 
 
-def _query_arxiv(search_query: str, max_results: int = 40) -> feedparser.FeedParserDict:
+def _feed_cache_path(url: str) -> str:
+    return os.path.join(FEED_CACHE_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".xml")
+
+
+def _prune_feed_cache() -> None:
+    """Keep only the FEED_CACHE_MAX_FILES newest pages."""
+    try:
+        names = [os.path.join(FEED_CACHE_DIR, n) for n in os.listdir(FEED_CACHE_DIR) if n.endswith(".xml")]
+    except FileNotFoundError:
+        return
+    names.sort(key=os.path.getmtime, reverse=True)
+    for path in names[FEED_CACHE_MAX_FILES:]:
+        os.remove(path)
+
+
+def _fetch_feed_page(url: str) -> bytes:
+    """
+    Raw Atom page for a query URL: served from the on-disk cache if fresh,
+    otherwise fetched with REQUEST_SPACING_SECONDS between requests.
+    """
+    global _last_request_at
+    cache_path = _feed_cache_path(url)
+    try:
+        if time.time() - os.path.getmtime(cache_path) < FEED_CACHE_TTL_SECONDS:
+            with open(cache_path, "rb") as f:
+                return f.read()
+    except FileNotFoundError:
+        pass
+
+    wait = REQUEST_SPACING_SECONDS - (time.monotonic() - _last_request_at)
+    if wait > 0:
+        time.sleep(wait)
+    try:
+        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+            data = response.read()
+    finally:
+        _last_request_at = time.monotonic()
+
+    os.makedirs(FEED_CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, cache_path)
+    _prune_feed_cache()
+    return data
+
+
+def _query_arxiv(search_query: str, max_results: int = 40, start: int = 0) -> feedparser.FeedParserDict:
     params = {
         "search_query": search_query,
-        "start": 0,
+        "start": start,
         "max_results": max_results,
         "sortBy": "submittedDate",
         "sortOrder": "descending",
     }
     url = ARXIV_API_URL + "?" + urllib.parse.urlencode(params)
-    feed = feedparser.parse(url)
+    # Virheet nousevat kutsujalle: tyhjä sivu tarkoittaa vain tulosten loppua
+    with METRICS.timed("arxiv_fetch_page"):
+        raw = _fetch_feed_page(url)
+        feed = feedparser.parse(raw)
     return feed
 
+
+# -----------------------
+# Watermark: uusin jo nähty julkaisu
+# -----------------------
+
+def load_arxiv_state(state_path: str = ARXIV_STATE_PATH) -> Dict:
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_arxiv_state(state: Dict, state_path: str) -> None:
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def commit_arxiv_watermark(state_path: str = ARXIV_STATE_PATH) -> None:
+    """
+    Promote the watermark (or resume point) of the last harvest to the
+    committed one. Call this once the harvested papers are stored, so a
+    crashed run harvests the same range again.
+    """
+    state = load_arxiv_state(state_path)
+    pending = state.pop("pending", None)
+    if not pending:
+        return
+    if "published" in pending:
+        # vanha muoto: pelkkä watermark
+        pending = {"watermark": pending}
+    if pending.get("watermark"):
+        state["watermark"] = pending["watermark"]
+    if pending.get("resume"):
+        state["resume"] = pending["resume"]
+    else:
+        state.pop("resume", None)
+    _save_arxiv_state(state, state_path)
+    if state.get("resume"):
+        print(f"[fetch_papers] arXiv harvest incomplete, next run resumes at result {state['resume']['start']}.")
+    elif state.get("watermark"):
+        print(f"[fetch_papers] arXiv watermark now {state['watermark']['published']}.")
+
+
 def _is_cognition_relevant(title: str, abstract: str) -> bool:
-    text = (title + " " + abstract).lower()
-    if any(neg in text for neg in NEGATIVE_KEYWORDS):
-        return False
-    if any(tok in text for tok in COGNITIVE_KEYWORDS):
-        return True
-    # Voi halutessa olla vähän löysempi: vaadi esim. "design" + "creativity" tms.
-    if "design" in text and ("creativity" in text or "designer" in text or "creative" in text):
-        return True
-    return False
-
-def fetch_new_papers(days_back: int = 2, max_results: int = 40) -> List[Dict]:
+    return get_relevance_matcher().match(title + " " + abstract).relevant
+
+
+def score_relevance_batch(items: List[Dict]) -> List[MatchResult]:
+    """Match title+abstract of a whole page of papers in one go."""
+    texts = [(p.get("title") or "") + " " + (p.get("abstract") or "") for p in items]
+    return get_relevance_matcher().match_batch(texts)
+
+
+def iter_new_papers(
+    days_back: int = 2,
+    max_results: int = 40,
+    watermark_path: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+) -> Iterator[Dict]:
     """
     Hakee viimeisen `days_back` päivän aikana julkaistuja papereita,
     jotka osuvat AI + design -hakuun.
 
-    Palauttaa listan dict-olioita, joilla kentät:
-    - id, title, abstract, authors, year, source, published, categories
+    Results are paged (`max_results` per request, newest first) until the
+    watermark stored in `watermark_path`, the `days_back` window, the end
+    of the results or `max_pages` is reached. If the harvest got down to
+    the watermark (or `days_back`, or the end), the newest entry seen is
+    stored as a pending watermark. If it stopped early (a page failed to
+    download or `max_pages` ran out), the watermark stays put and a resume
+    point (the next `start` offset plus the newest entry of the harvest)
+    is stored instead: the next call continues from that offset down to
+    the watermark and only then moves the watermark. New submissions only
+    push older results to later offsets, so resuming may see a few
+    entries twice but skips none. `commit_arxiv_watermark` makes either
+    one stick.
+
+    Streaming variant: relevant papers are yielded page by page as soon
+    as each page is fetched; the pending watermark is saved once the
+    generator is exhausted.
+
+    Tuottaa dict-olioita, joilla kentät:
+    - id ("arxiv:<id>", ilman versiota), title, abstract, authors, year,
+      source, published, updated, categories, arxiv_version, url, content_hash
     """
     search_query = _build_search_query()
-    feed = _query_arxiv(search_query, max_results=max_results)
 
-    if not getattr(feed, "entries", None):
-        print("[fetch_papers] No entries from arXiv.")
-        return []
+    state = load_arxiv_state(watermark_path) if watermark_path else {}
+    watermark = state.get("watermark")
+    resume = state.get("resume")
+    first_start = resume["start"] if resume else 0
+    if resume:
+        print(f"[fetch_papers] Resuming an incomplete arXiv harvest at result {first_start}.")
+    # vanhat tilatiedostot sisältävät versioidut id:t
+    seen_at_watermark = (
+        {parse_arxiv_id(i)[0] or i for i in watermark.get("ids", [])} if watermark else set()
+    )
 
     now_utc = dt.datetime.utcnow()
-    papers: List[Dict] = []
+    found = 0
+    newest_published: Optional[str] = None
+    newest_ids: List[str] = []
+    scanned = 0
+    done = False
+    # Päästiinkö watermarkiin / days_back-rajaan / tulosten loppuun asti
+    complete = False
+    next_start = first_start
 
-    for entry in feed.entries:
-        # entry.published: esim. "2025-03-10T12:34:56Z"
+    for page in range(max_pages):
+        start = first_start + page * max_results
         try:
-            published_dt = dt.datetime.strptime(entry.published, "%Y-%m-%dT%H:%M:%SZ")
-        except Exception:
-            # Jos formaatti yllättää, hypätään yli
-            continue
-
-        age_days = (now_utc - published_dt).days
-        if days_back is not None and age_days > days_back:
-            # vanhempi kuin ikkunamme → skip
-            continue
-
-        paper_id = entry.id  # esim. "http://arxiv.org/abs/2501.01234v1"
-        title = entry.title.strip()
-        abstract = entry.summary.strip()
-
-        if not _is_cognition_relevant(title, abstract):
-            continue
-        
-        authors = [a.name for a in getattr(entry, "authors", [])] or []
-        categories = [t["term"] for t in getattr(entry, "tags", [])] if hasattr(entry, "tags") else []
-
-        paper = {
-            "id": paper_id,
-            "title": title,
-            "abstract": abstract,
-            "authors": authors,
-            "year": published_dt.year,
-            "source": "arxiv",
-            "published": published_dt.isoformat(),
-            "categories": categories,
-        }
-        papers.append(paper)
-
-    print(f"[fetch_papers] Fetched {len(papers)} recent papers from arXiv.")
-    return papers
\ No newline at end of file
+            feed = _query_arxiv(search_query, max_results=max_results, start=start)
+        except Exception as e:
+            print(f"[fetch_papers] Error fetching arXiv page start={start}: {e}")
+            break
+        entries = getattr(feed, "entries", None) or []
+        candidates: List[Dict] = []
+        if not entries:
+            if page == 0 and not resume:
+                print("[fetch_papers] No entries from arXiv.")
+            complete = True
+            break
+
+        for entry in entries:
+            # entry.published: esim. "2025-03-10T12:34:56Z"
+            try:
+                published_dt = dt.datetime.strptime(entry.published, "%Y-%m-%dT%H:%M:%SZ")
+            except Exception:
+                # Jos formaatti yllättää, hypätään yli
+                continue
+            published = published_dt.isoformat()
+            # esim. "http://arxiv.org/abs/2501.01234v1" -> "arxiv:2501.01234", versio 1
+            paper_id, version = parse_arxiv_id(entry.id)
+            if paper_id is None:
+                paper_id = entry.id
+            scanned += 1
+
+            # Uusin nähty → seuraava watermark
+            if newest_published is None or published > newest_published:
+                newest_published, newest_ids = published, [paper_id]
+            elif published == newest_published:
+                newest_ids.append(paper_id)
+
+            if watermark and (
+                published < watermark["published"]
+                or (published == watermark["published"] and paper_id in seen_at_watermark)
+            ):
+                # kaikki tästä eteenpäin on jo käsitelty aiemmin
+                done = True
+                break
+
+            age_days = (now_utc - published_dt).days
+            if days_back is not None and age_days > days_back:
+                # vanhempi kuin ikkunamme → loput ovat vielä vanhempia
+                done = True
+                break
+
+            authors = [a.name for a in getattr(entry, "authors", [])] or []
+            categories = [t["term"] for t in getattr(entry, "tags", [])] if hasattr(entry, "tags") else []
+
+            paper = {
+                "id": paper_id,
+                "title": entry.title.strip(),
+                "abstract": entry.summary.strip(),
+                "authors": authors,
+                "year": published_dt.year,
+                "source": "arxiv",
+                "published": published,
+                "updated": getattr(entry, "updated", published),
+                "categories": categories,
+                "arxiv_version": version or 1,
+                "url": f"https://arxiv.org/abs/{paper_id[len('arxiv:'):]}" if paper_id.startswith("arxiv:") else entry.id,
+            }
+            paper["content_hash"] = content_hash(paper)
+            candidates.append(paper)
+
+        # Relevanssisuodatus koko sivulle kerralla
+        for paper, result in zip(candidates, score_relevance_batch(candidates)):
+            if result.relevant:
+                found += 1
+                yield paper
+
+        next_start = start + max_results
+        if done or len(entries) < max_results:
+            complete = True
+            break
+    else:
+        print(f"[fetch_papers] Stopped after {max_pages} pages before reaching the watermark.")
+
+    if resume:
+        # Jatkettu haku: watermark siirtyy keskeytyneen haun uusimpaan
+        newest = resume.get("newest")
+    else:
+        if watermark and newest_published and newest_published <= watermark["published"]:
+            # ei mitään uudempaa kuin vanha watermark: ei siirretä taaksepäin
+            if newest_published == watermark["published"]:
+                newest_ids = sorted(seen_at_watermark | set(newest_ids))
+            else:
+                newest_published, newest_ids = watermark["published"], watermark.get("ids", [])
+        newest = {"published": newest_published, "ids": newest_ids} if newest_published else None
+
+    if watermark_path:
+        if complete:
+            pending = {"watermark": newest or watermark, "resume": None}
+        elif newest or resume:
+            pending = {"watermark": watermark, "resume": {"start": next_start, "newest": newest}}
+        else:
+            pending = None  # ensimmäinenkin sivu epäonnistui: tila ennallaan
+        if pending:
+            state = load_arxiv_state(watermark_path)
+            state["pending"] = pending
+            _save_arxiv_state(state, watermark_path)
+
+    print(
+        f"[fetch_papers] Scanned {scanned} arXiv entries, {found} new relevant papers"
+        f"{'' if complete else ' (incomplete, will resume)'}."
+    )
+
+
+def fetch_new_papers(
+    days_back: int = 2,
+    max_results: int = 40,
+    watermark_path: Optional[str] = None,
+    max_pages: int = MAX_PAGES,
+) -> List[Dict]:
+    """
+    Hakee viimeisen `days_back` päivän aikana julkaistuja papereita,
+    jotka osuvat AI + design -hakuun (ks. `iter_new_papers`).
+    Palauttaa listan.
+    """
+    return list(iter_new_papers(days_back, max_results, watermark_path, max_pages))
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+from typing import List, Dict, Iterable, NamedTuple, Optional
+
+
+class MatchResult(NamedTuple):
+    relevant: bool
+    score: float
+    positive: List[str]
+    negative: List[str]
+
+
+def _normalize_term(term: str) -> str:
+    """Key used to map a regex hit back to its term: lowercase, no spaces/hyphens."""
+    return re.sub(r"[\s\-]+", "", term.lower())
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Build one alternation shaped like a trie of the terms, so the regex
+    engine branches per character instead of retrying every term at every
+    position. Spaces/hyphens inside terms match any run of them (or none).
+    """
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for ch in re.sub(r"[\s\-]+", " ", term.lower().strip()):
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        branches = []
+        for ch in sorted(k for k in node if k):
+            head = r"[\s\-]*" if ch == " " else re.escape(ch)
+            branches.append(head + build(node[ch]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # termi voi päättyä tähän: loppuosa valinnainen
+            return ("(?:" + body + ")?") if len(branches) == 1 else body + "?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Relevance filter compiled into a single regex.
+
+    All positive and negative terms are merged into one trie-shaped
+    alternation with word boundaries, so "sketch" no longer matches inside
+    "sketchy" and a text is scanned once instead of once per keyword.
+    A text is relevant when it has no negative term and the summed weights
+    of its distinct positive terms reach `threshold`; weak terms
+    (weight < threshold) only count together with others.
+    """
+
+    def __init__(
+        self,
+        positive: Dict[str, float],
+        negative: Iterable[str],
+        threshold: float = 1.0,
+    ):
+        self.positive = {t.lower(): float(w) for t, w in positive.items()}
+        self.negative = [t.lower() for t in negative]
+        self.threshold = threshold
+
+        # normalisoitu osuma -> (termi, onko negatiivinen)
+        self._lookup: Dict[str, tuple] = {}
+        for term in self.positive:
+            self._lookup.setdefault(_normalize_term(term), (term, False))
+        for term in self.negative:
+            self._lookup[_normalize_term(term)] = (term, True)
+
+        terms = list(self.positive) + self.negative
+        pattern = _trie_pattern(terms) if terms else r"(?!x)x"
+        # taivutus (s/es/ing) sallitaan termin perään; sanaraja molemmin puolin
+        self._regex = re.compile(r"\b(" + pattern + r")(?:e?s|ing)?\b")
+
+    def match(self, text: str) -> MatchResult:
+        positive = set()
+        negative = set()
+        lookup = self._lookup
+        for hit in self._regex.findall(text.lower()):
+            found = lookup.get(_normalize_term(hit))
+            if found is None:
+                continue
+            term, is_neg = found
+            (negative if is_neg else positive).add(term)
+
+        score = sum(self.positive[t] for t in positive)
+        relevant = not negative and score >= self.threshold
+        return MatchResult(relevant, score, sorted(positive), sorted(negative))
+
+    def match_batch(self, texts: Iterable[str]) -> List[MatchResult]:
+        """Match a whole harvested page at once."""
+        match = self.match
+        return [match(t) for t in texts]
+
+    @classmethod
+    def from_config(cls, path: str, defaults: Optional[Dict] = None) -> "KeywordMatcher":
+        """
+        Load term lists from a JSON file:
+            {"positive": {"term": weight, ...} or ["term", ...],
+             "negative": ["term", ...], "threshold": 1.0}
+        Missing keys fall back to `defaults`.
+        """
+        config = dict(defaults or {})
+        with open(path, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+        positive = config.get("positive", {})
+        if isinstance(positive, list):
+            positive = {t: 1.0 for t in positive}
+        return cls(positive, config.get("negative", []), config.get("threshold", 1.0))
+
+
+def load_matcher(defaults: Dict, config_path: Optional[str] = None) -> KeywordMatcher:
+    """Matcher from `config_path` (or ARXIV_KEYWORDS_PATH) if it exists, else from defaults."""
+    config_path = config_path or os.environ.get("ARXIV_KEYWORDS_PATH")
+    if config_path and os.path.exists(config_path):
+        print(f"[keyword_matcher] Loading keywords from {config_path}")
+        return KeywordMatcher.from_config(config_path, defaults)
+    return KeywordMatcher(defaults["positive"], defaults["negative"], defaults.get("threshold", 1.0))
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional
+
+
+# -----------------------
+# Perusasetukset
+# -----------------------
+
+CACHE_DIR = os.environ.get("LLM_CACHE_DIR", "data/llm_cache")
+CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "200"))
+CACHE_MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "365"))
+CACHE_ENABLED = os.environ.get("LLM_CACHE_DISABLE", "") not in ("1", "true", "yes")
+
+# Karsitaan välimuistia automaattisesti näin monen kirjoituksen välein
+PRUNE_EVERY_N_PUTS = 100
+
+
+def cache_key(model: str, system_prompt: str, user_content: str) -> str:
+    """Content address of one LLM request: sha256 over model, system prompt and payload."""
+    h = hashlib.sha256()
+    for part in (model, system_prompt, user_content):
+        data = part.encode("utf-8")
+        # pituus mukaan, jotta osien raja ei voi siirtyä
+        h.update(str(len(data)).encode("ascii") + b":")
+        h.update(data)
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw LLM response texts, one JSON file per request under
+    `<cache_dir>/<key[:2]>/<key>.json`.
+
+    Entries older than `max_age_days` are treated as misses and removed, and
+    `prune()` evicts the oldest entries once the directory exceeds `max_mb`.
+    Hit/miss counters are kept per process.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = CACHE_DIR,
+        max_mb: float = CACHE_MAX_MB,
+        max_age_days: float = CACHE_MAX_AGE_DAYS,
+        enabled: bool = CACHE_ENABLED,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 86400
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[str]:
+        """
+        Cached text for `key`, or None. With `count_miss=False` a miss is
+        not counted (a pre-check before the request that is counted later).
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            if count_miss:
+                self.record_misses(1)
+            return None
+
+        if time.time() - entry.get("created", 0) > self.max_age_seconds:
+            self.discard(key)
+            if count_miss:
+                self.record_misses(1)
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry.get("text")
+
+    def record_misses(self, n: int) -> None:
+        """Count `n` requests that were sent without a cache lookup of their own."""
+        if n and self.enabled:
+            with self._lock:
+                self.misses += n
+
+    def put(self, key: str, text: str, model: str = "") -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"created": time.time(), "model": model, "text": text}
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._puts += 1
+            should_prune = self._puts % PRUNE_EVERY_N_PUTS == 0
+        if should_prune:
+            self.prune()
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self) -> int:
+        """Remove expired entries, then the oldest ones until under the size limit."""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        now = time.time()
+        removed = 0
+        entries = []
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - st.st_mtime > self.max_age_seconds:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    removed += 1
+                else:
+                    entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            entries.sort()  # vanhimmat ensin
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+
+        if removed:
+            print(f"[llm_cache] Pruned {removed} cache entries.")
+        return removed
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# Prosessin yhteinen välimuisti (luokitus + synteesi)
+RESPONSE_CACHE = ResponseCache()
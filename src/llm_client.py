@@ -0,0 +1,173 @@
+import os
+import random
+import threading
+import time
+from typing import List, Dict, Optional, TYPE_CHECKING
+
+from .llm_cache import RESPONSE_CACHE, cache_key
+from .metrics import METRICS
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+# -----------------------
+# Perusasetukset
+# -----------------------
+
+DEFAULT_MODEL = "gpt-4o"
+
+# Montako LLM-kutsua saa olla käynnissä yhtä aikaa
+MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+
+# Uudelleenyritykset 429/5xx-virheille (eksponentiaalinen backoff)
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = float(os.environ.get("LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX_SECONDS = float(os.environ.get("LLM_BACKOFF_MAX", "30.0"))
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT", "120"))
+
+# Yhteinen nopeusraja kaikille vaiheille (0 = ei rajaa)
+REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "0"))
+
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+# Rajoittavat yhdessä kaikkia säikeitä (rikastus + synteesi)
+_inflight = threading.BoundedSemaphore(max(1, MAX_CONCURRENCY))
+_rate_lock = threading.Lock()
+_next_request_at = 0.0
+
+
+def get_client() -> "OpenAI":
+    """
+    Returns one shared OpenAI client for the whole process.
+
+    The client keeps a pooled HTTP connection, so concurrent callers reuse
+    sockets instead of opening a new client per paper. Retries are handled
+    by `create_response`, so the SDK's own retry loop is disabled. The SDK
+    is imported here, on first use, so commands that never call the API
+    (stats, query, harvest) start without it.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = os.environ.get("OPENAI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("OPENAI_API_KEY is not set.")
+                from openai import OpenAI
+
+                _client = OpenAI(
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=REQUEST_TIMEOUT_SECONDS,
+                )
+    return _client
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """429, 5xx and connection/timeouts are worth retrying; 4xx is not."""
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = type(exc).__name__
+    return name in ("APIConnectionError", "APITimeoutError")
+
+
+def _backoff_delay(attempt: int, exc: Exception) -> float:
+    # Kunnioitetaan Retry-After -otsaketta, jos palvelin antaa sen
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    delay = BACKOFF_BASE_SECONDS * (2 ** attempt)
+    return min(delay, BACKOFF_MAX_SECONDS) * (0.5 + random.random() / 2)
+
+
+def _wait_for_rate_slot() -> None:
+    """Space request starts evenly so the whole process stays under REQUESTS_PER_MINUTE."""
+    global _next_request_at
+    if REQUESTS_PER_MINUTE <= 0:
+        return
+    interval = 60.0 / REQUESTS_PER_MINUTE
+    with _rate_lock:
+        slot = max(time.monotonic(), _next_request_at)
+        _next_request_at = slot + interval
+    delay = slot - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def create_response(input_messages: List[Dict], model: str = DEFAULT_MODEL):
+    """
+    Calls the Responses API with exponential backoff on 429/5xx errors.
+    Other errors are raised immediately. All callers share one concurrency
+    limit (LLM_MAX_CONCURRENCY) and rate limit (LLM_REQUESTS_PER_MINUTE).
+    Every attempt is recorded in METRICS (latency, tokens, cost).
+    """
+    client = get_client()
+    attempt = 0
+    while True:
+        try:
+            _wait_for_rate_slot()
+            with _inflight:
+                started = time.monotonic()
+                try:
+                    response = client.responses.create(model=model, input=input_messages)
+                except Exception:
+                    METRICS.record_llm_call(model, time.monotonic() - started, error=True)
+                    raise
+            METRICS.record_llm_call(model, time.monotonic() - started, usage=getattr(response, "usage", None))
+            return response
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                raise
+            METRICS.record_retry(model)
+            delay = _backoff_delay(attempt, e)
+            print(f"[llm_client] Retryable error ({e.__class__.__name__}), retrying in {delay:.1f}s ...")
+            time.sleep(delay)
+            attempt += 1
+
+
+def response_text(response) -> str:
+    # responses API: output -> list, then content -> list, then .text
+    return response.output[0].content[0].text
+
+
+def complete_text(
+    system_prompt: str,
+    user_content: str,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+) -> str:
+    """
+    System + user prompt -> response text. Identical requests
+    (same model, system prompt and user content) are served from the
+    on-disk response cache instead of being billed again.
+    """
+    key = cache_key(model, system_prompt, user_content)
+    if use_cache:
+        cached = RESPONSE_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+    response = create_response(
+        model=model,
+        input_messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ],
+    )
+    text = response_text(response)
+    if use_cache:
+        RESPONSE_CACHE.put(key, text, model=model)
+    return text
+
+
+def discard_cached(system_prompt: str, user_content: str, model: str = DEFAULT_MODEL) -> None:
+    """Drop a cached response, e.g. when it turned out to be unusable."""
+    RESPONSE_CACHE.discard(cache_key(model, system_prompt, user_content))
@@ -1,70 +1,638 @@
-from .fetch_papers import fetch_new_papers
-from .classify_and_summarize import enrich_papers_with_llm
-from .utils import update_jsonl_db, load_jsonl_db
-from .update_knowledge_base import update_knowledge_markdown
-from .fetch_bibtex import load_bibtex
-from .fetch_bibtex_url import download_paperpile_bib
-from dotenv import load_dotenv
-load_dotenv()
-
-def main():
-    structured_papers = []
-
-    DB_PATH = "data/papers_structured.jsonl"
-    BIB_PATH = "data/paperpile.bib"
-    MAX_BIB_PER_RUN = 30  # voit säätää 10–50 välillä
-
-    # 0) Lue nykyinen tietokanta ja kerää id:t
-    existing_papers = load_jsonl_db(DB_PATH)
-    existing_ids = {p["id"] for p in existing_papers}
-    print(f"[main] Existing DB has {len(existing_ids)} papers.")
-
-    # 1) Hae uudet arXiv-paperit ja suodata vain aidosti uudet id:t
-    raw_papers = fetch_new_papers(days_back=365, max_results=30)
-    raw_papers = [p for p in raw_papers if p["id"] not in existing_ids]
-
-    if raw_papers:
-        print(f"[main] Enriching {len(raw_papers)} NEW arXiv papers with LLM...")
-        arxiv_structured = enrich_papers_with_llm(raw_papers)
-        structured_papers.extend(arxiv_structured)
-    else:
-        print("[main] No NEW arXiv papers to enrich.")
+"""
+Daily AI & design research pipeline.
+
+    python -m src.main                      # koko ajo: harvest + ingest-bib + enrich + synthesize
+    python -m src.main harvest --days-back 30
+    python -m src.main ingest-bib
+    python -m src.main enrich --max-bib 50
+    python -m src.main synthesize
+    python -m src.main query "design fixation" --phase "Concept design"
+    python -m src.main stats
+    python -m src.main statistics           # knowledge/statistics.md ilman LLM-kutsuja
+
+`harvest` and `ingest-bib` only queue their candidates (data/enrich_queue.jsonl);
+`enrich` sends the queue to the LLM. The full run streams straight from
+the fetch into enrichment. Every command imports only the modules it
+needs: `query` and `stats` read the database without loading the OpenAI
+SDK, feedparser, bibtexparser or requests.
+"""
+
+import os
+import argparse
+from typing import Dict, List, Optional
+
+
+DB_PATH = "data/papers_structured.jsonl"
+BIB_PATH = "data/paperpile.bib"
+KNOWLEDGE_DIR = "knowledge"
+
+# Oletukset lipuille
+DAYS_BACK = 365
+MAX_RESULTS = 100
+MAX_BIB_PER_RUN = 30  # voit säätää 10–50 välillä
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "") in ("1", "true", "yes")
+
+
+def _load_env() -> None:
+    """.env -> ympäristömuuttujat (OPENAI_API_KEY ym.), vain komennoille jotka niitä tarvitsevat."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+# -----------------------
+# Kirjoittavat vaiheet
+# -----------------------
+
+class Pipeline:
+    """
+    State shared by the stages of one run: the run journal, the paper
+    store, the ids already known and the duplicate index. Each stage
+    either enriches its candidates right away (the full run) or puts
+    them on the enrichment queue (`harvest`, `ingest-bib`).
+    """
+
+    def __init__(self, args):
+        from .run_journal import RunJournal
+        from .paper_store import open_store
+        from .pipeline import EnrichQueue
+        from .metrics import start_profiler
+
+        self.profiler = start_profiler() if args.profile else None
+        # ENRICH_BATCH_MODE=1: koko BibTeX-backlog Batch API:n kautta (halvempi, valmis < 24h)
+        self.batch_mode = _env_flag("ENRICH_BATCH_MODE")
+        # Ajopäiväkirja: valmiit vaiheet ja viimeisin tallennettu paperi (data/run_journal.json)
+        # Vain koko ajo (`run`) kirjoittaa päiväkirjaan; yksittäiset komennot eivät koske keskeytyneen ajon tilaan
+        self.journal = RunJournal(resume=args.resume, persist=args.journal)
+        self.store = open_store(DB_PATH)
+        self.queue = EnrichQueue()
+
+    def poll_batch(self) -> None:
+        """Batch-tilassa: tarkista edellisen ajon erä ja tuo valmiit tulokset kantaan."""
+        if self.batch_mode and self.journal.should_run("batch_poll"):
+            from . import batch_enrich
+
+            batch_enrich.poll_batch(DB_PATH)
+            self.journal.complete("batch_poll")
+
+    def load_existing(self) -> None:
+        """Nykyinen tietokanta, tunnetut id:t ja duplikaatti-indeksi (versioidut arXiv-id:t muunnetaan kerran)."""
+        from .utils import load_jsonl_db, migrate_arxiv_ids
+        from .dedup import load_dedup_index
+
+        migrate_arxiv_ids(DB_PATH)
+        self.existing_papers = load_jsonl_db(DB_PATH)
+        self.existing_by_id = {p["id"]: p for p in self.existing_papers}
+        self.db_ids = set(self.existing_by_id)
+        print(f"[main] Existing DB has {len(self.db_ids)} papers.")
+        # Duplikaatteina yhdistetyt id:t (aliakset) ja jonossa odottavat lasketaan myös olemassa oleviksi
+        queued = self.queue.load()
+        self.existing_ids = (
+            self.db_ids
+            | {a for p in self.existing_papers for a in p.get("aliases") or []}
+            | {p["id"] for p in queued}
+        )
+        self.dedup_index = load_dedup_index(self.existing_papers + queued)
+
+    def checkpoint(self, stage, stored):
+        """on_result-callback: jokainen rikastettu paperi kantaan heti, ei vasta ajon lopussa."""
+        def on_result(record):
+            self.store.upsert([record])
+            stored.append(record)
+            self.journal.paper_done(stage, record.get("id"))
+        return on_result
+
+    def merge_and_store(self, duplicates):
+        """Duplikaatit kanonisiin tietueisiin (kanta, myös tämän ajon rikastetut)."""
+        if not duplicates:
+            return []
+        from .utils import update_jsonl_db
+        from .dedup import merge_duplicates
+
+        records = {cid: self.store.get(cid) for _, cid in duplicates if self.store.get(cid) is not None}
+        merged_records, merged_duplicates = merge_duplicates(duplicates, records)
+        if merged_records:
+            update_jsonl_db(DB_PATH, merged_records)
+        print(f"[main] Merged {len(merged_duplicates)} duplicates into {len(merged_records)} existing records.")
+        return merged_duplicates
+
+    def enrich_into_store(self, stage, papers):
+        from .classify_and_summarize import iter_enriched
+
+        stored = []
+        on_result = self.checkpoint(stage, stored)
+        for record in iter_enriched(papers, on_failed=self.requeue_failed):
+            on_result(record)
+        return stored
+
+    def requeue_failed(self, papers):
+        """Rikastuksessa epäonnistuneet jonoon: arXiv-watermark ei hautaa niitä, enrich yrittää uudelleen."""
+        self.queue.add(papers)
+        print(f"[main] {len(papers)} papers failed enrichment, queued for a retry.")
+
+    def arxiv_stage(self, days_back: int, max_results: int, enrich: bool) -> None:
+        """
+        arXiv: virtaava putki haku -> versiot -> tunnetut pois -> duplikaatit
+        -> esisuodatus -> rikastus -> kanta (tai jonoon, jos `enrich` on False).
+        Vaiheiden välissä rajattu jono, joten ensimmäiset paperit ovat kannassa,
+        kun seuraavia sivuja vielä haetaan.
+        """
+        if not self.journal.should_run("arxiv"):
+            return
+        from .fetch_papers import iter_new_papers, commit_arxiv_watermark, ARXIV_STATE_PATH
+        from .pipeline import bounded, reconcile_versions, drop_known, split_duplicates
+        from .prescore import load_or_build_scorer, iter_relevant
+
+        scorer = load_or_build_scorer(self.existing_papers, bib_path=BIB_PATH)
+        version_updates = []
+        arxiv_duplicates = []
+
+        def bump_version(record):
+            # Uusi versio, sama otsikko/abstrakti: vain metatiedot päivitetään
+            self.store.upsert([record])
+            version_updates.append(record)
+
+        harvest = bounded(iter_new_papers(days_back=days_back, max_results=max_results, watermark_path=ARXIV_STATE_PATH))
+        candidates = reconcile_versions(harvest, self.existing_by_id, on_update=bump_version)
+        # Kannassa olevat tulevat tänne vain, jos uusi versio muuttui: ne rikastetaan uudelleen
+        candidates = drop_known(candidates, self.existing_ids, keep_ids=self.db_ids)
+        # Sama paperi toisesta lähteestä: yhdistetään kanoniseen tietueeseen, ei LLM-kutsua
+        candidates = split_duplicates(candidates, self.dedup_index, arxiv_duplicates, skip_ids=self.db_ids)
+        # Paikallinen TF-IDF-esisuodatus: selvästi aiheen ulkopuoliset eivät mene LLM:lle
+        candidates = iter_relevant(
+            candidates, scorer, on_reject=lambda p: self.dedup_index.remove(p["id"]), skip_ids=self.db_ids
+        )
+        if enrich:
+            arxiv_stored = self.enrich_into_store("arxiv", candidates)
+            print(f"[main] Stored {len(arxiv_stored)} arXiv papers.")
+        else:
+            queued = self.queue.add(candidates)
+            print(f"[main] Queued {queued} arXiv papers for enrichment.")
+
+        if version_updates:
+            print(f"[main] {len(version_updates)} arXiv papers have a new version with unchanged content.")
+        self.merge_and_store(arxiv_duplicates)
+
+        # arXiv-watermark siirtyy vasta, kun haetut paperit ovat kannassa (tai jonossa)
+        commit_arxiv_watermark(ARXIV_STATE_PATH)
+        self.journal.complete("arxiv")
+
+    def bibtex_stage(self, max_bib: int, enrich: bool) -> None:
+        """Paperpile (BibTeX) -kirjasto: vain uudet ja muuttuneet merkinnät jäsennetään."""
+        if not self.journal.should_run("bibtex"):
+            return
+        from .fetch_bibtex import (
+            load_bibtex_changes,
+            load_bib_manifest,
+            save_bib_manifest,
+            bib_manifest_path,
+            commit_bib_hashes,
+        )
+        from .fetch_bibtex_url import download_paperpile_bib, UNCHANGED
+
+        # Try downloading latest Paperpile export locally (only if PAPERPILE_BIB_URL is set)
+        bib_status = download_paperpile_bib(BIB_PATH)
+
+        manifest_path = bib_manifest_path(BIB_PATH)
+        bib_manifest = load_bib_manifest(manifest_path)
+        known_bib = {p["id"]: p.get("bib_hash") for p in self.existing_papers if p["id"].startswith("bib:")}
+        for alias in self.existing_ids - self.db_ids:
+            if alias.startswith("bib:"):
+                known_bib.setdefault(alias, None)
+        if bib_status == UNCHANGED and bib_manifest.get("pending") == 0:
+            # Export ei muuttunut eikä backlogia ole: koko vaihe voidaan ohittaa
+            print("[main] Paperpile export unchanged and fully ingested, skipping BibTeX stage.")
+            new_bib, changed_bib = [], []
+            bib_stage_ran = False
+        else:
+            bib_stage_ran = True
+            try:
+                new_bib, changed_bib = load_bibtex_changes(BIB_PATH, bib_manifest, known_bib)
+            except FileNotFoundError:
+                print(f"[main] No {BIB_PATH} found, skipping BibTeX papers.")
+                new_bib, changed_bib = [], []
+
+        # Uudet (ei vielä kannassa) + muuttuneet, jotka rikastetaan uudelleen
+        if changed_bib:
+            print(f"[main] {len(changed_bib)} BibTeX entries changed since last ingest, re-enriching.")
+            # Uudelleenrikastus ei saa hukata aiemmin yhdistettyjä aliaksia
+            for p in changed_bib:
+                previous = self.existing_by_id.get(p["id"]) or {}
+                if previous.get("aliases"):
+                    p["aliases"] = previous["aliases"]
+        bib_papers = changed_bib + [p for p in new_bib if p["id"] not in self.existing_ids]
+        bib_candidate_ids = {p["id"] for p in bib_papers}
+
+        # Kannassa jo olevat päivitetään omina tietueinaan; muut tarkistetaan duplikaattien varalta
+        fresh_bib, bib_duplicates = self.dedup_index.split_duplicates([p for p in bib_papers if p["id"] not in self.db_ids])
+        bib_papers = [p for p in bib_papers if p["id"] in self.db_ids] + fresh_bib
+
+        if self.batch_mode:
+            from . import batch_enrich
+
+            # Jo lähetetyt paperit odottavat erän valmistumista
+            in_flight = batch_enrich.pending_ids()
+            bib_papers = [p for p in bib_papers if p["id"] not in in_flight]
+            if bib_papers and not in_flight:
+                print(f"[main] Submitting {len(bib_papers)} NEW BibTeX papers as a batch...")
+                batch_enrich.submit_batch(bib_papers)
+            elif bib_papers:
+                print(f"[main] Batch in flight, {len(bib_papers)} BibTeX papers wait for the next batch.")
+            bib_papers = []
+
+        bib_stored = []
+        if not enrich:
+            # Jonoon kaikki; raja koskee vasta enrich-komentoa
+            if bib_papers:
+                self.queue.add(bib_papers)
+                print(f"[main] Queued {len(bib_papers)} BibTeX papers for enrichment.")
+            bib_stored = bib_papers
+        else:
+            # Raja: rikastetaan vain max_bib per ajo (jatketussa ajossa jo tallennetut mukaan lukien)
+            bib_limit = max(0, max_bib - self.journal.papers_done("bibtex"))
+            if len(bib_papers) > bib_limit:
+                print(f"[main] Limiting BibTeX enrichment to {bib_limit} papers (out of {len(bib_papers)} new).")
+                bib_papers = bib_papers[:bib_limit]
+            if bib_papers:
+                print(f"[main] Enriching {len(bib_papers)} NEW BibTeX papers with LLM...")
+                bib_stored = self.enrich_into_store("bibtex", bib_papers)
+                print(f"[main] Stored {len(bib_stored)} BibTeX papers.")
+            elif not self.batch_mode:
+                print("[main] No NEW BibTeX papers to enrich.")
+        merged_duplicates = self.merge_and_store(bib_duplicates)
+
+        # Manifestiin vain kantaan (tai jonoon) päätyneet merkinnät; loput tulevat uudelleen seuraavalla ajolla
+        commit_bib_hashes(bib_manifest, bib_stored + merged_duplicates)
+        if bib_stage_ran:
+            stored_ids = {p["id"] for p in bib_stored + merged_duplicates}
+            bib_manifest["pending"] = len(bib_candidate_ids - stored_ids)
+        save_bib_manifest(manifest_path, bib_manifest)
+        self.journal.complete("bibtex")
+
+    def enrich_stage(self, max_bib: int) -> None:
+        """
+        Rikastaa jonossa odottavat paperit (BibTeX-papereista enintään
+        max_bib per ajo). Tallennetut poistuvat jonosta vaiheen lopussa; jos
+        ajo keskeytyy, jo rikastetut tulevat välimuistista eivätkä maksa uudelleen.
+        """
+        queued = self.queue.load()
+        if not queued or not self.journal.should_run("enrich"):
+            return
+        bib_limit = max(0, max_bib - self.journal.papers_done("bibtex") - self.journal.papers_done("enrich"))
+        papers, bib_count = [], 0
+        for p in queued:
+            if p["id"].startswith("bib:"):
+                if bib_count >= bib_limit:
+                    continue
+                bib_count += 1
+            papers.append(p)
+        if len(papers) < len(queued):
+            print(f"[main] Limiting BibTeX enrichment to {bib_limit} papers, {len(queued) - len(papers)} stay queued.")
+
+        print(f"[main] Enriching {len(papers)} queued papers with LLM...")
+        stored = self.enrich_into_store("enrich", papers)
+        self.queue.remove(p["id"] for p in stored)
+        print(f"[main] Stored {len(stored)} queued papers.")
+        self.journal.complete("enrich")
+
+    def sync_dedup_index(self) -> None:
+        """Duplikaatti-indeksi vastaamaan kantaa ja jonoa (rikastamatta jääneet ehdokkaat pois)."""
+        from .utils import load_jsonl_db
+
+        self.dedup_index.sync(load_jsonl_db(DB_PATH) + self.queue.load())
+        self.dedup_index.save()
+
+    def synthesis_stage(self) -> None:
+        """Päivitä living synthesis (overview.md + by_design_phase.md)."""
+        if self.journal.should_run("synthesis"):
+            from .update_knowledge_base import update_knowledge_markdown
+
+            update_knowledge_markdown(db_path=DB_PATH, knowledge_dir=KNOWLEDGE_DIR)
+            self.journal.complete("synthesis")
+
+    def statistics_stage(self) -> None:
+        """Analytiikkaindeksi ajan tallentamilla papereilla ja knowledge/statistics.md (ei LLM:ää)."""
+        if self.journal.should_run("statistics"):
+            from .analytics import update_statistics
+
+            update_statistics(db_path=DB_PATH, knowledge_dir=KNOWLEDGE_DIR)
+            self.journal.complete("statistics")
 
-    # Try downloading latest Paperpile export locally (only if PAPERPILE_BIB_URL is set)
-    download_paperpile_bib("data/paperpile.bib")   
+    def finish(self) -> None:
+        """LLM-välimuistin karsinta ja ajoraportti: vaiheiden kestot, LLM-viiveet, tokenit ja kustannus (reports/)."""
+        from .llm_cache import RESPONSE_CACHE
+        from .metrics import METRICS, stop_profiler
 
-    # 2) Lataa Paperpile (BibTeX) -kirjasto
+        RESPONSE_CACHE.prune()
+        print(f"[main] LLM cache: {RESPONSE_CACHE.stats()}")
+        self.journal.finish()
+
+        METRICS.write_report(self.journal.state["run_id"], cache_stats=RESPONSE_CACHE.stats())
+        if self.profiler is not None:
+            stop_profiler(self.profiler, self.journal.state["run_id"])
+
+
+def cmd_run(args) -> None:
+    pipeline = Pipeline(args)
+    pipeline.poll_batch()
+    pipeline.load_existing()
+    pipeline.arxiv_stage(args.days_back, args.max_results, enrich=True)
+    pipeline.bibtex_stage(args.max_bib, enrich=True)
+    # Aiemmin harvest/ingest-bib -komennoilla jonoon jääneet
+    pipeline.enrich_stage(args.max_bib)
+    pipeline.sync_dedup_index()
+    pipeline.statistics_stage()
+    pipeline.synthesis_stage()
+    pipeline.finish()
+
+
+def cmd_harvest(args) -> None:
+    pipeline = Pipeline(args)
+    pipeline.load_existing()
+    pipeline.arxiv_stage(args.days_back, args.max_results, enrich=False)
+    pipeline.sync_dedup_index()
+    pipeline.finish()
+
+
+def cmd_ingest_bib(args) -> None:
+    pipeline = Pipeline(args)
+    pipeline.load_existing()
+    pipeline.bibtex_stage(MAX_BIB_PER_RUN, enrich=False)
+    pipeline.sync_dedup_index()
+    pipeline.finish()
+
+
+def cmd_enrich(args) -> None:
+    pipeline = Pipeline(args)
+    pipeline.poll_batch()
+    pipeline.load_existing()
+    pipeline.enrich_stage(args.max_bib)
+    pipeline.sync_dedup_index()
+    pipeline.statistics_stage()
+    pipeline.finish()
+
+
+def cmd_synthesize(args) -> None:
+    pipeline = Pipeline(args)
+    pipeline.statistics_stage()
+    pipeline.synthesis_stage()
+    pipeline.finish()
+
+
+# -----------------------
+# Lukevat komennot (ei LLM:ää, ei verkkoa)
+# -----------------------
+
+def _year_range(value: str):
+    """--year: YEAR tai START-END -> (start, end)."""
+    start, sep, end = value.partition("-")
     try:
-        bib_papers = load_bibtex(BIB_PATH)
-    except FileNotFoundError:
-        print(f"[main] No {BIB_PATH} found, skipping BibTeX papers.")
-        bib_papers = []
-
-    # Suodata pois ne BibTeX-paperit, jotka ovat jo tietokannassa
-    bib_papers = [p for p in bib_papers if p["id"] not in existing_ids]
-
-    # Raja: rikastetaan vain MAX_BIB_PER_RUN per ajo
-    if len(bib_papers) > MAX_BIB_PER_RUN:
-        print(f"[main] Limiting BibTeX enrichment to {MAX_BIB_PER_RUN} papers (out of {len(bib_papers)} new).")
-        bib_papers = bib_papers[:MAX_BIB_PER_RUN]
-
-    if bib_papers:
-        print(f"[main] Enriching {len(bib_papers)} NEW BibTeX papers with LLM...")
-        bib_structured = enrich_papers_with_llm(bib_papers)
-        structured_papers.extend(bib_structured)
-    else:
-        print("[main] No NEW BibTeX papers to enrich.")
+        first = int(start)
+        last = int(end) if sep else first
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YEAR or START-END, got {value!r}")
+    if last < first:
+        raise argparse.ArgumentTypeError(f"range end {last} is before start {first}")
+    return first, last
+
 
-    # 3) Päivitä JSONL-tietokanta, jos jotain uutta tuli
-    if structured_papers:
-        update_jsonl_db(DB_PATH, structured_papers)
+def _matches(paper, args) -> bool:
+    if args.phase and args.phase not in (paper.get("design_phase") or []):
+        return False
+    if args.tag and args.tag not in (paper.get("tags") or []):
+        return False
+    if args.author and not any(args.author.lower() in a.lower() for a in paper.get("authors") or []):
+        return False
+    if args.year:
+        start, end = args.year
+        try:
+            year = int(paper.get("year"))
+        except (TypeError, ValueError):
+            return False
+        if year < start or year > end:
+            return False
+    if args.text:
+        haystack = " ".join(
+            str(paper.get(field) or "") for field in ("title", "abstract", "summary_short")
+        ).lower()
+        return all(word in haystack for word in args.text.lower().split())
+    return True
+
+
+def _indexed_candidates(store, args) -> Optional[List[Dict]]:
+    """
+    SQLite: every given filter through its indexed lookup, ids intersected;
+    best full-text match first with --text, otherwise newest first. None
+    when there is nothing to look up (or full-text search was the only
+    filter and failed), i.e. scan all papers.
+    """
+    lookups = []
+    if args.phase:
+        lookups.append(store.papers_by_phase(args.phase))
+    if args.tag:
+        lookups.append(store.papers_by_tag(args.tag))
+    if args.author:
+        lookups.append(store.papers_by_author(args.author, partial=True))
+    if args.year:
+        lookups.append(store.papers_by_year(*args.year))
+    ranked = None
+    if args.text:
+        try:
+            # muiden ehtojen kanssa ei katkaista: rajaus tehdään leikkauksella
+            ranked = store.search(args.text, limit=-1 if lookups else max(args.limit * 10, 200))
+        except Exception as e:  # esim. FTS-syntaksivirhe -> tekstiehto suodatetaan perään
+            print(f"[main] Full-text search failed ({e}), filtering the text without it.")
+    if ranked is None:
+        if not lookups:
+            return None
+        ranked = sorted(lookups[0], key=lambda p: p.get("year") or 0, reverse=True)
     else:
-        print("[main] No structured papers to add to database.")
+        lookups.insert(0, ranked)
+    keep = set.intersection(*({p["id"] for p in found} for found in lookups))
+    return [p for p in ranked if p["id"] in keep]
+
+
+def cmd_query(args) -> None:
+    import json
+    from .paper_store import open_store
+
+    store = open_store(args.db)
+    candidates = None
+    if hasattr(store, "search"):
+        # SQLite: ehdot indeksien kautta; _matches tarkistaa tuloksen samoin kuin JSONL:ssä
+        candidates = _indexed_candidates(store, args)
+    if candidates is None:
+        candidates = sorted(store.all(), key=lambda p: p.get("year") or 0, reverse=True)
+    found = [p for p in candidates if _matches(p, args)][: args.limit]
+
+    for p in found:
+        if args.json:
+            print(json.dumps(dict(p), ensure_ascii=False))
+        else:
+            print(f"{p.get('year') or '----'}  {p['id']:<28}  {p.get('title') or ''}")
+    if not args.json:
+        print(f"[main] {len(found)} papers.")
+
+
+def cmd_statistics(args) -> None:
+    from .analytics import update_statistics
+
+    update_statistics(db_path=args.db, knowledge_dir=args.knowledge_dir)
 
-    # 4) Päivitä living synthesis (overview.md + by_design_phase.md)
-    update_knowledge_markdown(
-        db_path=DB_PATH,
-        knowledge_dir="knowledge",
+
+def cmd_stats(args) -> None:
+    import json
+    from collections import Counter
+    from .paper_store import open_store
+    from .pipeline import EnrichQueue
+    from .run_journal import RUN_JOURNAL_PATH
+
+    store = open_store(args.db)
+    papers = store.all()
+    sources = Counter(p.get("source") or "unknown" for p in papers)
+    phases = Counter(ph for p in papers for ph in p.get("design_phase") or [])
+    years = [int(p["year"]) for p in papers if str(p.get("year") or "").isdigit()]
+    stats = {
+        "papers": len(papers),
+        "sources": dict(sources.most_common()),
+        "design_phases": dict(phases.most_common()),
+        "unclassified": sum(1 for p in papers if not p.get("design_phase")),
+        "years": [min(years), max(years)] if years else None,
+        "queued_for_enrichment": len(EnrichQueue().load()),
+    }
+    try:
+        with open(RUN_JOURNAL_PATH, "r", encoding="utf-8") as f:
+            journal = json.load(f)
+        stats["last_run"] = {k: journal.get(k) for k in ("run_id", "status", "started_at", "finished_at")}
+    except (FileNotFoundError, json.JSONDecodeError):
+        stats["last_run"] = None
+
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return
+    print(f"Papers:      {stats['papers']}")
+    print(f"Sources:     {', '.join(f'{k} {v}' for k, v in sources.most_common()) or '-'}")
+    if years:
+        print(f"Years:       {min(years)}–{max(years)}")
+    print("Design phases:")
+    for phase, count in phases.most_common():
+        print(f"  {count:>6}  {phase}")
+    print(f"  {stats['unclassified']:>6}  (none)")
+    print(f"Queued:      {stats['queued_for_enrichment']}")
+    if stats["last_run"]:
+        print(f"Last run:    {stats['last_run']['run_id']} ({stats['last_run']['status']})")
+
+
+# -----------------------
+# Komentorivi
+# -----------------------
+
+def _run_option_parents(suppress: bool = False):
+    """
+    Parent parsers for the write commands' options. The copies given to
+    the subcommands use SUPPRESS defaults, so `--profile synthesize` keeps
+    the value given before the command instead of resetting it.
+    """
+    def default(value):
+        return argparse.SUPPRESS if suppress else value
+
+    # --resume vain koko ajolle: yksittäiset komennot eivät käytä päiväkirjaa
+    resume_options = argparse.ArgumentParser(add_help=False)
+    resume_options.add_argument(
+        "--resume",
+        action="store_true",
+        default=default(False),
+        help="continue an interrupted run: skip its completed stages (enriched papers are already stored)",
+    )
+    run_options = argparse.ArgumentParser(add_help=False)
+    run_options.add_argument(
+        "--profile",
+        action="store_true",
+        default=default(_env_flag("PIPELINE_PROFILE")),
+        help="profile the run with cProfile (written to reports/profile_<run_id>.prof)",
+    )
+    arxiv_options = argparse.ArgumentParser(add_help=False)
+    arxiv_options.add_argument(
+        "--days-back", type=int, default=default(DAYS_BACK), help="first run: how far back to harvest arXiv"
+    )
+    arxiv_options.add_argument("--max-results", type=int, default=default(MAX_RESULTS), help="arXiv page size")
+    bib_options = argparse.ArgumentParser(add_help=False)
+    bib_options.add_argument(
+        "--max-bib", type=int, default=default(MAX_BIB_PER_RUN), help="BibTeX papers enriched per run"
+    )
+    return resume_options, run_options, arxiv_options, bib_options
+
+
+def build_parser() -> argparse.ArgumentParser:
+    resume_options, run_options, arxiv_options, bib_options = _run_option_parents()
+    sub_resume_options, sub_run_options, sub_arxiv_options, sub_bib_options = _run_option_parents(suppress=True)
+    read_options = argparse.ArgumentParser(add_help=False)
+    read_options.add_argument("--db", default=DB_PATH, help="paper database (.jsonl or .sqlite)")
+    read_options.add_argument("--json", action="store_true", help="machine-readable output")
+
+    parser = argparse.ArgumentParser(
+        description="Daily AI & design research pipeline.",
+        parents=[resume_options, run_options, arxiv_options, bib_options],
+        epilog="Without a command, runs the whole pipeline (same as `run`).",
+    )
+    # journal: kirjoittaako komento ajopäiväkirjaan (vain koko ajo)
+    parser.set_defaults(func=cmd_run, load_env=True, journal=True)
+    sub = parser.add_subparsers(dest="command", metavar="command")
+
+    sub.add_parser(
+        "run", parents=[sub_resume_options, sub_run_options, sub_arxiv_options, sub_bib_options],
+        help="harvest, ingest-bib, enrich and synthesize in one streaming run",
+    ).set_defaults(func=cmd_run)
+    sub.add_parser(
+        "harvest", parents=[sub_run_options, sub_arxiv_options],
+        help="fetch new arXiv papers and queue the relevant ones for enrichment",
+    ).set_defaults(func=cmd_harvest, journal=False)
+    sub.add_parser(
+        "ingest-bib", parents=[sub_run_options],
+        help="parse new and changed Paperpile BibTeX entries and queue them for enrichment",
+    ).set_defaults(func=cmd_ingest_bib, journal=False)
+    sub.add_parser(
+        "enrich", parents=[sub_run_options, sub_bib_options],
+        help="classify queued papers with the LLM and store them",
+    ).set_defaults(func=cmd_enrich, journal=False)
+    sub.add_parser(
+        "synthesize", parents=[sub_run_options],
+        help="regenerate the knowledge/ Markdown from the database",
+    ).set_defaults(func=cmd_synthesize, journal=False)
+
+    query = sub.add_parser("query", parents=[read_options], help="search the paper database")
+    query.add_argument("text", nargs="?", help="words that must all appear in title, abstract or summary")
+    query.add_argument("--phase", help="design phase, e.g. 'Concept design'")
+    query.add_argument("--tag")
+    query.add_argument("--author", help="substring of an author name")
+    query.add_argument("--year", type=_year_range, help="YEAR or START-END")
+    query.add_argument("--limit", type=int, default=20)
+    query.set_defaults(func=cmd_query, load_env=False)
+
+    stats = sub.add_parser("stats", parents=[read_options], help="database size, phases, sources and queue")
+    stats.set_defaults(func=cmd_stats, load_env=False)
+
+    statistics = sub.add_parser(
+        "statistics", help="update the analytics index and knowledge/statistics.md (no LLM calls)",
     )
+    statistics.add_argument("--db", default=DB_PATH, help="paper database (.jsonl or .sqlite)")
+    statistics.add_argument("--knowledge-dir", default=KNOWLEDGE_DIR)
+    statistics.set_defaults(func=cmd_statistics, load_env=False)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.resume and not args.journal:
+        parser.error("--resume only applies to the full run (`run --resume`)")
+    if args.load_env:
+        _load_env()
+    args.func(args)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
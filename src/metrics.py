@@ -0,0 +1,410 @@
+import os
+import json
+import time
+import threading
+import contextlib
+from typing import Dict, Iterator, Optional
+
+
+# -----------------------
+# Perusasetukset
+# -----------------------
+
+REPORTS_DIR = os.environ.get("REPORTS_DIR", "reports")
+# Prometheus node_exporterin textfile-kerääjälle (oletus: reports/metrics.prom)
+METRICS_TEXTFILE = os.environ.get("METRICS_TEXTFILE", os.path.join(REPORTS_DIR, "metrics.prom"))
+
+# LLM-kutsujen kestohistogrammin rajat (sekunteina)
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+# USD / 1M tokenia: (syöte, välimuistista luettu syöte, tuotos).
+# Pisin etuliite voittaa, joten "gpt-4o-mini-2024-07-18" -> "gpt-4o-mini".
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+# Batch API laskuttaa puolet
+BATCH_DISCOUNT = 0.5
+
+
+def model_price(model: str) -> Optional[tuple]:
+    best = None
+    for name in MODEL_PRICES:
+        if model.startswith(name) and (best is None or len(name) > len(best)):
+            best = name
+    return MODEL_PRICES[best] if best else None
+
+
+def estimate_cost(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cached_tokens: int = 0,
+    batch: bool = False,
+) -> Optional[float]:
+    """USD cost of one call, or None for a model without a known price."""
+    price = model_price(model)
+    if price is None:
+        return None
+    input_price, cached_price, output_price = price
+    cost = (
+        (input_tokens - cached_tokens) * input_price
+        + cached_tokens * cached_price
+        + output_tokens * output_price
+    ) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def _usage_counts(usage) -> Dict[str, int]:
+    """Token counts from a Responses API `usage` (SDK object or dict from batch output)."""
+    def field(obj, name):
+        if obj is None:
+            return None
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    details = field(usage, "input_tokens_details")
+    return {
+        "input_tokens": int(field(usage, "input_tokens") or 0),
+        "cached_tokens": int(field(details, "cached_tokens") or 0),
+        "output_tokens": int(field(usage, "output_tokens") or 0),
+    }
+
+
+class Metrics:
+    """
+    Process-wide run metrics: wall time per pipeline stage, accumulated
+    timers for finer steps (one arXiv page, one BibTeX parse, ...), and per
+    model LLM call counts, latency histogram, token usage and estimated
+    cost. LLM usage is also summed per `llm_stage` (classification,
+    synthesis, ...), which the classification cascade report builds on.
+    Thread-safe; `snapshot()` gives everything as one dict.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages: Dict[str, Dict] = {}
+        self.timers: Dict[str, Dict] = {}
+        self.llm: Dict[str, Dict] = {}
+        self.llm_stages: Dict[str, Dict] = {}
+        self.cascade: Dict[str, int] = {}
+        self.cascade_models: Dict[str, str] = {}
+        self._stage_started: Dict[str, float] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # -----------------------
+    # Vaiheet ja ajastimet
+    # -----------------------
+
+    def stage_started(self, stage: str) -> None:
+        with self._lock:
+            self._stage_started[stage] = time.monotonic()
+
+    def stage_finished(self, stage: str) -> None:
+        with self._lock:
+            started = self._stage_started.pop(stage, None)
+            if started is not None:
+                self.stages[stage] = {"seconds": round(time.monotonic() - started, 3)}
+
+    @contextlib.contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        """Accumulate the wall time of a block under `name` (count, total, max)."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                timer = self.timers.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+                timer["count"] += 1
+                timer["seconds"] += elapsed
+                timer["max_seconds"] = max(timer["max_seconds"], elapsed)
+
+    # -----------------------
+    # LLM-kutsut
+    # -----------------------
+
+    @contextlib.contextmanager
+    def llm_stage(self, stage: str) -> Iterator[None]:
+        """Attribute the LLM calls made in this block (in this thread) to `stage`."""
+        previous = getattr(self._local, "stage", None)
+        self._local.stage = stage
+        try:
+            yield
+        finally:
+            self._local.stage = previous
+
+    def _model(self, model: str) -> Dict:
+        entry = self.llm.get(model)
+        if entry is None:
+            entry = self.llm[model] = {
+                "calls": 0,
+                "batch_results": 0,
+                "errors": 0,
+                "retries": 0,
+                "input_tokens": 0,
+                "cached_tokens": 0,
+                "output_tokens": 0,
+                "cost_usd": 0.0,
+                "priced": model_price(model) is not None,
+                "latency_seconds_sum": 0.0,
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),  # viimeinen: +Inf
+            }
+        return entry
+
+    def record_llm_call(
+        self,
+        model: str,
+        seconds: Optional[float] = None,
+        usage=None,
+        error: bool = False,
+        batch: bool = False,
+    ) -> None:
+        """
+        One API call (or one Batch API result when `batch=True`; those have
+        no latency and are billed at the batch discount).
+        """
+        counts = _usage_counts(usage) if usage is not None else None
+        stage = getattr(self._local, "stage", None) or "other"
+        with self._lock:
+            entry = self._model(model)
+            if batch:
+                entry["batch_results"] += 1
+            else:
+                entry["calls"] += 1
+            if error:
+                entry["errors"] += 1
+            if seconds is not None:
+                entry["latency_seconds_sum"] += seconds
+                i = next((i for i, b in enumerate(LATENCY_BUCKETS) if seconds <= b), len(LATENCY_BUCKETS))
+                entry["latency_buckets"][i] += 1
+            per_stage = self.llm_stages.setdefault(
+                stage, {"calls": 0, "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+            )
+            per_stage["calls"] += 1
+            if counts:
+                cost = estimate_cost(model, counts["input_tokens"], counts["output_tokens"], counts["cached_tokens"], batch)
+                for field, value in counts.items():
+                    entry[field] += value
+                    per_stage[field] += value
+                entry["cost_usd"] += cost or 0.0
+                per_stage["cost_usd"] += cost or 0.0
+
+    def record_retry(self, model: str) -> None:
+        with self._lock:
+            self._model(model)["retries"] += 1
+
+    def record_cascade(self, first_model: str, escalation_model: str, accepted: int, escalated: int) -> None:
+        """Papers settled by the cascade's first-pass model vs. escalated to the large one."""
+        with self._lock:
+            self.cascade_models = {"first_pass_model": first_model, "escalation_model": escalation_model}
+            self.cascade["accepted"] = self.cascade.get("accepted", 0) + accepted
+            self.cascade["escalated"] = self.cascade.get("escalated", 0) + escalated
+
+    def _cascade_report(self) -> Dict:
+        """
+        Escalation rate and estimated savings. The cost without the cascade
+        is the first pass's billed tokens priced at the escalation model,
+        i.e. every paper sent straight to the large model.
+        """
+        if not self.cascade:
+            return {}
+        papers = self.cascade["accepted"] + self.cascade["escalated"]
+        first = self.llm_stages.get("classify_first_pass", {})
+        escalation = self.llm_stages.get("classify_escalation", {})
+        actual = first.get("cost_usd", 0.0) + escalation.get("cost_usd", 0.0)
+        without = estimate_cost(
+            self.cascade_models["escalation_model"],
+            first.get("input_tokens", 0),
+            first.get("output_tokens", 0),
+            first.get("cached_tokens", 0),
+        ) or 0.0
+        return {
+            **self.cascade_models,
+            "papers": papers,
+            "accepted": self.cascade["accepted"],
+            "escalated": self.cascade["escalated"],
+            "escalation_rate": round(self.cascade["escalated"] / papers, 3) if papers else 0.0,
+            "cost_usd": round(actual, 6),
+            "cost_without_cascade_usd": round(without, 6),
+            "savings_usd": round(without - actual, 6),
+        }
+
+    # -----------------------
+    # Raportit
+    # -----------------------
+
+    def snapshot(self, cache_stats: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            llm = {}
+            for model, entry in self.llm.items():
+                timed_calls = sum(entry["latency_buckets"])
+                cumulative, buckets = 0, {}
+                for bound, n in zip(list(LATENCY_BUCKETS) + ["+Inf"], entry["latency_buckets"]):
+                    cumulative += n
+                    buckets[str(bound)] = cumulative
+                llm[model] = {
+                    **{k: v for k, v in entry.items() if k not in ("latency_buckets", "cost_usd", "latency_seconds_sum")},
+                    "cost_usd": round(entry["cost_usd"], 6),
+                    "latency_seconds_sum": round(entry["latency_seconds_sum"], 3),
+                    "latency_seconds_mean": round(entry["latency_seconds_sum"] / timed_calls, 3) if timed_calls else 0.0,
+                    "latency_buckets": buckets,
+                }
+            return {
+                "started_at": self.started_at,
+                "wall_seconds": round(time.time() - self.started_at, 3),
+                "stages": dict(self.stages),
+                "timers": {
+                    name: {
+                        "count": t["count"],
+                        "seconds": round(t["seconds"], 3),
+                        "max_seconds": round(t["max_seconds"], 3),
+                    }
+                    for name, t in self.timers.items()
+                },
+                "llm": llm,
+                "llm_stages": {
+                    stage: {**s, "cost_usd": round(s["cost_usd"], 6)} for stage, s in self.llm_stages.items()
+                },
+                "cascade": self._cascade_report(),
+                "cost_usd": round(sum(m["cost_usd"] for m in llm.values()), 6),
+                "cache": cache_stats or {},
+            }
+
+    def write_report(
+        self,
+        run_id: str,
+        cache_stats: Optional[Dict] = None,
+        reports_dir: str = REPORTS_DIR,
+        textfile_path: str = METRICS_TEXTFILE,
+    ) -> str:
+        """
+        Write reports/run_<run_id>.json and the Prometheus textfile.
+        Returns the path of the JSON report.
+        """
+        report = {"run_id": run_id, **self.snapshot(cache_stats)}
+        os.makedirs(reports_dir, exist_ok=True)
+        path = os.path.join(reports_dir, f"run_{run_id}.json")
+        _write_atomic(path, json.dumps(report, ensure_ascii=False, indent=2))
+        if textfile_path:
+            os.makedirs(os.path.dirname(textfile_path) or ".", exist_ok=True)
+            _write_atomic(textfile_path, prometheus_text(report))
+        print(
+            f"[metrics] Run took {report['wall_seconds']:.1f}s, "
+            f"{sum(m['calls'] for m in report['llm'].values())} LLM calls, "
+            f"~${report['cost_usd']:.4f}. Report: {path}"
+        )
+        cascade = report.get("cascade")
+        if cascade:
+            print(
+                f"[metrics] Cascade escalated {cascade['escalated']}/{cascade['papers']} papers "
+                f"({cascade['escalation_rate']:.0%}), saved ~${cascade['savings_usd']:.4f}."
+            )
+        return path
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def prometheus_text(report: Dict) -> str:
+    """Render a run report in the Prometheus text exposition format."""
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_labels(**labels) if labels else ''} {value}")
+
+    metric("design_agent_last_run_timestamp_seconds", "gauge", "Start time of the last pipeline run.",
+           [("", {}, int(report["started_at"]))])
+    metric("design_agent_run_seconds", "gauge", "Wall time of the last pipeline run.",
+           [("", {}, report["wall_seconds"])])
+    metric("design_agent_stage_seconds", "gauge", "Wall time of each pipeline stage in the last run.",
+           [("", {"stage": s}, v["seconds"]) for s, v in report["stages"].items()])
+    metric("design_agent_step_seconds", "gauge", "Accumulated wall time of timed steps in the last run.",
+           [("", {"step": s}, v["seconds"]) for s, v in report["timers"].items()])
+    metric("design_agent_step_count", "gauge", "Number of timed steps in the last run.",
+           [("", {"step": s}, v["count"]) for s, v in report["timers"].items()])
+
+    latency = []
+    for model, m in report["llm"].items():
+        for bound, n in m["latency_buckets"].items():
+            latency.append(("_bucket", {"model": model, "le": bound}, n))
+        latency.append(("_sum", {"model": model}, m["latency_seconds_sum"]))
+        latency.append(("_count", {"model": model}, m["latency_buckets"]["+Inf"]))
+    metric("design_agent_llm_request_seconds", "histogram", "Latency of LLM API calls in the last run.", latency)
+    metric("design_agent_llm_errors", "gauge", "Failed LLM API calls in the last run.",
+           [("", {"model": model}, m["errors"]) for model, m in report["llm"].items()])
+    metric("design_agent_llm_retries", "gauge", "Retried LLM API calls in the last run.",
+           [("", {"model": model}, m["retries"]) for model, m in report["llm"].items()])
+    tokens = []
+    for model, m in report["llm"].items():
+        for kind in ("input", "cached", "output"):
+            tokens.append(("", {"model": model, "kind": kind}, m[f"{kind}_tokens"]))
+    metric("design_agent_llm_tokens", "gauge", "LLM tokens used in the last run.", tokens)
+    metric("design_agent_llm_cost_usd", "gauge", "Estimated LLM cost of the last run in USD.",
+           [("", {"model": model}, m["cost_usd"]) for model, m in report["llm"].items()])
+
+    metric("design_agent_llm_stage_cost_usd", "gauge", "Estimated LLM cost of each pipeline stage in the last run.",
+           [("", {"stage": stage}, s["cost_usd"]) for stage, s in report.get("llm_stages", {}).items()])
+    cascade = report.get("cascade") or {}
+    if cascade:
+        metric("design_agent_cascade_papers", "gauge", "Papers settled by the first-pass model or escalated.",
+               [("", {"result": "accepted"}, cascade["accepted"]), ("", {"result": "escalated"}, cascade["escalated"])])
+        metric("design_agent_cascade_savings_usd", "gauge", "Estimated savings of the classification cascade.",
+               [("", {}, cascade["savings_usd"])])
+
+    cache = report.get("cache") or {}
+    metric("design_agent_llm_cache_requests", "gauge", "LLM response cache lookups in the last run.",
+           [("", {"result": "hit"}, cache.get("hits", 0)), ("", {"result": "miss"}, cache.get("misses", 0))])
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------
+# Profilointi (valinnainen)
+# -----------------------
+
+def start_profiler() -> "cProfile.Profile":
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler: "cProfile.Profile", run_id: str, reports_dir: str = REPORTS_DIR, top: int = 25) -> str:
+    """
+    Dump the profile to reports/profile_<run_id>.prof (open with
+    `python -m pstats` or snakeviz) and print the top functions by
+    cumulative time. cProfile only sees the main thread, so time spent in
+    worker threads shows up as waiting on their futures.
+    """
+    profiler.disable()
+    os.makedirs(reports_dir, exist_ok=True)
+    path = os.path.join(reports_dir, f"profile_{run_id}.prof")
+    profiler.dump_stats(path)
+    print(f"[metrics] Profile written to {path}")
+    import pstats
+
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+    return path
+
+
+# Prosessin yhteiset mittarit
+METRICS = Metrics()
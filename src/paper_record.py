@@ -0,0 +1,284 @@
+import sys
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Howard et al. (2008) -vaiheet; bittimaskin bitit 0..5 tässä järjestyksessä
+PHASES = [
+    "Establishing a need",
+    "Analysis of task",
+    "Concept design",
+    "Embodiment design",
+    "Detail design",
+    "Implementation",
+]
+
+
+class Vocabulary:
+    """
+    Interned values of one field (phases, tags, ...): every distinct value
+    is stored once and papers hold small integer ids instead. Ids are
+    never reused, so they stay valid for the life of the process.
+    """
+
+    def __init__(self, initial: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+        for name in initial:
+            self.intern(name)
+
+    def intern(self, name: str) -> int:
+        i = self._ids.get(name)
+        if i is None:
+            with self._lock:
+                i = self._ids.get(name)
+                if i is None:
+                    i = len(self._names)
+                    self._names.append(name)
+                    self._ids[name] = i
+        return i
+
+    def encode(self, values) -> Optional[Tuple[int, ...]]:
+        """List of values -> tuple of ids; None if the values cannot be interned."""
+        ids = self._ids
+        try:
+            return tuple([ids[v] if v in ids else self.intern(v) for v in values])
+        except TypeError:  # esim. sisäkkäinen lista
+            return None
+
+    def decode(self, ids: Tuple[int, ...]) -> List[str]:
+        names = self._names
+        return [names[i] for i in ids]
+
+    def id(self, name: str) -> Optional[int]:
+        """Id of `name`, or None if no paper has used it."""
+        return self._ids.get(name)
+
+    def name(self, i: int) -> str:
+        return self._names[i]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+PHASE_VOCAB = Vocabulary(PHASES)
+TAG_VOCAB = Vocabulary()
+ROLE_VOCAB = Vocabulary()
+RESEARCH_TYPE_VOCAB = Vocabulary()
+
+# Kentät, jotka tallennetaan sanaston id-tupleina
+VOCAB_FIELDS = {
+    "design_phase": PHASE_VOCAB,
+    "tags": TAG_VOCAB,
+    "ai_roles": ROLE_VOCAB,
+    "research_type": RESEARCH_TYPE_VOCAB,
+}
+# Muistissa pidettävät kentät: tunnisteet sekä synteesin ja esisuodatuksen
+# joka ajolla lukema teksti. Muut (kirjoittajat, kategoriat, päivämäärät,
+# url, doi, julkaisu, ...) luetaan levyltä vasta tarvittaessa.
+INLINE_FIELDS = (
+    "id", "year", "title", "source", "aliases", "bib_hash",
+    "abstract", "summary_short", "implications_for_design_research",
+)
+
+_MASK64 = (1 << 64) - 1
+
+
+class _Shape:
+    """Key order and key set shared by all records with the same fields."""
+
+    __slots__ = ("keys", "keyset")
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys = keys
+        self.keyset = frozenset(keys)
+
+
+_shapes: Dict[Tuple[str, ...], _Shape] = {}
+
+
+def _shape(record: Dict) -> _Shape:
+    keys = tuple(record)
+    shape = _shapes.get(keys)
+    if shape is None:
+        shape = _shapes.setdefault(keys, _Shape(keys))
+    return shape
+
+
+def phase_mask(phases) -> int:
+    """Bitmask of design phases (bit i = PHASE_VOCAB id i)."""
+    if not phases:
+        return 0
+    if not isinstance(phases, (list, tuple)):
+        phases = [phases]
+    mask = 0
+    for phase in phases:
+        if isinstance(phase, str):
+            mask |= 1 << PHASE_VOCAB.intern(phase)
+    return mask
+
+
+class Paper(Mapping):
+    """
+    Compact, read-only view of one stored paper.
+
+    Identifiers and the text every synthesis run reads (title, abstract,
+    summary, implications) are kept inline; design phases, tags, AI roles
+    and research types as id tuples into shared vocabularies, with phase
+    membership also as a bitmask. The remaining fields (authors,
+    categories, dates, links, ...) are read from the database file when
+    accessed, through the store's offset index, so they always reflect
+    the latest stored line for the id.
+
+    Behaves like the record dict for reading (`p["id"]`, `p.get(...)`,
+    `dict(p)`, `{**p}`); use `dict(p)` where a real dict is needed, e.g.
+    before modifying or serialising a record.
+    """
+
+    __slots__ = INLINE_FIELDS + ("phase_mask", "_phases", "_tags", "_roles", "_types", "_shape", "_store")
+
+    def __init__(self, record: Dict, store):
+        get = record.get
+        self.id = get("id")
+        self.year = get("year")
+        self.title = get("title")
+        source = get("source")
+        self.source = sys.intern(source) if type(source) is str else source
+        self.aliases = get("aliases")
+        self.bib_hash = get("bib_hash")
+        self.abstract = get("abstract")
+        self.summary_short = get("summary_short")
+        implications = get("implications_for_design_research")
+        self.implications_for_design_research = tuple(implications) if type(implications) is list else implications
+        self._phases = self._encoded(get("design_phase"), PHASE_VOCAB)
+        self._tags = self._encoded(get("tags"), TAG_VOCAB)
+        self._roles = self._encoded(get("ai_roles"), ROLE_VOCAB)
+        self._types = self._encoded(get("research_type"), RESEARCH_TYPE_VOCAB)
+        if type(self._phases) is tuple:
+            mask = 0
+            for i in self._phases:
+                mask |= 1 << i
+            self.phase_mask = mask
+        else:
+            self.phase_mask = phase_mask(self._phases)
+        self._shape = _shape(record)
+        self._store = store
+
+    @staticmethod
+    def _encoded(value, vocab: Vocabulary):
+        """List -> id tuple; anything else (None, a bare string, ...) is kept as is."""
+        if type(value) is list:
+            ids = vocab.encode(value)
+            if ids is not None:
+                return ids
+        return value
+
+    def _value(self, key: str):
+        slot = _FIELD_SLOTS.get(key)
+        if slot is None:
+            record = self._store.read_record(self.id)
+            if record is None or key not in record:
+                raise KeyError(key)
+            return record[key]
+        value = getattr(self, slot)
+        if slot in _VOCAB_SLOTS:
+            return VOCAB_FIELDS[key].decode(value) if type(value) is tuple else value
+        if type(value) is tuple:
+            return list(value)
+        return value
+
+    def same_inline(self, record: Dict) -> bool:
+        """
+        Cheap check before comparing against the full stored record: same
+        keys and same in-memory field values as `record`.
+        """
+        keyset = self._shape.keyset
+        if keyset != record.keys():
+            return False
+        for key in _FIELD_SLOTS:
+            if key in keyset and self._value(key) != record[key]:
+                return False
+        return True
+
+    def __getitem__(self, key: str):
+        if key not in self._shape.keyset:
+            raise KeyError(key)
+        return self._value(key)
+
+    def get(self, key: str, default=None):
+        if key not in self._shape.keyset:
+            return default
+        try:
+            return self._value(key)
+        except KeyError:  # tietue poistettu tai siirretty toiselle id:lle
+            return default
+
+    def __contains__(self, key) -> bool:
+        return key in self._shape.keyset
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._shape.keys)
+
+    def __len__(self) -> int:
+        return len(self._shape.keys)
+
+    def __repr__(self) -> str:
+        return f"Paper({self.id!r})"
+
+
+# Kenttä -> slotti, jossa arvo on muistissa
+_FIELD_SLOTS = {field: field for field in INLINE_FIELDS}
+_FIELD_SLOTS.update({"design_phase": "_phases", "tags": "_tags", "ai_roles": "_roles", "research_type": "_types"})
+_VOCAB_SLOTS = frozenset(("_phases", "_tags", "_roles", "_types"))
+
+
+def phase_masks(papers: List[Dict]):
+    """
+    uint64 NumPy array of phase bitmasks, one per paper (Paper or plain
+    dict). Phases beyond the first 64 vocabulary entries are left out;
+    `phase_indices` finds those without the mask.
+    """
+    import numpy as np
+
+    return np.fromiter(
+        (
+            (p.phase_mask if isinstance(p, Paper) else phase_mask(p.get("design_phase"))) & _MASK64
+            for p in papers
+        ),
+        dtype=np.uint64,
+        count=len(papers),
+    )
+
+
+def years(papers: List[Dict]):
+    """int64 NumPy array of years (0 when missing or not a number)."""
+    import numpy as np
+
+    def year(p) -> int:
+        try:
+            return int(p.get("year") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    return np.fromiter((year(p) for p in papers), dtype=np.int64, count=len(papers))
+
+
+def has_phase(paper: Dict, phase: str) -> bool:
+    phases = paper.get("design_phase") or []
+    if not isinstance(phases, list):
+        phases = [phases]
+    return phase in phases
+
+
+def phase_indices(papers: List[Dict], masks, phase: str):
+    """Indices (NumPy array, ascending) of the papers in `phase`, given their `phase_masks`."""
+    import numpy as np
+
+    i = PHASE_VOCAB.id(phase)
+    if i is None:
+        return np.empty(0, dtype=np.int64)
+    if i >= 64:
+        return np.asarray([j for j, p in enumerate(papers) if has_phase(p, phase)], dtype=np.int64)
+    return np.flatnonzero(masks & np.uint64(1 << i))
@@ -0,0 +1,324 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Iterable, Optional, Set, Tuple
+
+from .paper_record import Paper, phase_masks, years, phase_indices
+
+
+# Tiivistetään, kun vanhentuneita rivejä on tämän osuuden verran eläviin nähden
+COMPACT_RATIO = float(os.environ.get("PAPER_STORE_COMPACT_RATIO", "0.25"))
+COMPACT_MIN_DEAD_LINES = int(os.environ.get("PAPER_STORE_COMPACT_MIN", "50"))
+# Montako levyltä luettua kokonaista tietuetta pidetään muistissa (Paperin levyllä olevat kentät)
+RECORD_CACHE_SIZE = int(os.environ.get("PAPER_STORE_RECORD_CACHE", "256"))
+
+
+class PaperStore:
+    """
+    Append-only JSONL paper database with an in-memory index.
+
+    The file is parsed once per process into an id -> byte-offset index
+    plus one compact `Paper` per record; fields the pipeline rarely reads
+    (authors, dates, links, ...) are read back through the offset index
+    when accessed, with a small cache of recent records. New or updated records are appended as new lines; the last
+    line for an id wins. Superseded lines are dropped by `compact()`,
+    which rewrites the file via a temp file + atomic rename and runs
+    automatically once enough dead lines have accumulated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._offsets: Dict[str, int] = {}
+        self._records: Dict[str, Paper] = {}
+        self._anonymous: List[Dict] = []  # rivit ilman id-kenttää
+        self._line_count = 0
+        self._file_state: Optional[Tuple[int, int]] = None
+        self._loaded = False
+        self._reader = None
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._columns = None  # (paperit, vaihemaskit, vuodet) NumPy-suodatukseen
+
+    # -----------------------
+    # Lataus
+    # -----------------------
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _reset_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._cache.clear()
+        self._columns = None
+
+    def _load(self) -> None:
+        self._reset_reader()
+        self._offsets = {}
+        self._records = {}
+        self._anonymous = []
+        self._line_count = 0
+        try:
+            with open(self.path, "rb") as f:
+                offset = 0
+                for raw in f:
+                    line_offset = offset
+                    offset += len(raw)
+                    line = raw.strip()
+                    if not line:
+                        continue
+                    self._line_count += 1
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        # ohitetaan mahdolliset rikkinäiset rivit
+                        continue
+                    rec_id = rec.get("id") if isinstance(rec, dict) else None
+                    if not rec_id:
+                        self._anonymous.append(rec)
+                        continue
+                    self._offsets[rec_id] = line_offset
+                    self._records[rec_id] = Paper(rec, self)
+        except FileNotFoundError:
+            pass
+        self._file_state = self._stat()
+        self._loaded = True
+
+    def _ensure_fresh(self) -> None:
+        """(Re)load if not loaded yet or the file was changed by someone else."""
+        if not self._loaded or self._stat() != self._file_state:
+            self._load()
+
+    # -----------------------
+    # Luku
+    # -----------------------
+
+    def all(self) -> List[Dict]:
+        """All live records (compact `Paper`s), in first-insertion order."""
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._records.values()) + list(self._anonymous)
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            self._ensure_fresh()
+            return set(self._records)
+
+    def get(self, paper_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._ensure_fresh()
+            return self._records.get(paper_id)
+
+    def _read_line(self, offset: int) -> bytes:
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(offset)
+        return self._reader.readline()
+
+    def read_record(self, paper_id: str) -> Optional[Dict]:
+        """
+        The full stored record as a dict, read from disk through the offset
+        index (recently read records come from a small cache).
+        """
+        with self._lock:
+            self._ensure_fresh()
+            record = self._cache.get(paper_id)
+            if record is not None:
+                self._cache.move_to_end(paper_id)
+                return record
+            offset = self._offsets.get(paper_id)
+            if offset is None:
+                return None
+            record = json.loads(self._read_line(offset))
+            self._cache[paper_id] = record
+            if len(self._cache) > RECORD_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return record
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_fresh()
+            return len(self._records)
+
+    def __contains__(self, paper_id: str) -> bool:
+        with self._lock:
+            self._ensure_fresh()
+            return paper_id in self._records
+
+    def _phase_columns(self):
+        """(papers, phase masks, years) as NumPy columns; rebuilt after any write."""
+        with self._lock:
+            self._ensure_fresh()
+            if self._columns is None:
+                papers = list(self._records.values())
+                self._columns = (papers, phase_masks(papers), years(papers))
+            return self._columns
+
+    def papers_by_phase(self, phase: str, limit: Optional[int] = None) -> List[Dict]:
+        """Papers of one design phase, newest first (ties in insertion order)."""
+        import numpy as np
+
+        papers, masks, year_column = self._phase_columns()
+        order = phase_indices(papers, masks, phase)
+        order = order[np.argsort(-year_column[order], kind="stable")]
+        if limit is not None:
+            order = order[:limit]
+        return [papers[i] for i in order]
+
+    def latest_papers(self, limit: int) -> List[Dict]:
+        """The last `limit` papers by year, in ascending year order."""
+        import numpy as np
+
+        papers, _, year_column = self._phase_columns()
+        order = np.argsort(year_column, kind="stable")[-limit:] if limit > 0 else []
+        return [papers[i] for i in order]
+
+    # -----------------------
+    # Kirjoitus
+    # -----------------------
+
+    def upsert(self, records: Iterable[Dict]) -> int:
+        """
+        Append new or changed records (records without an id are skipped,
+        unchanged ones are not rewritten). Returns the number appended.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            lines: List[Tuple[str, bytes, Dict]] = []
+            for rec in records:
+                rec_id = rec.get("id")
+                if not rec_id:
+                    continue
+                if isinstance(rec, Paper):
+                    rec = dict(rec)
+                current = self._records.get(rec_id)
+                if current is not None and current.same_inline(rec) and self.read_record(rec_id) == rec:
+                    continue
+                data = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+                lines.append((rec_id, data, rec))
+            if not lines:
+                return 0
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                if offset > 0 and not self._ends_with_newline():
+                    f.write(b"\n")
+                    offset += 1
+                for rec_id, data, rec in lines:
+                    f.write(data)
+                    self._offsets[rec_id] = offset
+                    self._records[rec_id] = Paper(rec, self)
+                    self._cache.pop(rec_id, None)
+                    offset += len(data)
+                    self._line_count += 1
+                f.flush()
+                os.fsync(f.fileno())
+            self._file_state = self._stat()
+            self._columns = None
+
+            if self.dead_lines() >= max(COMPACT_MIN_DEAD_LINES, COMPACT_RATIO * len(self._records)):
+                self.compact()
+            return len(lines)
+
+    def delete(self, paper_ids: Iterable[str]) -> int:
+        """Remove records by id; the file is rewritten at once. Returns the number removed."""
+        with self._lock:
+            self._ensure_fresh()
+            removed = 0
+            for paper_id in paper_ids:
+                if self._records.pop(paper_id, None) is not None:
+                    self._offsets.pop(paper_id, None)
+                    self._cache.pop(paper_id, None)
+                    self._columns = None
+                    removed += 1
+            if removed:
+                self.compact()
+            return removed
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def dead_lines(self) -> int:
+        """Lines in the file that are superseded by a later line (or unreadable)."""
+        with self._lock:
+            self._ensure_fresh()
+            return self._line_count - len(self._records) - len(self._anonymous)
+
+    def compact(self) -> None:
+        """Rewrite the file with one line per live record (temp file + atomic rename)."""
+        with self._lock:
+            self._ensure_fresh()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            offsets: Dict[str, int] = {}
+            with open(tmp_path, "wb") as f:
+                # Elävät rivit kopioidaan sellaisenaan vanhasta tiedostosta
+                for rec_id in self._records:
+                    offsets[rec_id] = f.tell()
+                    line = self._read_line(self._offsets[rec_id])
+                    f.write(line if line.endswith(b"\n") else line + b"\n")
+                for rec in self._anonymous:
+                    f.write((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            self._reset_reader()
+            os.replace(tmp_path, self.path)
+            self._offsets = offsets
+            self._line_count = len(self._records) + len(self._anonymous)
+            self._file_state = self._stat()
+            print(f"[paper_store] Compacted {self.path} ({len(self._records)} records).")
+
+
+# PAPER_DB_BACKEND=sqlite: data/papers_structured.jsonl -> data/papers_structured.sqlite
+# (tuodaan JSONL:stä automaattisesti ensimmäisellä avauksella). Koskee vain
+# pääkantaa; apu-JSONL:t (esim. Batch API:n paperilista) ovat aina PaperStoreja.
+DB_BACKEND = os.environ.get("PAPER_DB_BACKEND", "jsonl").lower()
+PAPER_DB_PATH = "data/papers_structured.jsonl"  # sama kuin main.DB_PATH
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+_stores: Dict[str, object] = {}
+_stores_lock = threading.Lock()
+
+
+def sqlite_path_for(path: str) -> Optional[str]:
+    """
+    The SQLite file `open_store(path)` uses, or None if it opens a JSONL
+    PaperStore. PAPER_DB_BACKEND only redirects the main paper database.
+    """
+    if path.endswith(SQLITE_SUFFIXES):
+        return path
+    if DB_BACKEND == "sqlite" and os.path.abspath(path) == os.path.abspath(PAPER_DB_PATH):
+        return os.path.splitext(path)[0] + ".sqlite"
+    return None
+
+
+def open_store(path: str):
+    """
+    One shared store per database, so a run parses it only once.
+    Returns a PaperStore (JSONL) or, for *.sqlite paths or the main
+    database with PAPER_DB_BACKEND=sqlite, a SQLiteStore with the same
+    interface.
+    """
+    sqlite_path = sqlite_path_for(path)
+    key = os.path.abspath(sqlite_path or path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if sqlite_path:
+                from .sqlite_store import SQLiteStore
+
+                import_from = path if path != sqlite_path else None
+                store = SQLiteStore(sqlite_path, import_from=import_from)
+            else:
+                store = PaperStore(path)
+            _stores[key] = store
+        return store
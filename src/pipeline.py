@@ -0,0 +1,171 @@
+import os
+import json
+import queue
+import threading
+from typing import List, Dict, Callable, Iterable, Iterator, Set, Tuple
+
+from .utils import reconcile_arxiv_versions
+
+
+# Vaiheiden välisen jonon koko: tuottaja odottaa, kun jono on täynnä
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "64"))
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def bounded(iterable: Iterable, maxsize: int = PIPELINE_QUEUE_SIZE) -> Iterator:
+    """
+    Run `iterable` in a background thread that feeds a bounded queue, so
+    the producer (e.g. paging through arXiv) keeps working while the
+    consumer enriches, but is never more than `maxsize` items ahead.
+    Errors in the producer are re-raised in the consumer; closing the
+    returned generator early stops the producer.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:  # välitetään kuluttajalle
+            put(_Failure(e))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+
+def reconcile_versions(
+    papers: Iterable[Dict],
+    existing: Dict[str, Dict],
+    on_update: Callable[[Dict], None],
+) -> Iterator[Dict]:
+    """
+    Stage form of `reconcile_arxiv_versions`: yields papers that need
+    enrichment; metadata-only version bumps go to `on_update`.
+    """
+    for paper in papers:
+        to_enrich, updates = reconcile_arxiv_versions([paper], existing)
+        for record in updates:
+            on_update(record)
+        yield from to_enrich
+
+
+def drop_known(papers: Iterable[Dict], known_ids: Set[str], keep_ids: Set[str]) -> Iterator[Dict]:
+    """Skip papers whose id is already known, unless it is in `keep_ids` (re-enrichment)."""
+    for paper in papers:
+        if paper["id"] in keep_ids or paper["id"] not in known_ids:
+            yield paper
+
+
+def split_duplicates(
+    papers: Iterable[Dict],
+    index,
+    duplicates: List[Tuple[Dict, str]],
+    skip_ids: Set[str] = frozenset(),
+) -> Iterator[Dict]:
+    """
+    Stage form of `DuplicateIndex.split_duplicates`: yields fresh papers and
+    appends (duplicate, canonical_id) pairs to `duplicates`. Papers in
+    `skip_ids` (already stored under their own id) pass through unchecked.
+    """
+    for paper in papers:
+        if paper["id"] in skip_ids:
+            yield paper
+            continue
+        fresh, dups = index.split_duplicates([paper])
+        duplicates.extend(dups)
+        yield from fresh
+
+
+# Rikastusjono: harvest / ingest-bib kirjoittavat ehdokkaat tänne, enrich tyhjentää
+ENRICH_QUEUE_PATH = os.environ.get("ENRICH_QUEUE_PATH", "data/enrich_queue.jsonl")
+
+
+class EnrichQueue:
+    """
+    Candidates waiting for LLM enrichment, as a small JSONL file (one paper
+    per line, unique by id; a re-queued paper replaces the earlier line).
+    Lets the `harvest` and `ingest-bib` commands run without an API key and
+    `enrich` pick the papers up later. Rewritten atomically on every change.
+    """
+
+    def __init__(self, path: str = ENRICH_QUEUE_PATH):
+        self.path = path
+
+    def load(self) -> List[Dict]:
+        papers: Dict[str, Dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        paper = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if paper.get("id"):
+                        papers[paper["id"]] = paper
+        except FileNotFoundError:
+            pass
+        return list(papers.values())
+
+    def ids(self) -> Set[str]:
+        return {p["id"] for p in self.load()}
+
+    def _save(self, papers: List[Dict]) -> None:
+        if not papers:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for paper in papers:
+                f.write(json.dumps(paper, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def add(self, papers: Iterable[Dict]) -> int:
+        """Queue papers (replacing queued ones with the same id); returns how many were given."""
+        queued = {p["id"]: p for p in self.load()}
+        added = 0
+        for paper in papers:
+            queued[paper["id"]] = paper
+            added += 1
+        if added:
+            self._save(list(queued.values()))
+        return added
+
+    def remove(self, paper_ids: Iterable[str]) -> int:
+        drop = set(paper_ids)
+        queued = self.load()
+        kept = [p for p in queued if p["id"] not in drop]
+        if len(kept) != len(queued):
+            self._save(kept)
+        return len(queued) - len(kept)
@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import zlib
+from typing import List, Dict, Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+
+# -----------------------
+# Perusasetukset
+# -----------------------
+
+PRESCORE_MODEL_PATH = "data/prescore_model.npz"
+N_FEATURES = 2 ** 16
+# Kynnys kosinisamankaltaisuudelle; 0 = esisuodatus pois päältä.
+# Nykyisellä kirjastolla omat paperit saavat ~0.06–0.2, aiheen ulkopuoliset < 0.04.
+PRESCORE_THRESHOLD = float(os.environ.get("PRESCORE_THRESHOLD", "0.04"))
+
+ALL_LABEL = "__all__"
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9]+")
+STOPWORDS = frozenset(
+    """
+    a an and are as at be been by can for from has have in into is it its of on or our
+    such that the their these this those to was we were which with within without via
+    using use used based paper study approach results show propose proposed new also
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word unigrams + bigrams, stopwords removed."""
+    words = [w for w in TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+    return words + [a + " " + b for a, b in zip(words, words[1:])]
+
+
+def paper_text(paper: Dict) -> str:
+    parts = [paper.get("title") or "", paper.get("abstract") or "", paper.get("summary_short") or ""]
+    return " ".join(parts)
+
+
+class RelevanceScorer:
+    """
+    Local TF-IDF relevance model on hashed features (NumPy only).
+
+    Each document is hashed into N_FEATURES buckets and L2-normalised;
+    per-label centroids (all documents + one per design phase) are kept as
+    running sums together with document frequencies, so new documents can
+    be added without retraining. IDF weights are applied at scoring time,
+    and a candidate's score is its best cosine similarity to any centroid.
+    """
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.n_features = n_features
+        self.df = np.zeros(n_features, dtype=np.int32)
+        self.n_docs = 0
+        self.sums: Dict[str, np.ndarray] = {}
+        self.seen_ids = set()
+        self._centroids = None  # (labels, matrix, idf), nollataan kun dokumentteja lisätään
+
+    def _vectorize(self, text: str):
+        """Sparse (indices, values) of the L2-normalised term-frequency vector."""
+        tokens = tokenize(text)
+        if not tokens:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        hashed = np.fromiter(
+            (zlib.crc32(t.encode("utf-8")) % self.n_features for t in tokens),
+            dtype=np.int64,
+            count=len(tokens),
+        )
+        idx, counts = np.unique(hashed, return_counts=True)
+        values = np.log1p(counts).astype(np.float32)
+        values /= np.linalg.norm(values)
+        return idx, values
+
+    def add_documents(self, papers: Iterable[Dict]) -> int:
+        """Add positive examples (skipping ids already seen). Returns how many were added."""
+        added = 0
+        for p in papers:
+            pid = p.get("id")
+            if pid in self.seen_ids:
+                continue
+            idx, values = self._vectorize(paper_text(p))
+            if not len(idx):
+                continue
+            self.df[idx] += 1
+            self.n_docs += 1
+            phases = p.get("design_phase") or []
+            if not isinstance(phases, list):
+                phases = [phases]
+            for label in [ALL_LABEL] + [str(ph) for ph in phases]:
+                if label not in self.sums:
+                    self.sums[label] = np.zeros(self.n_features, dtype=np.float32)
+                self.sums[label][idx] += values
+            if pid:
+                self.seen_ids.add(pid)
+            added += 1
+        if added:
+            self._centroids = None
+        return added
+
+    def _centroid_matrix(self):
+        """(labels, matrix, idf) with IDF-weighted, L2-normalised centroids as rows."""
+        if self._centroids is not None:
+            return self._centroids
+        idf = np.log((1 + self.n_docs) / (1 + self.df)).astype(np.float32) + 1.0
+        labels = sorted(self.sums)
+        matrix = np.stack([self.sums[label] for label in labels]) * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._centroids = (labels, matrix / norms, idf)
+        return self._centroids
+
+    def score_batch(self, papers: List[Dict]) -> np.ndarray:
+        """Best cosine similarity of each paper to any centroid (0 for an empty model)."""
+        scores = np.zeros(len(papers), dtype=np.float32)
+        if not self.sums or not papers:
+            return scores
+        _labels, centroids, idf = self._centroid_matrix()
+        for i, p in enumerate(papers):
+            idx, values = self._vectorize(paper_text(p))
+            if not len(idx):
+                continue
+            weighted = values * idf[idx]
+            weighted /= np.linalg.norm(weighted)
+            scores[i] = float((centroids[:, idx] @ weighted).max())
+        return scores
+
+    # -----------------------
+    # Tallennus
+    # -----------------------
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        labels = sorted(self.sums)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            df=self.df,
+            n_docs=np.array([self.n_docs]),
+            labels=np.array(json.dumps(labels)),
+            sums=np.stack([self.sums[label] for label in labels]) if labels else np.zeros((0, self.n_features)),
+            seen_ids=np.array(json.dumps(sorted(self.seen_ids))),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RelevanceScorer":
+        with np.load(path) as data:
+            scorer = cls(n_features=int(data["df"].shape[0]))
+            scorer.df = data["df"].astype(np.int32)
+            scorer.n_docs = int(data["n_docs"][0])
+            labels = json.loads(str(data["labels"]))
+            scorer.sums = {label: data["sums"][i].astype(np.float32) for i, label in enumerate(labels)}
+            scorer.seen_ids = set(json.loads(str(data["seen_ids"])))
+        return scorer
+
+
+def load_or_build_scorer(
+    corpus: List[Dict],
+    bib_path: Optional[str] = None,
+    model_path: str = PRESCORE_MODEL_PATH,
+) -> RelevanceScorer:
+    """
+    Load the persisted model and add any corpus records it has not seen.
+    On first use the model is built from the corpus plus the whole
+    Paperpile library (`bib_path`) as positive examples.
+    """
+    if os.path.exists(model_path):
+        scorer = RelevanceScorer.load(model_path)
+    else:
+        scorer = RelevanceScorer()
+        if bib_path and os.path.exists(bib_path):
+            from .fetch_bibtex import load_bibtex
+
+            scorer.add_documents(load_bibtex(bib_path))
+
+    added = scorer.add_documents(corpus)
+    if added or not os.path.exists(model_path):
+        scorer.save(model_path)
+    print(f"[prescore] Relevance model has {scorer.n_docs} documents ({added} added).")
+    return scorer
+
+
+def filter_by_relevance(
+    papers: List[Dict],
+    scorer: RelevanceScorer,
+    threshold: float = PRESCORE_THRESHOLD,
+) -> List[Dict]:
+    """Keep papers scoring at or above `threshold`; log the rest with their score."""
+    if threshold <= 0 or not papers:
+        return papers
+    scores = scorer.score_batch(papers)
+    kept = []
+    for p, score in zip(papers, scores):
+        if score >= threshold:
+            kept.append(p)
+        else:
+            print(f"[prescore] Skipping (score {score:.3f} < {threshold}): {p.get('title', '')[:80]}")
+    print(f"[prescore] {len(kept)}/{len(papers)} candidates above threshold {threshold}.")
+    return kept
+
+
+def iter_relevant(
+    papers: Iterable[Dict],
+    scorer: RelevanceScorer,
+    threshold: float = PRESCORE_THRESHOLD,
+    on_reject: Optional[Callable[[Dict], None]] = None,
+    skip_ids: Iterable[str] = (),
+) -> Iterator[Dict]:
+    """
+    Streaming variant of `filter_by_relevance`: scores papers one at a
+    time. Papers in `skip_ids` (e.g. already stored) pass unscored.
+    """
+    skip_ids = set(skip_ids)
+    for p in papers:
+        if threshold > 0 and p.get("id") not in skip_ids:
+            score = scorer.score_batch([p])[0]
+            if score < threshold:
+                print(f"[prescore] Skipping (score {score:.3f} < {threshold}): {p.get('title', '')[:80]}")
+                if on_reject is not None:
+                    on_reject(p)
+                continue
+        yield p
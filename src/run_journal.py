@@ -0,0 +1,110 @@
+import os
+import json
+import datetime as dt
+from typing import Dict, Optional
+
+from .metrics import METRICS
+
+
+RUN_JOURNAL_PATH = "data/run_journal.json"
+
+
+def _now() -> str:
+    return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+class RunJournal:
+    """
+    Progress record of one pipeline run, rewritten atomically after every
+    step: which stages are completed, the stage in progress and the last
+    paper checkpointed in it. With `resume=True` an interrupted run
+    (status "running") is continued and its completed stages are skipped;
+    otherwise a new run is started.
+
+    With `persist=False` (single-stage commands) the journal is kept in
+    memory only: the file, and an interrupted run's resume point in it,
+    are left alone.
+    """
+
+    def __init__(self, path: str = RUN_JOURNAL_PATH, resume: bool = False, persist: bool = True):
+        self.path = path
+        self.persist = persist
+        previous = self._load()
+        if not persist and previous.get("status") == "running":
+            print(
+                f"[run_journal] Run {previous.get('run_id')} was interrupted in stage "
+                f"'{previous.get('current')}'; leaving its journal for `run --resume`."
+            )
+        if resume and previous.get("status") == "running":
+            self.state = previous
+            self.state["resumed_at"] = _now()
+            print(
+                f"[run_journal] Resuming run {previous.get('run_id')} "
+                f"(completed: {', '.join(previous.get('completed', [])) or 'none'})."
+            )
+        else:
+            if persist and previous.get("status") == "running":
+                print(
+                    f"[run_journal] Previous run {previous.get('run_id')} was interrupted "
+                    f"in stage '{previous.get('current')}'; starting a new run (use --resume to continue it)."
+                )
+            self.state = {
+                "run_id": dt.datetime.utcnow().strftime("%Y%m%dT%H%M%S"),
+                "started_at": _now(),
+                "status": "running",
+                "completed": [],
+                "current": None,
+                "stages": {},
+            }
+        self._save()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        if not self.persist:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def should_run(self, stage: str) -> bool:
+        """False if the stage already completed in this run; otherwise marks it as current."""
+        if stage in self.state["completed"]:
+            print(f"[run_journal] Stage '{stage}' already completed, skipping.")
+            return False
+        self.state["current"] = stage
+        self.state["stages"].setdefault(stage, {"started_at": _now(), "papers_done": 0, "last_paper": None})
+        self._save()
+        METRICS.stage_started(stage)
+        return True
+
+    def paper_done(self, stage: str, paper_id: Optional[str]) -> None:
+        info = self.state["stages"].setdefault(stage, {"papers_done": 0})
+        info["papers_done"] = info.get("papers_done", 0) + 1
+        info["last_paper"] = paper_id
+        self._save()
+
+    def papers_done(self, stage: str) -> int:
+        """Papers already checkpointed in `stage` during this run (before a resume)."""
+        return self.state["stages"].get(stage, {}).get("papers_done", 0)
+
+    def complete(self, stage: str) -> None:
+        METRICS.stage_finished(stage)
+        if stage not in self.state["completed"]:
+            self.state["completed"].append(stage)
+        self.state["stages"].setdefault(stage, {})["completed_at"] = _now()
+        self.state["current"] = None
+        self._save()
+
+    def finish(self) -> None:
+        self.state["status"] = "done"
+        self.state["finished_at"] = _now()
+        self._save()
+        print(f"[run_journal] Run {self.state['run_id']} finished.")
@@ -0,0 +1,376 @@
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from typing import List, Dict, Iterable, Optional, Set, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    rowid INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT,
+    abstract TEXT,
+    summary_short TEXT,
+    year INTEGER NOT NULL DEFAULT 0,
+    source TEXT,
+    published TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_papers_year ON papers(year);
+
+CREATE TABLE IF NOT EXISTS phases (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS tags (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS authors (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS ai_roles (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+
+CREATE TABLE IF NOT EXISTS paper_phases (
+    paper_rowid INTEGER NOT NULL REFERENCES papers(rowid) ON DELETE CASCADE,
+    phase_id INTEGER NOT NULL REFERENCES phases(id),
+    PRIMARY KEY (paper_rowid, phase_id)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_phases_phase ON paper_phases(phase_id, paper_rowid);
+
+CREATE TABLE IF NOT EXISTS paper_tags (
+    paper_rowid INTEGER NOT NULL REFERENCES papers(rowid) ON DELETE CASCADE,
+    tag_id INTEGER NOT NULL REFERENCES tags(id),
+    PRIMARY KEY (paper_rowid, tag_id)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_tags_tag ON paper_tags(tag_id, paper_rowid);
+
+CREATE TABLE IF NOT EXISTS paper_authors (
+    paper_rowid INTEGER NOT NULL REFERENCES papers(rowid) ON DELETE CASCADE,
+    author_id INTEGER NOT NULL REFERENCES authors(id),
+    position INTEGER NOT NULL,
+    PRIMARY KEY (paper_rowid, position)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_authors_author ON paper_authors(author_id, paper_rowid);
+
+CREATE TABLE IF NOT EXISTS paper_ai_roles (
+    paper_rowid INTEGER NOT NULL REFERENCES papers(rowid) ON DELETE CASCADE,
+    role_id INTEGER NOT NULL REFERENCES ai_roles(id),
+    PRIMARY KEY (paper_rowid, role_id)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_ai_roles_role ON paper_ai_roles(role_id, paper_rowid);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, abstract, summary_short,
+    content='papers', content_rowid='rowid'
+);
+"""
+
+# (lookup-taulu, liitostaulu, liitossarake, paperin kenttä)
+LINK_TABLES = [
+    ("phases", "paper_phases", "phase_id", "design_phase"),
+    ("tags", "paper_tags", "tag_id", "tags"),
+    ("ai_roles", "paper_ai_roles", "role_id", "ai_roles"),
+]
+
+
+def _as_list(value) -> List[str]:
+    if not value:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    return [str(v) for v in value if v]
+
+
+def _year(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class SQLiteStore:
+    """
+    SQLite backend for the structured paper database, with the same
+    interface as PaperStore (all / ids / get / upsert) plus indexed queries:
+    by phase, tag, author and year range, and FTS5 full-text search over
+    title, abstract and summary_short.
+
+    The full record is kept as JSON in `papers.record`; phases, tags,
+    authors and ai_roles are normalised into lookup + link tables.
+    """
+
+    def __init__(self, path: str, import_from: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        is_new = not os.path.exists(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        if is_new and import_from and os.path.exists(import_from):
+            self.import_jsonl(import_from)
+
+    # -----------------------
+    # Kirjoitus
+    # -----------------------
+
+    def _lookup_id(self, table: str, name: str) -> int:
+        row = self._conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0]
+        return self._conn.execute(f"INSERT INTO {table}(name) VALUES (?)", (name,)).lastrowid
+
+    def _write_one(self, rec: Dict) -> bool:
+        rec_id = rec.get("id")
+        record_json = json.dumps(rec, ensure_ascii=False)
+        row = self._conn.execute(
+            "SELECT rowid, title, abstract, summary_short, record FROM papers WHERE id = ?", (rec_id,)
+        ).fetchone()
+        if row and row[4] == record_json:
+            return False
+
+        fields = (
+            rec.get("title") or "",
+            rec.get("abstract") or "",
+            rec.get("summary_short") or "",
+            _year(rec.get("year")),
+            rec.get("source") or "",
+            str(rec.get("published") or ""),
+            record_json,
+        )
+        if row:
+            rowid = row[0]
+            # external-content FTS: vanha rivi poistetaan vanhoilla arvoilla
+            self._conn.execute(
+                "INSERT INTO papers_fts(papers_fts, rowid, title, abstract, summary_short) VALUES ('delete', ?, ?, ?, ?)",
+                (rowid, row[1], row[2], row[3]),
+            )
+            self._conn.execute(
+                "UPDATE papers SET title=?, abstract=?, summary_short=?, year=?, source=?, published=?, record=? WHERE rowid=?",
+                fields + (rowid,),
+            )
+            for _, link_table, _, _ in LINK_TABLES:
+                self._conn.execute(f"DELETE FROM {link_table} WHERE paper_rowid = ?", (rowid,))
+            self._conn.execute("DELETE FROM paper_authors WHERE paper_rowid = ?", (rowid,))
+        else:
+            rowid = self._conn.execute(
+                "INSERT INTO papers(title, abstract, summary_short, year, source, published, record, id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                fields + (rec_id,),
+            ).lastrowid
+
+        self._conn.execute(
+            "INSERT INTO papers_fts(rowid, title, abstract, summary_short) VALUES (?, ?, ?, ?)",
+            (rowid, fields[0], fields[1], fields[2]),
+        )
+        for table, link_table, link_col, field in LINK_TABLES:
+            for name in set(_as_list(rec.get(field))):
+                self._conn.execute(
+                    f"INSERT OR IGNORE INTO {link_table}(paper_rowid, {link_col}) VALUES (?, ?)",
+                    (rowid, self._lookup_id(table, name)),
+                )
+        for position, name in enumerate(_as_list(rec.get("authors"))):
+            self._conn.execute(
+                "INSERT INTO paper_authors(paper_rowid, author_id, position) VALUES (?, ?, ?)",
+                (rowid, self._lookup_id("authors", name), position),
+            )
+        return True
+
+    def upsert(self, records: Iterable[Dict]) -> int:
+        """Insert or update records by id in one transaction. Returns the number written."""
+        written = 0
+        with self._lock, self._conn:
+            for rec in records:
+                if rec.get("id") and self._write_one(rec):
+                    written += 1
+        return written
+
+    def delete(self, paper_ids: Iterable[str]) -> int:
+        """Remove records by id (link rows cascade). Returns the number removed."""
+        removed = 0
+        with self._lock, self._conn:
+            for paper_id in paper_ids:
+                row = self._conn.execute(
+                    "SELECT rowid, title, abstract, summary_short FROM papers WHERE id = ?", (paper_id,)
+                ).fetchone()
+                if not row:
+                    continue
+                self._conn.execute(
+                    "INSERT INTO papers_fts(papers_fts, rowid, title, abstract, summary_short) VALUES ('delete', ?, ?, ?, ?)",
+                    row,
+                )
+                self._conn.execute("DELETE FROM papers WHERE rowid = ?", (row[0],))
+                removed += 1
+        return removed
+
+    # -----------------------
+    # Luku
+    # -----------------------
+
+    def _records(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def all(self) -> List[Dict]:
+        return self._records("SELECT record FROM papers ORDER BY rowid")
+
+    def ids(self) -> Set[str]:
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT id FROM papers")}
+
+    def get(self, paper_id: str) -> Optional[Dict]:
+        found = self._records("SELECT record FROM papers WHERE id = ?", (paper_id,))
+        return found[0] if found else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def __contains__(self, paper_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM papers WHERE id = ?", (paper_id,)).fetchone() is not None
+
+    def papers_by_phase(self, phase: str, limit: Optional[int] = None) -> List[Dict]:
+        """Papers of one design phase, newest first (ties in insertion order)."""
+        return self._records(
+            """
+            SELECT p.record FROM papers p
+            JOIN paper_phases pp ON pp.paper_rowid = p.rowid
+            JOIN phases ph ON ph.id = pp.phase_id
+            WHERE ph.name = ?
+            ORDER BY p.year DESC, p.rowid ASC
+            LIMIT ?
+            """,
+            (phase, -1 if limit is None else limit),
+        )
+
+    def latest_papers(self, limit: int) -> List[Dict]:
+        """The last `limit` papers by year, in ascending year order."""
+        found = self._records(
+            "SELECT record FROM papers ORDER BY year DESC, rowid DESC LIMIT ?", (limit,)
+        )
+        return found[::-1]
+
+    def papers_by_tag(self, tag: str) -> List[Dict]:
+        return self._records(
+            """
+            SELECT p.record FROM papers p
+            JOIN paper_tags pt ON pt.paper_rowid = p.rowid
+            JOIN tags t ON t.id = pt.tag_id
+            WHERE t.name = ?
+            ORDER BY p.year DESC, p.rowid ASC
+            """,
+            (tag,),
+        )
+
+    def papers_by_author(self, author: str, partial: bool = False) -> List[Dict]:
+        """
+        Papers by `author` (exact name), newest first. With `partial`, by
+        any author whose name contains `author`, case-insensitively.
+        """
+        if not partial:
+            return self._records(
+                """
+                SELECT p.record FROM papers p
+                JOIN paper_authors pa ON pa.paper_rowid = p.rowid
+                JOIN authors a ON a.id = pa.author_id
+                WHERE a.name = ?
+                ORDER BY p.year DESC, p.rowid ASC
+                """,
+                (author,),
+            )
+        # Nimet suodatetaan Pythonissa (myös ei-ASCII-kirjainkoko), paperit indeksin kautta
+        needle = author.lower()
+        with self._lock:
+            author_ids = [r[0] for r in self._conn.execute("SELECT id, name FROM authors") if needle in r[1].lower()]
+        if not author_ids:
+            return []
+        return self._records(
+            """
+            SELECT p.record FROM papers p
+            WHERE p.rowid IN (
+                SELECT pa.paper_rowid FROM paper_authors pa
+                WHERE pa.author_id IN (SELECT value FROM json_each(?))
+            )
+            ORDER BY p.year DESC, p.rowid ASC
+            """,
+            (json.dumps(author_ids),),
+        )
+
+    def papers_by_year(self, start: int, end: int) -> List[Dict]:
+        """Papers with start <= year <= end."""
+        return self._records(
+            "SELECT record FROM papers WHERE year BETWEEN ? AND ? ORDER BY year, rowid", (start, end)
+        )
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """FTS5 full-text search over title, abstract and summary_short, best match first."""
+        return self._records(
+            """
+            SELECT p.record FROM papers_fts f
+            JOIN papers p ON p.rowid = f.rowid
+            WHERE papers_fts MATCH ?
+            ORDER BY bm25(papers_fts)
+            LIMIT ?
+            """,
+            (query, limit),
+        )
+
+    def phase_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT ph.name, COUNT(*) FROM paper_phases pp
+                JOIN phases ph ON ph.id = pp.phase_id
+                GROUP BY ph.name
+                """
+            ).fetchall()
+        return dict(rows)
+
+    # -----------------------
+    # JSONL tuonti / vienti
+    # -----------------------
+
+    def import_jsonl(self, jsonl_path: str) -> int:
+        records = []
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        written = self.upsert(records)
+        print(f"[sqlite_store] Imported {written} records from {jsonl_path}.")
+        return written
+
+    def export_jsonl(self, jsonl_path: str) -> int:
+        records = self.all()
+        os.makedirs(os.path.dirname(jsonl_path) or ".", exist_ok=True)
+        tmp_path = jsonl_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, jsonl_path)
+        print(f"[sqlite_store] Exported {len(records)} records to {jsonl_path}.")
+        return len(records)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import/export the SQLite paper database.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("sqlite_path")
+    parser.add_argument("jsonl_path")
+    args = parser.parse_args(argv)
+
+    store = SQLiteStore(args.sqlite_path)
+    if args.command == "import":
+        store.import_jsonl(args.jsonl_path)
+    else:
+        store.export_jsonl(args.jsonl_path)
+
+
+if __name__ == "__main__":
+    main()
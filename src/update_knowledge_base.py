@@ -1,23 +1,30 @@
 import os
 import json
+import hashlib
 from collections import defaultdict
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, TYPE_CHECKING
 
-from openai import OpenAI
+import numpy as np
+
+from . import llm_client
+from .paper_store import open_store
+from .paper_record import PHASES, PHASE_VOCAB, Paper, phase_masks, phase_indices
+from .context_packer import pack_context, count_tokens
+from .metrics import METRICS
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 
 # -----------------------
 # Perusasetukset
 # -----------------------
 
-PHASES = [
-    "Establishing a need",
-    "Analysis of task",
-    "Concept design",
-    "Embodiment design",
-    "Detail design",
-    "Implementation",
-]
+# Synteesin mallit: osiot ja (mapreduce-tilassa) osioiden map-tiivistelmät,
+# joihin riittää yleensä halvempi malli
+SYNTH_MODEL = os.environ.get("SYNTH_MODEL", "gpt-4o")
+SYNTH_MAP_MODEL = os.environ.get("SYNTH_MAP_MODEL", SYNTH_MODEL)
 
 
 def load_structured_papers(path: str) -> List[Dict]:
@@ -26,31 +33,39 @@ def load_structured_papers(path: str) -> List[Dict]:
         print(f"[update_knowledge_base] No file at {path}, skipping.")
         return []
 
-    papers = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                papers.append(json.loads(line))
-            except json.JSONDecodeError:
-                print(f"[update_knowledge_base] Skipping invalid JSON line: {line[:80]}...")
+    # Sama jaettu PaperStore kuin main/utils: ei uutta jäsennystä
+    papers = open_store(path).all()
     return papers
 
 
 def group_papers_by_phase(papers: List[Dict]) -> Dict[str, List[Dict]]:
-    """Group papers into Howard et al. (2008) phases."""
+    """
+    Group papers into Howard et al. (2008) phases. Papers loaded from the
+    store are grouped from their phase bitmasks, one NumPy pass per phase.
+    """
     grouped = defaultdict(list)
-    for p in papers:
-        phases = p.get("design_phase") or []
-        if not isinstance(phases, list):
-            phases = [phases]
-        if not phases:
-            # If no phase given, you might want to assign "Unknown" or skip
+    if not papers:
+        return grouped
+    if not isinstance(papers[0], Paper):  # esim. suoraan tiedostosta luetut dictit
+        for p in papers:
+            phases = p.get("design_phase") or []
+            if not isinstance(phases, list):
+                phases = [phases]
+            if not phases:
+                # If no phase given, you might want to assign "Unknown" or skip
+                continue
+            for phase in phases:
+                grouped[phase].append(p)
+        return grouped
+    masks = phase_masks(papers)
+    present = int(np.bitwise_or.reduce(masks))
+    for i in range(len(PHASE_VOCAB)):
+        phase = PHASE_VOCAB.name(i)
+        if i < 64 and not present >> i & 1:
             continue
-        for phase in phases:
-            grouped[phase].append(p)
+        members = phase_indices(papers, masks, phase)
+        if len(members):
+            grouped[phase] = [papers[j] for j in members]
     return grouped
 
 
@@ -58,65 +73,84 @@ def group_papers_by_phase(papers: List[Dict]) -> Dict[str, List[Dict]]:
 # LLM-apufunktiot
 # -----------------------
 
-def get_client() -> OpenAI:
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set in environment.")
-    return OpenAI(api_key=api_key)
-
-
-def call_llm_markdown(system_prompt: str, user_prompt: str) -> str:
-    """Call OpenAI model and return markdown text."""
-    client = get_client()
-    response = client.responses.create(
-        model="gpt-4o",  # voit vaihtaa isompaan malliin tarvittaessa
-        input=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-#        response_format={"type": "json_object"}
+def get_client() -> "OpenAI":
+    """Shared, pooled client (same instance as the enrichment stage)."""
+    return llm_client.get_client()
+
+
+def call_llm_markdown(system_prompt: str, user_prompt: str, model: str = SYNTH_MODEL) -> str:
+    """Call OpenAI model and return markdown text (identical prompts come from the response cache)."""
+    return llm_client.complete_text(
+        system_prompt,
+        user_prompt,
+        model=model,
     )
-    # responses API: output -> list, then content -> list, then .text
-    return response.output[0].content[0].text
 
 
 # -----------------------
 # Markdownin generointi
 # -----------------------
 
-def build_phase_context_snippet(papers: List[Dict], max_papers: int = 30) -> str:
+# Kontekstilistan tokenibudjetti per prompti (papereiden määrä joustaa tiivistelmien pituuden mukaan)
+PHASE_CONTEXT_TOKENS = int(os.environ.get("SYNTH_PHASE_CONTEXT_TOKENS", "4500"))
+OVERVIEW_CONTEXT_TOKENS = int(os.environ.get("SYNTH_OVERVIEW_CONTEXT_TOKENS", "8000"))
+
+
+def _newest_first(p: Dict):
+    return (-(p.get("year") or 0), str(p.get("id")))
+
+
+def format_phase_entry(p: Dict) -> str:
+    """One paper of a phase context: year, title, summary and up to two implications."""
+    title = p.get("title", "Untitled")
+    year = p.get("year", "NA")
+    summary = p.get("summary_short", "") or p.get("abstract", "")[:300]
+    implications = p.get("implications_for_design_research") or []
+    lines = [f"- ({year}) **{title}**"]
+    if summary:
+        lines.append(f"  - Summary: {summary}")
+    for imp in implications[:2]:
+        lines.append(f"  - Implication: {imp}")
+    return "\n".join(lines)
+
+
+def select_phase_context_papers(papers: List[Dict], budget_tokens: int = PHASE_CONTEXT_TOKENS) -> List[Dict]:
     """
-    Rakennetaan lyhyt "context"-teksti LLM:lle:
-    listataan max_papers uusinta paperia (vuoden + otsikon + lyhyen summar).
+    The papers of a phase shown to the LLM: packed by relevance and
+    diversity up to `budget_tokens`, listed newest first.
     """
-    # sort by year (and maybe id) descending for recency
-    papers_sorted = sorted(papers, key=lambda p: p.get("year", 0), reverse=True)
-    snippet_lines = []
-    for p in papers_sorted[:max_papers]:
-        title = p.get("title", "Untitled")
-        year = p.get("year", "NA")
-        summary = p.get("summary_short", "") or p.get("abstract", "")[:300]
-        implications = p.get("implications_for_design_research") or []
-        snippet_lines.append(f"- ({year}) **{title}**")
-        if summary:
-            snippet_lines.append(f"  - Summary: {summary}")
-        if implications:
-            for imp in implications[:2]:
-                snippet_lines.append(f"  - Implication: {imp}")
-    return "\n".join(snippet_lines)
+    selected, _ = pack_context(papers, format_phase_entry, budget_tokens, model=SYNTH_MODEL)
+    return sorted(selected, key=_newest_first)
 
 
-def generate_phase_markdown(phase: str, papers: List[Dict]) -> str:
+def build_phase_context_snippet(papers: List[Dict]) -> str:
     """
-    Pyytää LLM:ää tekemään Markdown-osion yhdelle design-vaiheelle:
-    - Key themes
-    - Recent developments (last 6–12 months)
-    - Open research questions
+    Rakennetaan lyhyt "context"-teksti LLM:lle:
+    vuosi + otsikko + lyhyt summary (+ implikaatiot) jokaisesta paperista.
     """
-    if not papers:
-        return f"## {phase}\n\n_There are currently no classified papers for this phase._\n"
+    return "\n".join(format_phase_entry(p) for p in papers)
+
+
+def report_prompt_tokens(key: str, system_prompt: str, user_prompt: str, context_papers: List[Dict], candidates: int) -> int:
+    tokens = count_tokens(system_prompt, SYNTH_MODEL) + count_tokens(user_prompt, SYNTH_MODEL)
+    print(
+        f"[update_knowledge_base] Prompt '{key}': {len(context_papers)}/{candidates} papers, "
+        f"~{tokens} input tokens."
+    )
+    return tokens
 
-    context = build_phase_context_snippet(papers)
+
+def empty_phase_markdown(phase: str) -> str:
+    return f"## {phase}\n\n_There are currently no classified papers for this phase._\n"
+
+
+def build_phase_prompts(phase: str, papers: List[Dict]) -> Tuple[str, str, List[Dict]]:
+    """
+    Returns (system_prompt, user_prompt, context_papers) for one design-phase
+    section; context_papers are the papers whose summaries went into the prompt.
+    """
+    context_papers = select_phase_context_papers(papers)
+    context = build_phase_context_snippet(context_papers)
 
     system_prompt = """
 You are an expert in design cognition and design research, familiar with:
@@ -167,36 +201,48 @@ Based on this, write the Markdown section as specified in the system prompt.
 Do NOT talk about "the list above" explicitly; just use it as background knowledge.
 """
 
-    return call_llm_markdown(system_prompt, user_prompt)
+    report_prompt_tokens(phase, system_prompt, user_prompt, context_papers, len(papers))
+    return system_prompt, user_prompt, context_papers
 
 
-def generate_overview_markdown(papers: List[Dict]) -> str:
+def generate_phase_markdown(phase: str, papers: List[Dict]) -> str:
     """
-    Luodaan koko kentän overview. Tässä katsotaan kaikkia papereita:
-    - general trends across phases
-    - evolution over time
-    - important tensions / opportunities
+    Pyytää LLM:ää tekemään Markdown-osion yhdelle design-vaiheelle:
+    - Key themes
+    - Recent developments (last 6–12 months)
+    - Open research questions
     """
     if not papers:
-        return "# AI & Design Research Overview\n\n_No papers in database yet._\n"
+        return empty_phase_markdown(phase)
 
-    # Build a compressed context listing
-    context_lines = []
-    # Sort by year ascending to show evolution
-    papers_sorted = sorted(papers, key=lambda p: p.get("year", 0))
-    for p in papers_sorted[-80:]:  # limit context to last ~80 papers
-        title = p.get("title", "Untitled")
-        year = p.get("year", "NA")
-        phases = p.get("design_phase") or []
-        summary = p.get("summary_short", "") or p.get("abstract", "")[:300]
-        context_lines.append(f"- ({year}) {title}")
-        if phases:
-            context_lines.append(f"  - Phases: {', '.join(phases)}")
-        if summary:
-            context_lines.append(f"  - Summary: {summary}")
-    context = "\n".join(context_lines)
+    system_prompt, user_prompt, _ = build_phase_prompts(phase, papers)
+    return call_llm_markdown(system_prompt, user_prompt)
 
-    system_prompt = """
+
+def format_overview_entry(p: Dict) -> str:
+    """One paper of the overview context: year, title, phases and summary."""
+    title = p.get("title", "Untitled")
+    year = p.get("year", "NA")
+    phases = p.get("design_phase") or []
+    summary = p.get("summary_short", "") or p.get("abstract", "")[:300]
+    lines = [f"- ({year}) {title}"]
+    if phases:
+        lines.append(f"  - Phases: {', '.join(phases)}")
+    if summary:
+        lines.append(f"  - Summary: {summary}")
+    return "\n".join(lines)
+
+
+def select_overview_context_papers(papers: List[Dict], budget_tokens: int = OVERVIEW_CONTEXT_TOKENS) -> List[Dict]:
+    """
+    Papers packed by relevance and diversity up to `budget_tokens`,
+    in ascending year order to show evolution.
+    """
+    selected, _ = pack_context(papers, format_overview_entry, budget_tokens, model=SYNTH_MODEL)
+    return sorted(selected, key=lambda p: (p.get("year") or 0, str(p.get("id"))))
+
+
+OVERVIEW_SYSTEM_PROMPT = """
 You are a design cognition researcher summarising recent AI & design work 
 for an audience of experienced design researchers (industrial design, interaction design), 
 not computer scientists.
@@ -236,6 +282,15 @@ Structure your answer like this:
 Write clearly and analytically, in short paragraphs. 
 Avoid technical ML jargon and mathematical detail.
 """
+
+
+def build_overview_prompts(papers: List[Dict]) -> Tuple[str, str, List[Dict]]:
+    """Returns (system_prompt, user_prompt, context_papers) for the overview."""
+    # Build a compressed context listing
+    context_papers = select_overview_context_papers(papers)
+    context = "\n".join(format_overview_entry(p) for p in context_papers)
+
+    system_prompt = OVERVIEW_SYSTEM_PROMPT
     user_prompt = f"""
 Here is a sample of papers with year, title, phases and short summaries:
 
@@ -243,10 +298,12 @@ Here is a sample of papers with year, title, phases and short summaries:
 
 Using this, write the overview as specified in the system prompt.
 """
+    report_prompt_tokens("overview", system_prompt, user_prompt, context_papers, len(papers))
+    return system_prompt, user_prompt, context_papers
 
-    # Generate the LLM-written overview
-    overview_md = call_llm_markdown(system_prompt, user_prompt)
 
+def assemble_overview_markdown(overview_md: str) -> str:
+    """Prepend the fixed foundations block to the LLM-written overview."""
     # ---------- FOUNDATIONS BLOCK INSERTION ----------
     FOUNDATIONS_BLOCK = """
 ## Foundations in Design Cognition
@@ -298,6 +355,284 @@ whether it expands or contracts the design space, alters framing activities, aff
     return overview_md
 
 
+def generate_overview_markdown(papers: List[Dict]) -> str:
+    """
+    Luodaan koko kentän overview. Tässä katsotaan kaikkia papereita:
+    - general trends across phases
+    - evolution over time
+    - important tensions / opportunities
+    """
+    if not papers:
+        return "# AI & Design Research Overview\n\n_No papers in database yet._\n"
+
+    system_prompt, user_prompt, _ = build_overview_prompts(papers)
+
+    # Generate the LLM-written overview
+    overview_md = call_llm_markdown(system_prompt, user_prompt)
+    return assemble_overview_markdown(overview_md)
+
+
+# -----------------------
+# Map-reduce-overview koko korpuksesta
+# -----------------------
+
+# "sample" (oletus): overview suoraan budjettiin mahtuvasta otoksesta, yksi kutsu;
+# "mapreduce": osiot (vuosijakso x vaihe) tiivistetään ensin, overview niistä.
+# Mapreduce maksaa kutsun osiota kohden ja jokainen uusi paperi muuttaa osionsa,
+# joten se on valinnainen.
+OVERVIEW_MODE = os.environ.get("SYNTH_OVERVIEW_MODE", "sample").lower()
+YEAR_BUCKET_SPAN = 5
+# Yhden map-kutsun kontekstibudjetti; isommat osiot pilkotaan
+PARTITION_CONTEXT_TOKENS = int(os.environ.get("SYNTH_PARTITION_CONTEXT_TOKENS", "6000"))
+# Map-kutsujen yläraja: ylitys -> pidemmät vuosijaksot, lopulta osio pakataan budjettiin
+MAX_PARTITIONS = int(os.environ.get("SYNTH_MAX_PARTITIONS", "24"))
+# Osion tiivistelmä tehdään uudelleen vasta, kun tätä suurempi osuus sen
+# papereista on uusia tai muuttuneita edelliseen tiivistelmään nähden
+REMAP_MIN_CHANGE = float(os.environ.get("SYNTH_REMAP_MIN_CHANGE", "0.25"))
+MAP_KEY_PREFIX = "map:"
+UNCLASSIFIED_PHASE = "Unclassified"
+
+PARTITION_SYSTEM_PROMPT = """
+You are a design cognition researcher preparing notes for a larger literature overview.
+You receive the papers of ONE slice of the corpus (a period and a design phase).
+
+Write at most 200 words of Markdown bullet points covering:
+- the main themes and how AI figures in designers' work in this slice
+- notable methods or study settings
+- tensions, gaps or open questions
+
+Refer to design cognition concepts rather than ML details.
+Do not add a heading; do not list the papers one by one.
+"""
+
+
+def year_bucket(year, span: int = YEAR_BUCKET_SPAN) -> str:
+    """Period label of `span` years ("2020–2024"); "Undated" for missing years."""
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        return "Undated"
+    if year <= 0:
+        return "Undated"
+    start = year - year % span
+    return f"{start}–{start + span - 1}"
+
+
+def _group_papers(papers: List[Dict], span: int) -> Dict[Tuple[str, str], List[Dict]]:
+    groups: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+    for p in papers:
+        phases = p.get("design_phase") or []
+        if not isinstance(phases, list):
+            phases = [phases]
+        for phase in phases or [UNCLASSIFIED_PHASE]:
+            groups[(year_bucket(p.get("year"), span), phase)].append(p)
+    return groups
+
+
+def _split_to_budget(members: List[Dict], budget_tokens: int) -> List[List[Dict]]:
+    chunks: List[List[Dict]] = [[]]
+    used = 0
+    for p in members:
+        cost = count_tokens(format_overview_entry(p), SYNTH_MODEL) + 1
+        if chunks[-1] and used + cost > budget_tokens:
+            chunks.append([])
+            used = 0
+        chunks[-1].append(p)
+        used += cost
+    return chunks
+
+
+def partition_papers(
+    papers: List[Dict],
+    budget_tokens: int = PARTITION_CONTEXT_TOKENS,
+    max_partitions: int = MAX_PARTITIONS,
+) -> Dict[str, List[Dict]]:
+    """
+    Partition the corpus by (year bucket, design phase); a paper with
+    several phases lands in each. Partitions that do not fit one prompt
+    are split into consecutive chunks in (year, id) order, so new papers
+    only disturb the chunks of the partition they fall into.
+
+    At most `max_partitions` partitions are made: the year buckets are
+    widened until the groups fit, and if the chunks still do not, each
+    group is packed to the budget (as in the other contexts) instead of split.
+    """
+    span = YEAR_BUCKET_SPAN
+    groups = _group_papers(papers, span)
+    while len(groups) > max_partitions and span < 100:
+        span *= 2
+        groups = _group_papers(papers, span)
+
+    split = {}
+    for key, members in groups.items():
+        members.sort(key=lambda p: (p.get("year") or 0, str(p.get("id"))))
+        split[key] = _split_to_budget(members, budget_tokens)
+    if sum(len(chunks) for chunks in split.values()) > max_partitions:
+        split = {}
+        for key, members in groups.items():
+            selected, _ = pack_context(members, format_overview_entry, budget_tokens, model=SYNTH_MODEL)
+            split[key] = [sorted(selected, key=lambda p: (p.get("year") or 0, str(p.get("id"))))]
+
+    partitions: Dict[str, List[Dict]] = {}
+    for (bucket, phase), chunks in sorted(split.items()):
+        for i, chunk in enumerate(chunks, 1):
+            suffix = f" #{i}" if len(chunks) > 1 else ""
+            partitions[f"{bucket} / {phase}{suffix}"] = chunk
+    return partitions
+
+
+def build_partition_prompts(key: str, papers: List[Dict]) -> Tuple[str, str, List[Dict]]:
+    """Returns (system_prompt, user_prompt, context_papers) for one map step."""
+    context = "\n".join(format_overview_entry(p) for p in papers)
+    user_prompt = f"""
+Corpus slice: {key} ({len(papers)} papers)
+
+{context}
+
+Write the notes for this slice as specified in the system prompt.
+"""
+    return PARTITION_SYSTEM_PROMPT, user_prompt, papers
+
+
+def build_reduce_overview_prompts(summaries: List[Tuple[str, str]], n_papers: int) -> Tuple[str, str]:
+    """Overview prompts whose context is the partition summaries (reduce step)."""
+    context = "\n\n".join(f"### {key}\n{md.strip()}" for key, md in summaries if md.strip())
+    user_prompt = f"""
+Here are notes on the whole corpus of {n_papers} papers, one per period and design phase:
+
+{context}
+
+Using these notes, write the overview as specified in the system prompt.
+Cover the whole corpus and how it has evolved over time.
+"""
+    tokens = count_tokens(OVERVIEW_SYSTEM_PROMPT, SYNTH_MODEL) + count_tokens(user_prompt, SYNTH_MODEL)
+    print(f"[update_knowledge_base] Prompt 'overview' (reduce): {len(summaries)} partitions, ~{tokens} input tokens.")
+    return OVERVIEW_SYSTEM_PROMPT, user_prompt
+
+
+# -----------------------
+# Inkrementaalinen synteesi (osiokohtainen välimuisti)
+# -----------------------
+
+SECTION_STORE_NAME = ".sections.json"
+
+# Kentät, jotka päätyvät LLM:n kontekstiin; vain näiden muutos vaatii uuden synteesin
+CONTEXT_FIELDS = ("title", "year", "design_phase", "summary_short", "abstract", "implications_for_design_research")
+
+
+def paper_context_hash(paper: Dict) -> str:
+    """Hash of the fields of one paper that can end up in a synthesis prompt."""
+    data = json.dumps([paper.get(k) for k in CONTEXT_FIELDS], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def fingerprint_section(key: str, system_prompt: str, user_prompt: str, context_papers: List[Dict]) -> str:
+    """
+    Fingerprint of one section's inputs: the ids and content hashes of the
+    papers in its context plus the exact prompts. Equal fingerprint means
+    the stored markdown can be reused as is.
+    """
+    members = sorted((str(p.get("id")), paper_context_hash(p)) for p in context_papers)
+    data = json.dumps(
+        {"section": key, "members": members, "system": system_prompt, "user": user_prompt},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def changed_share(stored: Dict, system_prompt: str, context_papers: List[Dict]) -> float:
+    """
+    Share of `context_papers` that are new or changed compared with the
+    members a stored section was written from (1.0 if the section was
+    stored without members or under another system prompt).
+    """
+    if not stored.get("members") or stored.get("system") != hashlib.sha256(system_prompt.encode("utf-8")).hexdigest():
+        return 1.0
+    before = {tuple(m) for m in stored["members"]}
+    members = [(str(p.get("id")), paper_context_hash(p)) for p in context_papers]
+    if not members:
+        return 1.0
+    return sum(1 for m in members if m not in before) / len(members)
+
+
+def load_section_store(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_section_store(path: str, store: Dict[str, Dict]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(store, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def render_section(
+    key: str,
+    system_prompt: str,
+    user_prompt: str,
+    context_papers: List[Dict],
+    store: Dict[str, Dict],
+    postprocess=None,
+    model: str = SYNTH_MODEL,
+    min_change: float = 0.0,
+) -> str:
+    """
+    Returns the stored markdown for a section if its fingerprint is
+    unchanged, otherwise calls the LLM and stores the new result. With
+    `min_change`, the stored markdown is also reused while at most that
+    share of the context papers is new or changed since it was written.
+    """
+    fingerprint = fingerprint_section(key, system_prompt, user_prompt, context_papers)
+    cached = store.get(key)
+    if cached and cached.get("fingerprint") == fingerprint:
+        print(f"[update_knowledge_base] Section '{key}' unchanged, reusing stored markdown.")
+        return cached["markdown"]
+    if cached and min_change > 0:
+        share = changed_share(cached, system_prompt, context_papers)
+        if share <= min_change:
+            print(f"[update_knowledge_base] Section '{key}' changed by {share:.0%}, reusing stored markdown.")
+            return cached["markdown"]
+
+    print(f"[update_knowledge_base] Generating section '{key}' ...")
+    with METRICS.timed("synthesis_section"):
+        markdown = call_llm_markdown(system_prompt, user_prompt, model=model)
+    if postprocess is not None:
+        markdown = postprocess(markdown)
+    store[key] = {"fingerprint": fingerprint, "markdown": markdown}
+    if min_change > 0:
+        store[key]["system"] = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        store[key]["members"] = sorted([str(p.get("id")), paper_context_hash(p)] for p in context_papers)
+    return markdown
+
+
+def _render_or_fallback(job: Dict, store: Dict[str, Dict]) -> str:
+    """
+    Runs one section job. If the LLM call fails, the previous markdown of
+    the section is kept (its fingerprint is left stale, so it is retried
+    on the next run) instead of aborting the whole write.
+    """
+    stage = "synthesis_map" if job["key"].startswith(MAP_KEY_PREFIX) else "synthesis"
+    try:
+        with METRICS.llm_stage(stage):
+            return render_section(
+                job["key"], job["system"], job["user"], job["context"], store,
+                postprocess=job.get("postprocess"),
+                model=job.get("model", SYNTH_MODEL),
+                min_change=job.get("min_change", 0.0),
+            )
+    except Exception as e:
+        print(f"[update_knowledge_base] Section '{job['key']}' failed ({e}), keeping previous content.")
+        previous = store.get(job["key"])
+        if previous:
+            return previous["markdown"]
+        return job["fallback"]
+
+
 # -----------------------
 # Pääfunktio
 # -----------------------
@@ -314,25 +649,95 @@ def update_knowledge_markdown(
     """
     os.makedirs(knowledge_dir, exist_ok=True)
 
-    papers = load_structured_papers(db_path)
-    if not papers:
+    store = open_store(db_path)
+    if not len(store):
         print("[update_knowledge_base] No papers found, creating placeholder files.")
         overview_md = "# AI & Design Research – Living Overview\n\n_No papers yet._\n"
         phases_md = "# AI & Design Research by Design Phase\n\n_No papers yet._\n"
     else:
-        grouped = group_papers_by_phase(papers)
-
-        # 1) Overview
-        print("[update_knowledge_base] Generating overview.md ...")
-        overview_md = generate_overview_markdown(papers)
-
-        # 2) By design phase
-        print("[update_knowledge_base] Generating by_design_phase.md ...")
+        store_path = os.path.join(knowledge_dir, SECTION_STORE_NAME)
+        sections = load_section_store(store_path)
+
+        # 1) Overview + 2) by design phase: kerätään itsenäiset osiot
+        overview_fallback = "# AI & Design Research – Living Overview\n\n_Overview could not be generated._\n"
+        jobs = []
+        if OVERVIEW_MODE == "mapreduce":
+            # Map: jokainen osio (vuosijakso x vaihe) tiivistetään erikseen;
+            # tiivistelmä tallessa osion jäsenten fingerprintillä
+            all_papers = store.all()
+            for key, members in partition_papers(all_papers).items():
+                system_prompt, user_prompt, context_papers = build_partition_prompts(key, members)
+                jobs.append(
+                    {
+                        "key": MAP_KEY_PREFIX + key,
+                        "system": system_prompt,
+                        "user": user_prompt,
+                        "context": context_papers,
+                        "model": SYNTH_MAP_MODEL,
+                        "min_change": REMAP_MIN_CHANGE,
+                        "fallback": "",
+                    }
+                )
+        else:
+            # Kontekstit pakataan tokenibudjettiin koko kandidaattijoukosta
+            overview_papers = store.all()
+            system_prompt, user_prompt, context_papers = build_overview_prompts(overview_papers)
+            jobs.append(
+                {
+                    "key": "overview",
+                    "system": system_prompt,
+                    "user": user_prompt,
+                    "context": context_papers,
+                    "postprocess": assemble_overview_markdown,
+                    "fallback": overview_fallback,
+                }
+            )
+        for phase in PHASES:
+            phase_papers = store.papers_by_phase(phase)
+            if not phase_papers:
+                continue
+            system_prompt, user_prompt, context_papers = build_phase_prompts(phase, phase_papers)
+            jobs.append(
+                {
+                    "key": phase,
+                    "system": system_prompt,
+                    "user": user_prompt,
+                    "context": context_papers,
+                    "fallback": empty_phase_markdown(phase),
+                }
+            )
+
+        # Osiot generoidaan rinnakkain (yhteinen raja llm_clientissa),
+        # vain muuttuneet osiot kutsuvat LLM:ää
+        workers = max(1, min(len(jobs), llm_client.MAX_CONCURRENCY))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda job: _render_or_fallback(job, sections), jobs))
+        rendered = {job["key"]: md for job, md in zip(jobs, results)}
+
+        if OVERVIEW_MODE == "mapreduce":
+            # Reduce: overview osiotiivistelmistä; vanhentuneet tiivistelmät pois
+            map_keys = [job["key"] for job in jobs if job["key"].startswith(MAP_KEY_PREFIX)]
+            summaries = [(key[len(MAP_KEY_PREFIX):], rendered[key]) for key in map_keys]
+            system_prompt, user_prompt = build_reduce_overview_prompts(summaries, len(all_papers))
+            overview_md = _render_or_fallback(
+                {
+                    "key": "overview",
+                    "system": system_prompt,
+                    "user": user_prompt,
+                    "context": [],
+                    "postprocess": assemble_overview_markdown,
+                    "fallback": overview_fallback,
+                },
+                sections,
+            )
+            for key in [k for k in sections if k.startswith(MAP_KEY_PREFIX) and k not in rendered]:
+                del sections[key]
+        else:
+            overview_md = rendered["overview"]
         phase_sections = ["# AI & Design Research by Design Phase\n"]
         for phase in PHASES:
-            phase_papers = grouped.get(phase, [])
-            section_md = generate_phase_markdown(phase, phase_papers)
-            phase_sections.append(section_md)
+            phase_sections.append(rendered.get(phase) or empty_phase_markdown(phase))
+        save_section_store(store_path, sections)
         phases_md = "\n\n".join(phase_sections)
 
     # Write files
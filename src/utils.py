@@ -1,69 +1,143 @@
-import os
-import json
-from typing import List, Dict
+import re
+import hashlib
+from typing import List, Dict, Optional, Tuple
+
+from .paper_store import open_store
+
+
+# "http://arxiv.org/abs/2501.01234v2", "arxiv:2501.01234", "cs/0112017v1" ...
+ARXIV_ID_RE = re.compile(
+    r"^(?:https?://(?:export\.)?arxiv\.org/abs/|arxiv:)?"
+    r"(?P<id>\d{4}\.\d{4,5}|[a-z][a-z\-]*(?:\.[A-Z]{2})?/\d{7})"
+    r"(?:v(?P<version>\d+))?$",
+    re.IGNORECASE,
+)
+
+# Uuden arXiv-version kentät, jotka päivitetään ilman uudelleenrikastusta
+ARXIV_VERSION_FIELDS = ("arxiv_version", "updated", "authors", "categories", "url")
 
 
 def load_jsonl_db(db_path: str) -> List[Dict]:
     """
     Lataa JSONL-tietokannan listaksi dict-olioita.
     Jos tiedostoa ei ole, palauttaa tyhjän listan.
+    Tiedosto jäsennetään vain kerran per ajo (jaettu PaperStore).
     """
-    records: List[Dict] = []
-    try:
-        with open(db_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    records.append(json.loads(line))
-                except json.JSONDecodeError:
-                    # ohitetaan mahdolliset rikkinäiset rivit
-                    continue
-    except FileNotFoundError:
-        pass
-    return records
+    return open_store(db_path).all()
 
 
 def update_jsonl_db(db_path: str, new_records: List[Dict]) -> None:
     """
     Päivittää JSONL-tietokannan:
-    - lukee olemassa olevat rivit
-    - deduplaa id-kentän perusteella
-    - ylikirjoittaa tiedoston yhdistetyllä datalla
+    - deduplaa id-kentän perusteella (viimeisin rivi voittaa)
+    - lisää vain uudet/muuttuneet rivit tiedoston loppuun
+    - tiivistää tiedoston ajoittain (PaperStore.compact)
     """
-    existing_by_id: Dict[str, Dict] = {}
-
-    # Lue olemassa oleva tietokanta (jos on)
-    try:
-        with open(db_path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    rec = json.loads(line)
-                except json.JSONDecodeError:
-                    # ohita rikkinäinen rivi
-                    continue
-                rec_id = rec.get("id")
-                if rec_id:
-                    existing_by_id[rec_id] = rec
-    except FileNotFoundError:
-        # ei entuudestaan kantaa → aloitetaan tyhjästä
-        pass
-
-    # Päivitä/ lisää uudet
-    for rec in new_records:
-        rec_id = rec.get("id")
-        if not rec_id:
+    store = open_store(db_path)
+    store.upsert(new_records)
+    print(f"[utils.update_jsonl_db] Database now has {len(store)} records.")
+
+
+# -----------------------
+# arXiv-identiteetti
+# -----------------------
+
+def parse_arxiv_id(raw_id: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    ("arxiv:<id>", version) for an arXiv id or abs URL, version None when
+    the id has none. (None, None) for anything that is not an arXiv id.
+    """
+    m = ARXIV_ID_RE.match((raw_id or "").strip())
+    if not m:
+        return None, None
+    version = int(m.group("version")) if m.group("version") else None
+    return f"arxiv:{m.group('id')}", version
+
+
+def content_hash(paper: Dict) -> str:
+    """Hash of the whitespace/case-normalised title + abstract."""
+    text = " ".join((paper.get("title") or "").lower().split())
+    text += "\n" + " ".join((paper.get("abstract") or "").lower().split())
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def reconcile_arxiv_versions(
+    papers: List[Dict],
+    existing: Dict[str, Dict],
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Compare harvested arXiv papers with the stored records (by canonical id).
+
+    Returns (to_enrich, metadata_updates): papers not stored yet, plus new
+    versions whose title/abstract changed, go to enrichment; new versions
+    with identical content only bump the version metadata of the stored
+    record. Versions not newer than the stored one are dropped.
+    """
+    to_enrich: List[Dict] = []
+    metadata_updates: List[Dict] = []
+    for p in papers:
+        old = existing.get(p["id"])
+        if old is None:
+            to_enrich.append(p)
+            continue
+        if (p.get("arxiv_version") or 0) <= (old.get("arxiv_version") or 0):
+            continue
+        if p.get("content_hash") == (old.get("content_hash") or content_hash(old)):
+            updated = dict(old)
+            updated.update({k: p[k] for k in ARXIV_VERSION_FIELDS if k in p})
+            metadata_updates.append(updated)
+        else:
+            if old.get("aliases"):
+                p["aliases"] = old["aliases"]
+            to_enrich.append(p)
+    return to_enrich, metadata_updates
+
+
+def migrate_arxiv_ids(db_path: str) -> int:
+    """
+    One-pass migration of versioned arXiv ids ("http://arxiv.org/abs/...v1")
+    to canonical "arxiv:<id>" keys with `arxiv_version`, `url` and
+    `content_hash` fields. When several versions of a paper are stored,
+    the highest version is kept. Aliases pointing at old ids are rewritten.
+    Returns the number of records migrated (0 when nothing to do).
+    """
+    store = open_store(db_path)
+    records = store.all()
+
+    renamed: Dict[str, str] = {}
+    migrated: Dict[str, Dict] = {}
+    for rec in records:
+        rec_id = rec.get("id") or ""
+        canonical, version = parse_arxiv_id(rec_id)
+        if canonical is None or (canonical == rec_id and "content_hash" in rec):
             continue
-        existing_by_id[rec_id] = rec
+        renamed[rec_id] = canonical
+        new_rec = dict(rec)
+        new_rec["id"] = canonical
+        new_rec["arxiv_version"] = version or rec.get("arxiv_version") or 1
+        new_rec.setdefault("url", f"https://arxiv.org/abs/{canonical[len('arxiv:'):]}")
+        new_rec["content_hash"] = content_hash(rec)
+        current = migrated.get(canonical)
+        if current is None or new_rec["arxiv_version"] >= current["arxiv_version"]:
+            migrated[canonical] = new_rec
+
+    if not renamed:
+        return 0
 
-    # Kirjoita takaisin tiedostoon
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    with open(db_path, "w", encoding="utf-8") as f:
-        for rec in existing_by_id.values():
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    # Aliakset (duplikaattien yhdistäminen) osoittamaan uusiin id:ihin
+    updates = list(migrated.values())
+    for rec in records:
+        aliases = rec.get("aliases") or []
+        if not any(a in renamed for a in aliases):
+            continue
+        target = migrated.get(renamed.get(rec["id"], rec["id"]))
+        if target is None:
+            target = dict(rec)
+            updates.append(target)
+        merged = [renamed.get(a, a) for a in (target.get("aliases") or []) + aliases]
+        target["aliases"] = [a for a in dict.fromkeys(merged) if a != target["id"]]
 
-    print(f"[utils.update_jsonl_db] Database now has {len(existing_by_id)} records.")
\ No newline at end of file
+    store.delete([old for old, new in renamed.items() if old != new])
+    store.upsert(updates)
+    print(f"[utils.migrate_arxiv_ids] Migrated {len(renamed)} arXiv records to {len(migrated)} canonical ids.")
+    return len(renamed)
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks import fake_arxiv, fake_openai
+from src import fetch_papers, llm_client
+from src.llm_cache import RESPONSE_CACHE
+
+
+@pytest.fixture
+def response_cache(tmp_path, monkeypatch):
+    """The process-wide LLM response cache, emptied into a temp directory."""
+    monkeypatch.setattr(RESPONSE_CACHE, "cache_dir", str(tmp_path / "llm_cache"))
+    monkeypatch.setattr(RESPONSE_CACHE, "enabled", True)
+    monkeypatch.setattr(RESPONSE_CACHE, "hits", 0)
+    monkeypatch.setattr(RESPONSE_CACHE, "misses", 0)
+    return RESPONSE_CACHE
+
+
+@pytest.fixture
+def openai_server(monkeypatch, response_cache):
+    """Local OpenAI stand-in; the shared client is rebuilt to talk to it."""
+    server = fake_openai.serve(port=0)
+    monkeypatch.setenv("OPENAI_API_KEY", "fake")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setattr(llm_client, "_client", None)
+    monkeypatch.setattr(llm_client, "BACKOFF_BASE_SECONDS", 0.01)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def arxiv_server(tmp_path, monkeypatch):
+    """Local arXiv stand-in (100 papers, one per hour) with a temp feed cache."""
+    server = fake_arxiv.serve(port=0, entries=100)
+    monkeypatch.setattr(fetch_papers, "ARXIV_API_URL", f"http://127.0.0.1:{server.server_address[1]}/api/query")
+    monkeypatch.setattr(fetch_papers, "FEED_CACHE_DIR", str(tmp_path / "arxiv_cache"))
+    monkeypatch.setattr(fetch_papers, "REQUEST_SPACING_SECONDS", 0)
+    yield server
+    server.shutdown()
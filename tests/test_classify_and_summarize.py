@@ -0,0 +1,76 @@
+import json
+
+from benchmarks.fake_openai import fake_classification
+from src import classify_and_summarize, llm_client
+from src.classify_and_summarize import (
+    build_classification_input,
+    enrich_papers_with_llm,
+    iter_enriched,
+    validate_classification,
+)
+
+
+def _papers(n):
+    return [
+        {"id": f"arxiv:2501.{i:05d}", "title": f"Sketching assistant {i} for concept design", "abstract": "We study ideation."}
+        for i in range(n)
+    ]
+
+
+def test_validate_classification_rejects_incomplete_answers():
+    answer = {
+        "design_phase": ["Concept design"], "ai_roles": [], "representations": [], "research_type": [],
+        "summary_short": "s", "implications_for_design_research": [], "tags": ["ideation"], "extra": 1,
+    }
+    assert validate_classification(answer) == {k: v for k, v in answer.items() if k != "extra"}
+    assert validate_classification({**answer, "tags": "ideation"}) is None
+    assert validate_classification({k: v for k, v in answer.items() if k != "summary_short"}) is None
+    assert validate_classification(answer, with_confidence=True) is None
+    assert validate_classification({**answer, "confidence": 0.8}, with_confidence=True)["confidence"] == 0.8
+
+
+def test_papers_are_classified_in_batches_and_cached(openai_server, response_cache):
+    papers = _papers(10)
+
+    enriched = enrich_papers_with_llm(papers, batch_size=8)
+
+    assert [p["id"] for p in enriched] == [p["id"] for p in papers]
+    assert all(p["design_phase"] and p["summary_short"] for p in enriched)
+    assert openai_server.state.counts["responses"] == 2
+    assert response_cache.stats()["misses"] == 10
+
+    # uusi ajo, eri ryhmittely: kaikki välimuistista
+    assert enrich_papers_with_llm(papers, batch_size=3) == enriched
+    assert openai_server.state.counts["responses"] == 2
+    assert response_cache.stats()["hits"] == 10
+
+
+def test_cascade_counts_one_miss_per_model_queried(openai_server, response_cache, monkeypatch):
+    monkeypatch.setattr(classify_and_summarize, "CLASSIFY_CASCADE_MODEL", "gpt-4o-mini")
+    papers = _papers(10)
+    low = [
+        p for p in papers
+        if json.loads(fake_classification(build_classification_input(p), confidence=True))["confidence"]
+        < classify_and_summarize.CASCADE_MIN_CONFIDENCE
+    ]
+    assert 0 < len(low) < len(papers)
+
+    enriched = enrich_papers_with_llm(papers, batch_size=10)
+
+    assert len(enriched) == 10
+    assert all("confidence" not in p for p in enriched)
+    assert response_cache.stats() == {"hits": 0, "misses": len(papers) + len(low), "hit_rate": 0.0}
+
+    enrich_papers_with_llm(papers, batch_size=10)
+    assert response_cache.stats()["hits"] == 10
+    assert response_cache.stats()["misses"] == len(papers) + len(low)
+
+
+def test_failed_papers_go_to_on_failed(openai_server, monkeypatch):
+    openai_server.state.error_rate = 1.0
+    monkeypatch.setattr(llm_client, "MAX_RETRIES", 0)
+    papers = _papers(3)
+    failed = []
+
+    assert list(iter_enriched(papers, batch_size=2, on_failed=failed.extend)) == []
+    assert sorted(p["id"] for p in failed) == [p["id"] for p in papers]
@@ -0,0 +1,71 @@
+from src.dedup import DuplicateIndex, merge_duplicate, normalize_title
+
+
+ARXIV = {
+    "id": "arxiv:2501.01234",
+    "title": "Generative AI in Concept Design: A Protocol Study with Novice Designers",
+    "authors": ["Aino Virtanen", "Nigel Cross"],
+}
+BIBTEX = {
+    "id": "bib:virtanen2025generative",
+    "title": "Generative {AI} in concept design: a protocol study with novice designers",
+    "authors": "Virtanen, Aino and Cross, Nigel",
+    "doi": "10.1000/example",
+}
+
+
+def test_normalize_title_drops_latex_accents_and_punctuation():
+    assert normalize_title("{Müller}'s \\emph{Design} -- Spaces!") == "muller s emph design spaces"
+
+
+def test_bibtex_copy_of_an_arxiv_paper_is_a_duplicate():
+    index = DuplicateIndex()
+    index.add(ARXIV)
+    assert index.find_duplicate(BIBTEX) == ARXIV["id"]
+
+
+def test_same_title_by_other_authors_is_not_a_duplicate():
+    index = DuplicateIndex()
+    index.add(ARXIV)
+    other = {**BIBTEX, "authors": "Smith, John"}
+    assert index.find_duplicate(other) is None
+    # ilman tekijöitä ratkaisee otsikko
+    assert index.find_duplicate({**BIBTEX, "authors": []}) == ARXIV["id"]
+
+
+def test_different_titles_are_not_duplicates():
+    index = DuplicateIndex()
+    index.add(ARXIV)
+    other = {**BIBTEX, "title": "Sketching with diffusion models in automotive styling studios"}
+    assert index.find_duplicate(other) is None
+
+
+def test_short_titles_must_match_exactly():
+    index = DuplicateIndex()
+    index.add({"id": "a", "title": "Design AI"})
+    assert index.find_duplicate({"id": "b", "title": "Design AI!"}) == "a"
+    assert index.find_duplicate({"id": "c", "title": "Design AIs"}) is None
+
+
+def test_split_duplicates_catches_repeats_within_one_batch():
+    index = DuplicateIndex()
+    fresh, duplicates = index.split_duplicates([ARXIV, BIBTEX])
+    assert fresh == [ARXIV]
+    assert duplicates == [(BIBTEX, ARXIV["id"])]
+
+
+def test_aliases_survive_save_load_and_sync(tmp_path):
+    merged = merge_duplicate(ARXIV, BIBTEX)
+    assert merged["aliases"] == [BIBTEX["id"]]
+    assert merged["doi"] == BIBTEX["doi"]
+
+    index = DuplicateIndex()
+    index.add(merged)
+    index.add({"id": "gone", "title": "A paper that was deleted from the database"})
+    path = str(tmp_path / "dedup_index.npz")
+    index.save(path)
+
+    loaded = DuplicateIndex.load(path)
+    assert loaded.find_duplicate({"id": BIBTEX["id"], "title": "anything"}) == ARXIV["id"]
+    assert loaded.sync([merged]) == 0
+    assert "gone" not in loaded
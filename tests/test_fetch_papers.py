@@ -0,0 +1,68 @@
+from src import fetch_papers
+from src.fetch_papers import commit_arxiv_watermark, iter_new_papers, load_arxiv_state
+
+
+def _harvest(state_path, **options):
+    """One harvest + commit, as the pipeline does once the papers are stored."""
+    ids = [p["id"] for p in iter_new_papers(days_back=30, max_results=10, watermark_path=state_path, **options)]
+    commit_arxiv_watermark(state_path)
+    return ids
+
+
+def test_watermark_stops_the_next_harvest(arxiv_server, tmp_path):
+    state_path = str(tmp_path / "arxiv_state.json")
+    first = _harvest(state_path)
+
+    assert first
+    assert len(set(first)) == len(first)
+    assert all(i.startswith("arxiv:") for i in first)
+    state = load_arxiv_state(state_path)
+    assert "resume" not in state and "pending" not in state
+    assert _harvest(state_path) == []
+
+
+def test_max_pages_resumes_instead_of_moving_the_watermark(arxiv_server, tmp_path):
+    full = _harvest(str(tmp_path / "full.json"))
+
+    state_path = str(tmp_path / "arxiv_state.json")
+    harvested = _harvest(state_path, max_pages=3)
+    state = load_arxiv_state(state_path)
+    assert state["resume"]["start"] == 30
+    assert "watermark" not in state
+
+    for _ in range(5):
+        if "resume" not in load_arxiv_state(state_path):
+            break
+        harvested += _harvest(state_path, max_pages=3)
+
+    assert "resume" not in load_arxiv_state(state_path)
+    assert sorted(set(harvested)) == sorted(full)
+    assert load_arxiv_state(state_path)["watermark"] == load_arxiv_state(str(tmp_path / "full.json"))["watermark"]
+
+
+def test_failed_page_is_retried_on_the_next_run(arxiv_server, tmp_path, monkeypatch):
+    full = _harvest(str(tmp_path / "full.json"))
+    query = fetch_papers._query_arxiv
+
+    def failing_query(search_query, max_results=40, start=0):
+        if start >= 20:
+            raise OSError("HTTP Error 429: Too Many Requests")
+        return query(search_query, max_results=max_results, start=start)
+
+    state_path = str(tmp_path / "arxiv_state.json")
+    monkeypatch.setattr(fetch_papers, "_query_arxiv", failing_query)
+    harvested = _harvest(state_path)
+    assert load_arxiv_state(state_path)["resume"]["start"] == 20
+
+    monkeypatch.setattr(fetch_papers, "_query_arxiv", query)
+    harvested += _harvest(state_path)
+    assert sorted(set(harvested)) == sorted(full)
+    assert _harvest(state_path) == []
+
+
+def test_uncommitted_harvest_is_repeated(arxiv_server, tmp_path):
+    state_path = str(tmp_path / "arxiv_state.json")
+    first = list(iter_new_papers(days_back=30, max_results=10, watermark_path=state_path))
+    # kaatuminen ennen tallennusta: watermarkia ei commitoitu
+    assert "watermark" not in load_arxiv_state(state_path)
+    assert _harvest(state_path) == [p["id"] for p in first]
@@ -0,0 +1,65 @@
+import json
+
+from src.keyword_matcher import KeywordMatcher
+from src.fetch_papers import get_relevance_matcher
+
+
+def _matcher():
+    positive = {"sketch": 1.0, "sketching": 1.0, "co-design": 1.0, "designer": 1.0, "design": 0.5, "creative": 0.5}
+    return KeywordMatcher(positive, ["antenna", "mimo"], threshold=1.0)
+
+
+def test_terms_match_on_word_boundaries():
+    matcher = _matcher()
+    assert matcher.match("A quick sketch of the idea").positive == ["sketch"]
+    assert not matcher.match("The results were sketchy").positive
+    assert not matcher.match("redesigned layouts").positive
+
+
+def test_plural_and_ing_forms_match_their_term():
+    matcher = _matcher()
+    assert matcher.match("Interviews with designers").positive == ["designer"]
+    assert matcher.match("Rough sketches on paper").positive == ["sketch"]
+    assert matcher.match("Sketching with diffusion models").positive == ["sketching"]
+
+
+def test_spaces_and_hyphens_inside_terms_are_interchangeable():
+    matcher = _matcher()
+    for text in ("co-design workshops", "co design workshops", "codesign workshops"):
+        assert matcher.match(text).positive == ["co-design"], text
+
+
+def test_a_negative_term_vetoes_the_text():
+    matcher = _matcher()
+    result = matcher.match("Sketching antenna arrays with designers")
+    assert not result.relevant
+    assert result.negative == ["antenna"]
+    assert matcher.match("Beamforming for antennas").negative == ["antenna"]
+
+
+def test_weak_terms_only_count_together():
+    matcher = _matcher()
+    assert not matcher.match("A design method").relevant
+    result = matcher.match("A creative design method")
+    assert result.relevant
+    assert result.score == 1.0
+    # sama termi monta kertaa lasketaan kerran
+    assert not matcher.match("design, design and design").relevant
+
+
+def test_from_config_accepts_a_term_list(tmp_path):
+    path = tmp_path / "keywords.json"
+    path.write_text(json.dumps({"positive": ["ideation"], "negative": ["vlsi"]}), encoding="utf-8")
+
+    matcher = KeywordMatcher.from_config(str(path))
+
+    assert matcher.match("Ideation with LLMs").relevant
+    assert not matcher.match("Ideation for VLSI placement").relevant
+
+
+def test_default_relevance_matcher():
+    matcher = get_relevance_matcher()
+    assert matcher.match("LLM support for industrial design students").relevant
+    assert matcher.match("Prototyping with generative AI").relevant
+    assert not matcher.match("Graph neural networks for MIMO wireless channels").relevant
+    assert not matcher.match("A design of experiments").relevant
@@ -0,0 +1,59 @@
+import os
+import time
+
+from src.llm_cache import ResponseCache, cache_key
+
+
+def test_cache_key_covers_every_part():
+    key = cache_key("gpt-4o", "system", "user")
+    assert key == cache_key("gpt-4o", "system", "user")
+    assert key != cache_key("gpt-4o-mini", "system", "user")
+    assert key != cache_key("gpt-4o", "system!", "user")
+    assert key != cache_key("gpt-4o", "system", "user!")
+    # osien raja ei voi siirtyä
+    assert cache_key("a", "bc", "d") != cache_key("ab", "c", "d")
+
+
+def test_get_put_and_counters(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = cache_key("m", "s", "u")
+
+    assert cache.get(key) is None
+    assert cache.get(key, count_miss=False) is None
+    cache.put(key, "answer", model="m")
+    assert cache.get(key) == "answer"
+    cache.record_misses(2)
+
+    assert cache.stats() == {"hits": 1, "misses": 3, "hit_rate": 0.25}
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResponseCache(str(tmp_path), enabled=False)
+    cache.put("k" * 64, "answer")
+    assert cache.get("k" * 64) is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age_days=1)
+    key = cache_key("m", "s", "u")
+    cache.put(key, "answer")
+    cache.max_age_seconds = 0
+
+    time.sleep(0.01)
+    assert cache.get(key) is None
+    assert not os.path.exists(cache._path(key))
+
+
+def test_prune_removes_expired_then_oldest(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_mb=1, max_age_days=30)
+    now = time.time()
+    keys = [cache_key("m", "s", str(i)) for i in range(4)]
+    for age_days, key in zip((40, 3, 2, 1), keys):
+        cache.put(key, "x" * 400_000)
+        os.utime(cache._path(key), (now - age_days * 86400,) * 2)
+
+    assert cache.prune() == 2
+
+    remaining = [key for key in keys if os.path.exists(cache._path(key))]
+    assert remaining == keys[2:]
@@ -0,0 +1,28 @@
+from src.paper_store import PaperStore
+
+
+def _record(paper_id, **fields):
+    return {"id": paper_id, "title": f"Paper {paper_id}", "year": 2024, "design_phase": ["Concept design"], **fields}
+
+
+def test_lazy_fields_are_read_from_the_file(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.jsonl"))
+    store.upsert([_record("a", authors=["Aino Virtanen"], url="https://example.org/a")])
+
+    paper = store.get("a")
+    assert paper["authors"] == ["Aino Virtanen"]
+    assert paper.get("url") == "https://example.org/a"
+    assert paper["design_phase"] == ["Concept design"]
+    assert dict(paper) == _record("a", authors=["Aino Virtanen"], url="https://example.org/a")
+
+
+def test_get_returns_default_when_the_record_was_deleted(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.jsonl"))
+    store.upsert([_record("a", authors=["Aino Virtanen"]), _record("b")])
+    paper = store.get("a")
+
+    store.delete(["a"])
+
+    assert paper.get("authors") is None
+    assert paper.get("authors", []) == []
+    assert paper.get("title") == "Paper a"  # muistissa oleva kenttä säilyy
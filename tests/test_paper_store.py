@@ -0,0 +1,101 @@
+import json
+
+from src import paper_store
+from src.paper_store import PaperStore
+
+
+def _record(paper_id, **fields):
+    return {"id": paper_id, "title": f"Paper {paper_id}", "year": 2024, "design_phase": ["Concept design"], **fields}
+
+
+def _lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_upsert_appends_and_the_last_line_wins(tmp_path):
+    path = str(tmp_path / "papers.jsonl")
+    store = PaperStore(path)
+    assert store.upsert([_record("a"), _record("b")]) == 2
+    assert store.upsert([_record("a", title="Paper a, revised")]) == 1
+
+    assert [r["id"] for r in _lines(path)] == ["a", "b", "a"]
+    assert store.get("a")["title"] == "Paper a, revised"
+    assert store.dead_lines() == 1
+    # toinen instanssi lukee saman tilan tiedostosta
+    assert PaperStore(path).get("a")["title"] == "Paper a, revised"
+
+
+def test_unchanged_records_are_not_rewritten(tmp_path):
+    path = str(tmp_path / "papers.jsonl")
+    store = PaperStore(path)
+    store.upsert([_record("a", authors=["Aino Virtanen"])])
+
+    assert store.upsert([_record("a", authors=["Aino Virtanen"])]) == 0
+    assert store.upsert([dict(store.get("a"))]) == 0
+    assert store.upsert([_record("a", authors=["Eero Nieminen"])]) == 1
+    assert len(_lines(path)) == 2
+
+
+def test_compact_keeps_one_line_per_record(tmp_path):
+    path = str(tmp_path / "papers.jsonl")
+    store = PaperStore(path)
+    store.upsert([_record("a", url="https://example.org/a"), _record("b")])
+    store.upsert([_record("a", url="https://example.org/a2")])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("{not json\n")
+    store = PaperStore(path)
+
+    store.compact()
+
+    assert [r["id"] for r in _lines(path)] == ["a", "b"]
+    assert store.dead_lines() == 0
+    # offset-indeksi päivittyy: levyltä luettavat kentät osoittavat uusiin riveihin
+    assert store.get("a")["url"] == "https://example.org/a2"
+    assert store.get("b")["title"] == "Paper b"
+
+
+def test_compaction_runs_automatically(tmp_path, monkeypatch):
+    monkeypatch.setattr(paper_store, "COMPACT_MIN_DEAD_LINES", 3)
+    monkeypatch.setattr(paper_store, "COMPACT_RATIO", 0.0)
+    path = str(tmp_path / "papers.jsonl")
+    store = PaperStore(path)
+    store.upsert([_record("a")])
+    for n in range(3):
+        store.upsert([_record("a", title=f"Revision {n}")])
+
+    assert len(_lines(path)) == 1
+    assert store.get("a")["title"] == "Revision 2"
+
+
+def test_delete_rewrites_the_file(tmp_path):
+    path = str(tmp_path / "papers.jsonl")
+    store = PaperStore(path)
+    store.upsert([_record("a"), _record("b")])
+
+    assert store.delete(["a", "missing"]) == 1
+    assert "a" not in store
+    assert [r["id"] for r in _lines(path)] == ["b"]
+
+
+def test_changes_by_another_writer_are_picked_up(tmp_path):
+    path = str(tmp_path / "papers.jsonl")
+    reader = PaperStore(path)
+    reader.upsert([_record("a")])
+
+    PaperStore(path).upsert([_record("b")])
+
+    assert reader.ids() == {"a", "b"}
+
+
+def test_papers_by_phase_newest_first(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.jsonl"))
+    store.upsert([
+        _record("old", year=2019),
+        _record("new", year=2025),
+        _record("other", year=2024, design_phase=["Detail design"]),
+        _record("both", year=2022, design_phase=["Detail design", "Concept design"]),
+    ])
+
+    assert [p["id"] for p in store.papers_by_phase("Concept design")] == ["new", "both", "old"]
+    assert [p["id"] for p in store.papers_by_phase("Concept design", limit=1)] == ["new"]
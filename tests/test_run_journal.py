@@ -0,0 +1,60 @@
+import json
+
+from src.run_journal import RunJournal
+
+
+def _interrupted_run(path):
+    journal = RunJournal(str(path))
+    assert journal.should_run("arxiv")
+    journal.complete("arxiv")
+    assert journal.should_run("enrich")
+    journal.paper_done("enrich", "arxiv:2501.00001")
+    journal.paper_done("enrich", "arxiv:2501.00002")
+    return journal.state["run_id"]
+
+
+def test_resume_skips_completed_stages(tmp_path):
+    path = tmp_path / "run_journal.json"
+    run_id = _interrupted_run(path)
+
+    journal = RunJournal(str(path), resume=True)
+
+    assert journal.state["run_id"] == run_id
+    assert not journal.should_run("arxiv")
+    assert journal.should_run("enrich")
+    assert journal.papers_done("enrich") == 2
+    assert journal.state["stages"]["enrich"]["last_paper"] == "arxiv:2501.00002"
+
+
+def test_without_resume_a_new_run_starts(tmp_path):
+    path = tmp_path / "run_journal.json"
+    _interrupted_run(path)
+
+    journal = RunJournal(str(path))
+
+    assert journal.state["completed"] == []
+    assert journal.should_run("arxiv")
+
+
+def test_finished_run_is_not_resumed(tmp_path):
+    path = tmp_path / "run_journal.json"
+    journal = RunJournal(str(path))
+    journal.should_run("arxiv")
+    journal.complete("arxiv")
+    journal.finish()
+
+    assert RunJournal(str(path), resume=True).should_run("arxiv")
+
+
+def test_single_stage_commands_leave_the_journal_alone(tmp_path):
+    path = tmp_path / "run_journal.json"
+    _interrupted_run(path)
+    before = path.read_text(encoding="utf-8")
+
+    journal = RunJournal(str(path), persist=False)
+    journal.should_run("bibtex")
+    journal.complete("bibtex")
+    journal.finish()
+
+    assert path.read_text(encoding="utf-8") == before
+    assert json.loads(before)["status"] == "running"